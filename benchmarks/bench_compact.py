@@ -0,0 +1,48 @@
+"""Whitespace compaction byte count benchmark.
+
+Renders every escp-wp file of a directory and generated forms with and
+without `compact_whitespace`, and prints the byte counts and estimated
+print times.
+
+$ python -m benchmarks.bench_compact samples
+"""
+import argparse
+import glob
+import os
+
+from wp.escp_bin_renderer import EscpToBinRenderer
+from wp.estimate import estimate_print_time
+
+from . import corpora
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare output sizes with and without whitespace compaction')
+    parser.add_argument('directory', nargs='?', default='samples', help='Directory of .escp.txt files')
+    parser.add_argument('--pins', type=int, default=9, choices=[9, 24, 48], help='Number of printer pins')
+    args = parser.parse_args()
+
+    documents = {}
+    for path in sorted(glob.glob(os.path.join(args.directory, '*.escp.txt'))):
+        with open(path, encoding='utf-8') as f:
+            documents[os.path.basename(path)] = f.read()
+    documents['(generated forms)'] = corpora.forms(64 * 1024)
+
+    total_before = total_after = 0
+    print(f'{"file":<28} {"before":>8} {"after":>8} {"saved":>7} {"s before":>9} {"s after":>8}')
+    for name, content in documents.items():
+        before = EscpToBinRenderer(args.pins).render(content)
+        after = EscpToBinRenderer(args.pins, compact_whitespace=True).render(content)
+        total_before += len(before)
+        total_after += len(after)
+        seconds_before = estimate_print_time(before, args.pins).seconds
+        seconds_after = estimate_print_time(after, args.pins).seconds
+        print(
+            f'{name:<28} {len(before):>8} {len(after):>8} {1 - len(after) / len(before):>7.1%} '
+            f'{seconds_before:>9.1f} {seconds_after:>8.1f}'
+        )
+    print(f'{"total":<28} {total_before:>8} {total_after:>8} {1 - total_after / total_before:>7.1%}')
+
+
+if __name__ == '__main__':
+    main()
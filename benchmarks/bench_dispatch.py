@@ -0,0 +1,53 @@
+"""Node dispatch benchmark.
+
+Renders an already parsed tree and reports nodes per second, with the
+class dispatch table and with the former per-node `getattr` lookup.
+
+$ python -m benchmarks.bench_dispatch --repeat 50
+"""
+import argparse
+import time
+
+from wp.escp_bin_renderer import EscpToBinRenderer
+
+
+class GetattrRenderer(EscpToBinRenderer):
+    """Dispatch as before the handler table, for comparison."""
+
+    def _render(self, node):
+        category = node.category.replace('-', '_')
+        getattr(self, f'render_{category}')(node)
+        self.previous_node = node
+
+
+def count_nodes(node) -> int:
+    return 1 + sum(count_nodes(child) for child in node.children)
+
+
+def measure(renderer: EscpToBinRenderer, root) -> float:
+    start = time.perf_counter()
+    renderer.render_tree(root)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure node dispatch throughput')
+    parser.add_argument('--sample', type=str, default='samples/swann.escp.txt', help='escp-wp document')
+    parser.add_argument('--repeat', type=int, default=50, help='Number of copies of the document body')
+    args = parser.parse_args()
+
+    with open(args.sample, encoding='utf-8') as f:
+        header, _, body = f.read().partition('\n')
+    content = header + '\n' + body * args.repeat
+    renderer = EscpToBinRenderer(9)
+    root = renderer.parse(renderer.lexer(content))
+    nodes = count_nodes(root)
+
+    print(f'{"dispatch":>8} {"s":>8} {"nodes/s":>10}')
+    for name, cls in (('getattr', GetattrRenderer), ('table', EscpToBinRenderer)):
+        elapsed = min(measure(cls(9), root) for _ in range(3))
+        print(f'{name:>8} {elapsed:>8.3f} {nodes / elapsed:>10,.0f}')
+
+
+if __name__ == '__main__':
+    main()
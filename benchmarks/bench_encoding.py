@@ -0,0 +1,53 @@
+"""Character encoding benchmark.
+
+Compares the per-word `Commands.magic_text` path with the precomputed
+`MagicEncoder` table on the words of a document: time and output size.
+
+$ python -m benchmarks.bench_encoding --sample samples/swann.escp.txt
+"""
+import argparse
+import time
+
+import escp
+
+from wp.magic_encoding import char_set_substitutions, magic_encoder, plain_char_substitutions
+
+
+def per_word(words: list[str]) -> bytes:
+    commands = escp.lookup_by_pins(9)
+    for word in words:
+        commands.magic_text(
+            word.replace('’', "'"),
+            character_set_substitution=char_set_substitutions,
+            plain_text_substitution=plain_char_substitutions
+        )
+    return commands.buffer
+
+
+def table(words: list[str]) -> bytes:
+    character_set = magic_encoder.default_character_set
+    output = bytearray()
+    for word in words:
+        encoded, character_set, _ = magic_encoder.encode(word, character_set)
+        output += encoded
+    return bytes(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare character encoding strategies')
+    parser.add_argument('--sample', type=str, default='samples/swann.escp.txt', help='Document to encode')
+    parser.add_argument('--repeat', type=int, default=50, help='Number of copies of the document')
+    args = parser.parse_args()
+
+    with open(args.sample, encoding='utf-8') as f:
+        words = f.read().split() * args.repeat
+
+    for name, encode in [('per word', per_word), ('table', table)]:
+        start = time.perf_counter()
+        output = encode(words)
+        elapsed = time.perf_counter() - start
+        print(f'{name:>10}: {elapsed:.3f} s, {len(words) / elapsed:,.0f} words/s, {len(output):,} bytes')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Bit-image conversion benchmark.
+
+Converts a generated full-page grayscale image (8 x 11 inches) for every
+pin count and dithering mode, then again from the conversion cache.
+
+$ python -m benchmarks.bench_image
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from wp import image
+
+
+def full_page(pins: int) -> np.ndarray:
+    """A gradient with noise and a dark disc, the size of a page at the printer resolution."""
+    fmt = image.band_format(pins)
+    height, width = 11 * fmt.vertical_dpi, 8 * fmt.horizontal_dpi
+    y, x = np.mgrid[0:height, 0:width]
+    pixels = x * 255.0 / width + np.random.default_rng(0).normal(0, 16, (height, width))
+    pixels[(x - width / 2) ** 2 + (y - height / 2) ** 2 < (width / 4) ** 2] *= 0.25
+    return np.clip(pixels, 0, 255).astype(np.uint8)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time full-page image conversions')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per measure, the best is kept')
+    args = parser.parse_args()
+
+    print(f'{"pins":>4} {"dithering":<16} {"dots":>11} {"bytes":>9} {"seconds":>8} {"cached":>8}')
+    with tempfile.TemporaryDirectory() as directory:
+        for pins in image.BAND_FORMATS:
+            pixels = full_page(pins)
+            path = os.path.join(directory, f'page-{pins}.pgm')
+            with open(path, 'wb') as f:
+                f.write(b'P5 %d %d 255\n' % (pixels.shape[1], pixels.shape[0]) + pixels.tobytes())
+            for dithering in image.DITHERING_MODES:
+                elapsed = float('inf')
+                for _ in range(args.repeat):
+                    image._bit_image_bands.cache_clear()
+                    start = time.perf_counter()
+                    bands = image.bit_image_bands(path, pins, dithering=dithering)
+                    elapsed = min(elapsed, time.perf_counter() - start)
+                start = time.perf_counter()
+                image.bit_image_bands(path, pins, dithering=dithering)
+                cached = time.perf_counter() - start
+                size = f'{pixels.shape[1]}x{pixels.shape[0]}'
+                print(
+                    f'{pins:>4} {dithering:<16} {size:>11} {sum(map(len, bands)):>9,} '
+                    f'{elapsed:>8.3f} {cached:>8.5f}'
+                )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Incremental re-rendering benchmark.
+
+Applies random small edits to a long document and compares the time of
+`IncrementalDocument.edit` with a full render of the edited text.
+
+$ python -m benchmarks.bench_incremental --repeat 50 --edits 100
+"""
+import argparse
+import random
+import time
+
+from wp.escp_bin_renderer import EscpToBinRenderer
+from wp.incremental import IncrementalDocument
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare incremental and full re-rendering after edits')
+    parser.add_argument('--sample', type=str, default='samples/swann.escp.txt', help='escp-wp document')
+    parser.add_argument('--repeat', type=int, default=50, help='Number of copies of the document body')
+    parser.add_argument('--edits', type=int, default=100, help='Number of random edits')
+    args = parser.parse_args()
+
+    with open(args.sample, encoding='utf-8') as f:
+        header, _, body = f.read().partition('\n')
+    content = header + '\n' + body * args.repeat
+    rng = random.Random(0)
+
+    start = time.perf_counter()
+    document = IncrementalDocument(EscpToBinRenderer(9), content)
+    initial = time.perf_counter() - start
+
+    incremental = full = 0.0
+    segments = 0
+    for _ in range(args.edits):
+        # insert after a space, away from directives
+        position = document.content.index(' ', rng.randrange(len(header) + 1, len(document.content) - 100)) + 1
+        start = time.perf_counter()
+        segments += document.edit(position, position, rng.choice(['word ', 'é', '\n', ' ']))
+        output = document.output
+        incremental += time.perf_counter() - start
+        start = time.perf_counter()
+        expected = EscpToBinRenderer(9).render(document.content)
+        full += time.perf_counter() - start
+        assert output == expected
+
+    print(f'{len(content) / 1024:,.0f} KB, {len(document.segments)} segments, initial render {initial:.3f} s')
+    print(f'full render    {full / args.edits * 1000:>8.2f} ms per edit')
+    print(f'incremental    {incremental / args.edits * 1000:>8.2f} ms per edit, {segments / args.edits:.1f} segments')
+
+
+if __name__ == '__main__':
+    main()
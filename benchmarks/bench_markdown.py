@@ -0,0 +1,40 @@
+"""Markdown scaling benchmark.
+
+Generates Markdown documents of increasing size and measures lexing,
+parsing and rendering to escp-wp. Linear scaling shows as a roughly
+constant MB/s column.
+
+$ python -m benchmarks.bench_markdown --sizes 1 4 16
+"""
+import argparse
+import time
+
+from wp.md_escp_converter import MarkdownEscpRenderer
+
+from .corpora import markdown
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure Markdown conversion time against document size')
+    parser.add_argument('--sizes', type=float, nargs='+', default=[0.25, 1, 4], help='Document sizes in MB')
+    args = parser.parse_args()
+
+    print(f'{"size MB":>8} {"lex s":>8} {"parse s":>8} {"render s":>8} {"MB/s":>8}')
+    for size in args.sizes:
+        content = markdown(int(size * 1024 * 1024))
+        renderer = MarkdownEscpRenderer()
+        start = time.perf_counter()
+        tokens = renderer.lexer(content)
+        lexed = time.perf_counter()
+        root = renderer.parse(tokens)
+        parsed = time.perf_counter()
+        renderer.render_tree(root)
+        rendered = time.perf_counter()
+        print(
+            f'{size:>8.2f} {lexed - start:>8.3f} {parsed - lexed:>8.3f} {rendered - parsed:>8.3f} '
+            f'{size / (rendered - start):>8.2f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Parse tree memory benchmark.
+
+Compares the peak memory of the object tree (`parse`) and the flat
+array-backed tree (`parse_flat`) for a generated document.
+
+$ python -m benchmarks.bench_memory --size 50
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from wp.escp_bin_renderer import EscpToBinRenderer
+
+from .bench_parser import make_document
+
+
+def measure(parse, tokens) -> tuple[float, int]:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    tree = parse(tokens)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tree
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure parse tree memory for both tree representations')
+    parser.add_argument('--size', type=float, default=4, help='Document size in MB')
+    args = parser.parse_args()
+
+    content = make_document(args.size)
+    renderer = EscpToBinRenderer(9)
+    tokens = renderer.lexer(content)
+    print(f'{args.size:.1f} MB source, {len(tokens)} tokens')
+    print(f'{"tree":>8} {"parse s":>8} {"peak MB":>8} {"x source":>8}')
+    for name, parse in (('object', renderer.parse), ('flat', renderer.parse_flat)):
+        elapsed, peak = measure(parse, tokens)
+        print(f'{name:>8} {elapsed:>8.3f} {peak / 2**20:>8.1f} {peak / len(content):>8.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""Optimizer byte count benchmark.
+
+Renders every escp-wp file of a directory with and without the peephole
+optimizer and prints the byte counts.
+
+$ python -m benchmarks.bench_optimizer samples
+"""
+import argparse
+import glob
+import os
+
+from wp.escp_bin_renderer import EscpToBinRenderer
+
+# Adjacent styled runs, as produced by templates and converted Markdown
+SYNTHETIC = (
+    '[bold:on]Total[bold:off][bold:on]:[bold:off] [underline:on]42[underline:off][underline:on] EUR[underline:off]\n'
+    '[italic:on][italic:off]Lorem [italic:on]ipsum[italic:off] [italic:on]dolor[italic:off]\n'
+) * 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare output sizes with and without the optimizer')
+    parser.add_argument('directory', nargs='?', default='samples', help='Directory of .escp.txt files')
+    parser.add_argument('--pins', type=int, default=9, choices=[9, 24, 48], help='Number of printer pins')
+    args = parser.parse_args()
+
+    documents = {}
+    for path in sorted(glob.glob(os.path.join(args.directory, '*.escp.txt'))):
+        with open(path, encoding='utf-8') as f:
+            documents[os.path.basename(path)] = f.read()
+    documents['(synthetic styled runs)'] = SYNTHETIC
+
+    total_before = total_after = 0
+    print(f'{"file":<28} {"before":>8} {"after":>8} {"saved":>7}')
+    for name, content in documents.items():
+        before = len(EscpToBinRenderer(args.pins).render(content))
+        after = len(EscpToBinRenderer(args.pins, optimize=True).render(content))
+        total_before += before
+        total_after += after
+        print(f'{name:<28} {before:>8} {after:>8} {1 - after / before:>7.1%}')
+    print(f'{"total":<28} {total_before:>8} {total_after:>8} {1 - total_after / total_before:>7.1%}')
+
+
+if __name__ == '__main__':
+    main()
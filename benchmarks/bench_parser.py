@@ -0,0 +1,42 @@
+"""Parser scaling benchmark.
+
+Generates nested escp-wp documents of increasing size and measures lexing
+and parsing time. Linear scaling shows as a roughly constant MB/s column.
+
+$ python -m benchmarks.bench_parser --sizes 1 10 100
+"""
+import argparse
+import time
+
+from wp.escp_bin_renderer import EscpToBinRenderer
+
+PARAGRAPH = (
+    'Lorem ipsum [bold:on]dolor sit [underline:on]amet, consectetur[underline:off] adipiscing[bold:off] elit, '
+    'sed do [italic:on]eiusmod tempor [bold:on]incididunt[bold:off] ut labore[italic:off] et dolore.\n\n'
+)
+
+
+def make_document(size_mb: float) -> str:
+    repeat = int(size_mb * 1024 * 1024 / len(PARAGRAPH)) + 1
+    return PARAGRAPH * repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure escp-wp parsing time against document size')
+    parser.add_argument('--sizes', type=float, nargs='+', default=[1, 4, 16], help='Document sizes in MB')
+    args = parser.parse_args()
+
+    print(f'{"size MB":>8} {"lex s":>8} {"parse s":>8} {"MB/s":>8}')
+    for size in args.sizes:
+        content = make_document(size)
+        renderer = EscpToBinRenderer(9)
+        start = time.perf_counter()
+        tokens = renderer.lexer(content)
+        lexed = time.perf_counter()
+        renderer.parse(tokens)
+        parsed = time.perf_counter()
+        print(f'{size:>8.1f} {lexed - start:>8.3f} {parsed - lexed:>8.3f} {size / (parsed - start):>8.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""Rendering throughput benchmark.
+
+Renders a sample document repeatedly and reports words per second and
+peak traced memory.
+
+$ python -m benchmarks.bench_render --sample samples/swann.escp.txt --repeat 50
+"""
+import argparse
+import time
+import tracemalloc
+
+from wp.escp_bin_renderer import EscpToBinRenderer
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure escp-wp rendering throughput')
+    parser.add_argument('--sample', type=str, default='samples/swann.escp.txt', help='escp-wp document')
+    parser.add_argument('--repeat', type=int, default=50, help='Number of copies of the document body')
+    parser.add_argument('--pins', type=int, default=9, choices=[9, 24, 48], help='Number of printer pins')
+    args = parser.parse_args()
+
+    with open(args.sample, encoding='utf-8') as f:
+        header, _, body = f.read().partition('\n')
+    content = header + '\n' + body * args.repeat
+    words = len(content.split())
+
+    start = time.perf_counter()
+    EscpToBinRenderer(args.pins).render(content)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    EscpToBinRenderer(args.pins).render(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f'{words} words in {elapsed:.3f} s: {words / elapsed:,.0f} words/s, peak {peak / 1024:,.0f} KiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Table rendering benchmark.
+
+Renders invoices of a growing number of rows and prints the time per row,
+which stays flat when rendering is linear in the number of rows.
+
+$ python -m benchmarks.bench_table
+"""
+import argparse
+import random
+import time
+
+from wp.escp_bin_renderer import EscpToBinRenderer
+
+from . import corpora
+
+
+def invoice(rows: int) -> str:
+    rng = random.Random(0)
+    lines = ['Item | Description | Qty | Price']
+    for i in range(rows):
+        description = ' '.join(rng.choice(corpora.WORDS) for _ in range(rng.choice([2, 3, 12])))
+        lines.append(f'{i + 1} | {description} | {rng.randint(1, 99)} | {rng.randint(100, 99999) / 100:.2f}')
+    return corpora.PRAGMA + '[table:on]\n' + '\n'.join(lines) + '\n[table:off]\n'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time table rendering against the number of rows')
+    parser.add_argument('--pins', type=int, default=9, choices=[9, 24, 48], help='Number of printer pins')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per size, the best is kept')
+    args = parser.parse_args()
+
+    print(f'{"rows":>6} {"bytes":>9} {"seconds":>8} {"us/row":>7}')
+    for rows in (100, 200, 400, 800, 1600, 3200):
+        content = invoice(rows)
+        elapsed = float('inf')
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            output = EscpToBinRenderer(args.pins).render(content)
+            elapsed = min(elapsed, time.perf_counter() - start)
+        print(f'{rows:>6} {len(output):>9,} {elapsed:>8.3f} {elapsed / rows * 1e6:>7.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Generated benchmark documents.
+
+Every generator returns a document of about `size` characters, built from a
+fixed seed so that runs on different commits measure the same input.
+"""
+import random
+from typing import Callable
+
+WORDS = (
+    'lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore et '
+    'dolore magna aliqua enim ad minim veniam quis nostrud exercitation ullamco laboris nisi aliquip ex ea '
+    'commodo consequat duis aute irure in reprehenderit voluptate velit esse cillum fugiat nulla pariatur'
+).split()
+
+FRENCH_WORDS = (
+    'longtemps je me suis couché de bonne heure parfois à peine ma bougie éteinte mes yeux se fermaient si '
+    'vite que je n’avais pas le temps de me dire je m’endors et une demi-heure après la pensée qu’il était '
+    'temps de chercher le sommeil m’éveillait voulais poser volume croyais avoir encore dans les mains et '
+    'souffler ma lumière où façon été déjà œuvre naïf noël château forêt très çà là'
+).split()
+
+PRAGMA = '[pragma:escp-wp][soft-wrap:on][cpi:10]\n'
+STYLES = ['bold', 'italic', 'underline', 'double-width', 'double-height']
+
+
+def _paragraphs(size: int, make_paragraph: Callable[[random.Random], str], header='') -> str:
+    rng = random.Random(size)
+    parts = [header]
+    length = len(header)
+    while length < size:
+        paragraph = make_paragraph(rng)
+        parts.append(paragraph)
+        length += len(paragraph)
+    return ''.join(parts)
+
+
+def _sentence(rng: random.Random, words: list[str], count: int) -> str:
+    return ' '.join(rng.choice(words) for _ in range(count)).capitalize() + '.'
+
+
+def prose(size: int) -> str:
+    """Plain soft-wrapped paragraphs."""
+    return _paragraphs(
+        size, lambda rng: ' '.join(_sentence(rng, WORDS, rng.randint(5, 15)) for _ in range(5)) + '\n\n', PRAGMA
+    )
+
+
+def nested(size: int) -> str:
+    """Styles nested up to five levels deep around most words."""
+    def paragraph(rng: random.Random) -> str:
+        parts = []
+        for _ in range(40):
+            depth = rng.randint(0, len(STYLES))
+            styles = rng.sample(STYLES[:-2], min(depth, 3)) + STYLES[3:3 + max(0, depth - 3)]
+            opening = ''.join(f'[{style}:on]' for style in styles)
+            closing = ''.join(f'[{style}:off]' for style in reversed(styles))
+            parts.append(opening + rng.choice(WORDS) + closing)
+        return ' '.join(parts) + '\n\n'
+
+    return _paragraphs(size, paragraph, PRAGMA)
+
+
+def boxes(size: int) -> str:
+    """Pages of boxed titles at varying pitches and margins."""
+    def paragraph(rng: random.Random) -> str:
+        cpi = rng.choice([10, 12, 15])
+        margin = rng.randint(0, 10)
+        thickness = rng.randint(1, 2)
+        title = _sentence(rng, WORDS, rng.randint(2, 6))
+        return (
+            f'[init][cpi:{cpi}][margin:left:{margin}][box:on:thickness:{thickness}]{title}[box:off]\n'
+            f'{_sentence(rng, WORDS, 12)}\n\n'
+        )
+
+    return _paragraphs(size, paragraph, PRAGMA)
+
+
+def forms(size: int) -> str:
+    """Sparse invoice-like forms: labels and columns aligned with blanks, and blank lines between blocks."""
+    def paragraph(rng: random.Random) -> str:
+        lines = [f'{"INVOICE":<50}No {rng.randint(1, 9999):>6}', '', '', '']
+        for label in ['Name', 'Address', 'City']:
+            lines.append(f'{label + ":":<15}{_sentence(rng, WORDS, 2):<40}   ')
+        lines += ['', '', f'{"Item":<30}{"Qty":>10}{"Price":>15}']
+        for _ in range(rng.randint(3, 10)):
+            item = ' '.join(rng.choice(WORDS) for _ in range(2))
+            lines.append(f'{item:<30}{rng.randint(1, 99):>10}{rng.randint(100, 99999) / 100:>15.2f}     ')
+        lines += ['', '', '', f'{"Total":<40}{rng.randint(100, 999999) / 100:>15.2f}', '', '', '', '', '']
+        return '\n'.join(lines) + '\n'
+
+    return _paragraphs(size, paragraph, '[pragma:escp-wp][soft-wrap:off][cpi:10]\n')
+
+
+def tables(size: int) -> str:
+    """Invoices as tables of hundreds of rows, some with descriptions wrapping inside their column."""
+    def paragraph(rng: random.Random) -> str:
+        rows = ['Item | Description | Qty | Price']
+        for i in range(rng.randint(100, 400)):
+            description = _sentence(rng, WORDS, rng.choice([2, 3, 12]))
+            rows.append(f'{i + 1} | {description} | {rng.randint(1, 99)} | {rng.randint(100, 99999) / 100:.2f}')
+        thickness = rng.randint(1, 2)
+        return f'[table:on:thickness:{thickness}]\n' + '\n'.join(rows) + '\n[table:off]\n\n'
+
+    return _paragraphs(size, paragraph, PRAGMA)
+
+
+def french(size: int) -> str:
+    """Accented text, which needs national character sets and code page 437."""
+    return _paragraphs(
+        size,
+        lambda rng: ' '.join(_sentence(rng, FRENCH_WORDS, rng.randint(5, 15)) for _ in range(5)) + '\n\n',
+        PRAGMA
+    )
+
+
+def markdown(size: int) -> str:
+    """Markdown with headings, bold and italic runs."""
+    def paragraph(rng: random.Random) -> str:
+        words = [rng.choice(WORDS) for _ in range(60)]
+        for i in rng.sample(range(len(words)), 6):
+            words[i] = rng.choice(['**{}**', '_{}_', '*{}*', '__{}__']).format(words[i])
+        heading = '#' * rng.randint(1, 2) + ' ' + _sentence(rng, WORDS, 3)
+        return f'{heading}\n\n{" ".join(words)}\n\n'
+
+    return _paragraphs(size, paragraph)
+
+
+ESCP_CORPORA = {'prose': prose, 'nested': nested, 'boxes': boxes, 'french': french, 'forms': forms,
+                'tables': tables}
+MARKDOWN_CORPORA = {'markdown': markdown}
@@ -0,0 +1,146 @@
+"""Minimal stand-in for the `escp` package, so benchmarks run offline.
+
+Only the 9-pin commands used by the renderers are implemented, with the
+same byte sequences, so outputs and timings stay comparable.
+"""
+import sys
+from enum import Enum
+
+
+class Typeface(Enum):
+    ROMAN = 0
+    SANS_SERIF = 1
+
+
+TypeFace = Typeface
+
+
+class Margin(Enum):
+    TOP = 0
+    RIGHT = 1
+    BOTTOM = 2
+    LEFT = 3
+
+
+class PageLengthUnit(Enum):
+    LINES = 0
+    INCHES = 1
+
+
+class Justification(Enum):
+    LEFT = 0
+    CENTER = 1
+    RIGHT = 2
+    FULL = 3
+
+
+class CharacterSetVariant(Enum):
+    USA = 0
+    FRANCE = 1
+    GERMANY = 2
+    UK = 3
+    DENMARK_I = 4
+    SWEDEN = 5
+    ITALY = 6
+    SPAIN_I = 7
+    JAPAN = 8
+    NORWAY = 9
+    DENMARK_II = 10
+    SPAIN_II = 11
+    LATIN_AMERICA = 12
+    KOREA = 13
+    LEGAL = 64
+
+
+class Commands:
+    def __init__(self):
+        self.current_character_set = CharacterSetVariant.USA
+        self._buffer = bytearray()
+
+    def _append(self, data: bytes):
+        self._buffer += data
+        return self
+
+    def init(self):
+        return self._append(b'\x1b@')
+
+    def text(self, content: bytes | str | int):
+        if isinstance(content, str):
+            content = content.encode('cp437')
+        elif isinstance(content, int):
+            content = bytes([content])
+        return self._append(content)
+
+    def cr_lf(self, how_many=1):
+        return self._append(b'\r\n' * how_many)
+
+    def form_feed(self):
+        return self._append(b'\x0c')
+
+    def character_set(self, cs: CharacterSetVariant):
+        self.current_character_set = cs
+        return self._append(b'\x1bR' + bytes([cs.value]))
+
+    def bold(self, enabled: bool):
+        return self._append(b'\x1bE' if enabled else b'\x1bF')
+
+    def italic(self, enabled: bool):
+        return self._append(b'\x1b4' if enabled else b'\x1b5')
+
+    def underline(self, enabled: bool):
+        return self._append(b'\x1b-\x01' if enabled else b'\x1b-\x00')
+
+    def condensed(self, enabled: bool):
+        return self._append(b'\x1b\x0f' if enabled else b'\x1b\x12')
+
+    def character_width(self, width: int):
+        return self._append({10: b'\x1bP', 12: b'\x1bM', 15: b'\x1bg'}[width])
+
+    def double_character_width(self, enabled: bool, one_line=False):
+        return self._append(b'\x1bW' + bytes([enabled]))
+
+    def double_character_height(self, enabled: bool):
+        return self._append(b'\x1bw' + bytes([enabled]))
+
+    def proportional(self, enabled: bool):
+        return self._append(b'\x1bp' + bytes([enabled]))
+
+    def typeface(self, tf: Typeface):
+        return self._append(b'\x1bk' + bytes([tf.value]))
+
+    def justify(self, justification: Justification):
+        return self._append(b'\x1ba' + bytes([justification.value]))
+
+    def margin(self, margin: Margin, value: int):
+        return self._append({Margin.LEFT: b'\x1bl', Margin.RIGHT: b'\x1bQ'}[margin] + bytes([value]))
+
+    def page_length(self, value: int, unit: PageLengthUnit):
+        return self._append((b'\x1bC' if unit == PageLengthUnit.LINES else b'\x1bC\x00') + bytes([value]))
+
+    def line_spacing(self, numerator: int, denominator: int):
+        match numerator, denominator:
+            case 1, 6:
+                return self._append(b'\x1b2')
+            case 1, 8:
+                return self._append(b'\x1b0')
+            case n, 216:
+                return self._append(b'\x1b3' + bytes([n]))
+            case _:
+                raise ValueError(f'Invalid line spacing: {numerator}/{denominator}')
+
+    def clear(self):
+        self._buffer = bytearray()
+        return self
+
+    @property
+    def buffer(self) -> bytes:
+        return bytes(self._buffer)
+
+
+def lookup_by_pins(pins: int) -> Commands:
+    return Commands()
+
+
+def install():
+    """Make `import escp` return this module. Must run before `wp` is imported."""
+    sys.modules['escp'] = sys.modules[__name__]
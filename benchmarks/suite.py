@@ -0,0 +1,132 @@
+"""Benchmark suite for the renderer, converter and encoder hot paths.
+
+Runs every case on generated corpora of increasing size and reports
+throughput, peak traced memory and memory blocks still allocated after
+the run. Results can be written as JSON and compared with an earlier run.
+
+$ python -m benchmarks --sizes 16 64 256 --json results.json
+$ python -m benchmarks --baseline results.json
+$ python -m benchmarks --stub-escp     # without the escp package
+"""
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable
+
+from . import corpora
+
+
+def cases() -> dict[str, tuple[dict[str, Callable[[int], str]], Callable[[str], object]]]:
+    """Benchmark name -> (corpora, function under test)."""
+    # imported late so that --stub-escp can replace escp first
+    from wp.escp_bin_renderer import render_escp
+    from wp.magic_encoding import magic_encoder
+    from wp.md_bin_renderer import MarkdownToBinRenderer
+    from wp.md_escp_converter import MarkdownEscpRenderer
+
+    def encode(content: str):
+        return magic_encoder.encode(content, magic_encoder.default_character_set)
+
+    def markdown(content: str):
+        return MarkdownEscpRenderer().render(content)
+
+    return {
+        'render_escp': (corpora.ESCP_CORPORA, lambda content: render_escp(content, pins=9)),
+        'justify': (
+            {'prose': corpora.prose}, lambda content: render_escp(content, pins=9, line_breaking='justify')
+        ),
+        'compact': (
+            {'forms': corpora.forms}, lambda content: render_escp(content, pins=9, compact_whitespace=True)
+        ),
+        'encoder': ({'french': corpora.french}, encode),
+        'markdown': (corpora.MARKDOWN_CORPORA, markdown),
+        'md_to_bin': (corpora.MARKDOWN_CORPORA, lambda content: render_escp(markdown(content), pins=9)),
+        'md_direct': (corpora.MARKDOWN_CORPORA, lambda content: MarkdownToBinRenderer(9).render(content)),
+    }
+
+
+def measure(function: Callable[[str], object], content: str, repeat: int) -> dict:
+    elapsed = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function(content)
+        elapsed = min(elapsed, time.perf_counter() - start)
+
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    result = function(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    retained = sys.getallocatedblocks() - blocks
+    del result
+
+    kb = len(content.encode('utf-8')) / 1024
+    return dict(kb=round(kb, 1), seconds=elapsed, kb_per_s=kb / elapsed, peak_kb=peak / 1024, retained_blocks=retained)
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_baseline(path: str) -> dict[tuple[str, str, int], dict]:
+    with open(path, encoding='utf-8') as f:
+        results = json.load(f)['results']
+    return {(r['case'], r['corpus'], r['size']): r for r in results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the escp-wp benchmark suite')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[16, 64, 256], help='Corpus sizes in KB')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per measure, the best is kept')
+    parser.add_argument('--case', action='append', help='Only run this case (repeatable)')
+    parser.add_argument('--json', type=str, help='Write the results to this file')
+    parser.add_argument('--baseline', type=str, help='Compare throughput with an earlier --json file')
+    parser.add_argument('--stub-escp', action='store_true', help='Use a built-in stand-in for the escp package')
+    args = parser.parse_args()
+
+    if args.stub_escp:
+        from . import stub_escp
+        stub_escp.install()
+
+    baseline = load_baseline(args.baseline) if args.baseline else {}
+    selected = cases()
+    if args.case:
+        unknown = set(args.case) - set(selected)
+        if unknown:
+            parser.error(f'unknown case(s): {", ".join(sorted(unknown))}, choose from {", ".join(selected)}')
+        selected = {name: selected[name] for name in args.case}
+
+    results = []
+    print(f'{"case":<12} {"corpus":<9} {"KB":>7} {"KB/s":>9} {"peak KB":>9} {"blocks":>8} {"vs base":>8}')
+    for case, (case_corpora, function) in selected.items():
+        for corpus, generate in case_corpora.items():
+            for size in args.sizes:
+                result = dict(case=case, corpus=corpus, size=size, **measure(function, generate(size * 1024), args.repeat))
+                results.append(result)
+                previous = baseline.get((case, corpus, size))
+                change = f'{result["kb_per_s"] / previous["kb_per_s"] - 1:>+8.1%}' if previous else ''
+                print(
+                    f'{case:<12} {corpus:<9} {result["kb"]:>7.0f} {result["kb_per_s"]:>9,.0f} '
+                    f'{result["peak_kb"]:>9,.0f} {result["retained_blocks"]:>8} {change}'
+                )
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(dict(
+                revision=git_revision(),
+                python=platform.python_version(),
+                escp='stub' if args.stub_escp else 'escp',
+                results=results,
+            ), f, indent=2)
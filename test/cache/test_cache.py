@@ -0,0 +1,111 @@
+import os
+import time
+
+import pytest
+
+import wp
+from wp.cache import RenderCache
+
+
+def test_render_with_cache(tmp_path):
+    cache = RenderCache(str(tmp_path))
+    assert wp.render_escp('Lorem ipsum', pins=9, cache=cache) == b'Lorem ipsum\r\n'
+    assert wp.render_escp('Lorem ipsum', pins=9, cache=cache) == b'Lorem ipsum\r\n'
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_key_depends_on_options():
+    keys = {
+        RenderCache.key('Lorem', pins=9),
+        RenderCache.key('Lorem', pins=24),
+        RenderCache.key('Lorem', pins=9, soft_wrap=False),
+        RenderCache.key('Lorem', pins=9, init_on_render=True),
+        RenderCache.key('Lorem', pins=9, form_feed_after_render=True),
+        RenderCache.key('Lorem ', pins=9),
+    }
+    assert len(keys) == 6
+
+
+def test_cached_options_are_rendered(tmp_path):
+    cache = RenderCache(str(tmp_path))
+    assert wp.render_escp('a', pins=9, form_feed_after_render=True, cache=cache) == b'a\x0c'
+    assert wp.render_escp('a', pins=9, cache=cache) == b'a\r\n'
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = RenderCache(str(tmp_path), max_bytes=20)
+    cache.put('a', b'x' * 10)
+    cache.put('b', b'x' * 10)
+    past = time.time() - 60
+    os.utime(tmp_path / 'b.bin', (past, past))
+    assert cache.get('a') is not None
+    cache.put('c', b'x' * 10)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == b'x' * 10
+    assert cache.get('c') == b'x' * 10
+
+
+def test_key_depends_on_files(tmp_path):
+    path = tmp_path / 'logo.pgm'
+    path.write_bytes(b'P5 1 1 255\n\x00')
+    key = RenderCache.key('[image:logo.pgm]', pins=9, files=[str(path)])
+    os.utime(path, ns=(0, 0))
+    assert RenderCache.key('[image:logo.pgm]', pins=9, files=[str(path)]) != key
+
+
+def test_changed_image_is_rendered(tmp_path):
+    pytest.importorskip('numpy')
+    cache = RenderCache(str(tmp_path / 'cache'))
+    path = tmp_path / 'logo.pgm'
+    content = f'[image:{path}]'
+    path.write_bytes(b'P5 8 8 255\n' + b'\x00' * 64)
+    black = wp.render_escp(content, pins=9, cache=cache)
+    path.write_bytes(b'P5 8 8 255\n' + b'\x00\xff' * 32)
+    os.utime(path, ns=(0, 0))
+
+    assert wp.render_escp(content, pins=9, cache=cache) != black
+    assert cache.hits == 0
+
+
+def test_entry_evicted_by_another_process(tmp_path, monkeypatch):
+    cache = RenderCache(str(tmp_path))
+    cache.put('a', b'x')
+    utime = os.utime
+
+    def evicted(path, *args, **kwargs):
+        os.remove(path)
+        utime(path, *args, **kwargs)
+
+    monkeypatch.setattr(os, 'utime', evicted)
+    assert cache.get('a') is None
+    assert (cache.hits, cache.misses) == (0, 1)
+
+
+def test_evict_skips_removed_entries(tmp_path, monkeypatch):
+    cache = RenderCache(str(tmp_path), max_bytes=10)
+    cache.put('a', b'x' * 10)
+    remove = os.remove
+
+    def removed_twice(path):
+        remove(path)
+        remove(path)
+
+    monkeypatch.setattr(os, 'remove', removed_twice)
+    cache.put('b', b'x' * 10)
+    assert cache.get('b') == b'x' * 10
+
+
+def test_put_scans_only_over_max_bytes(tmp_path, monkeypatch):
+    (tmp_path / 'old.bin').write_bytes(b'x' * 10)
+    cache = RenderCache(str(tmp_path), max_bytes=30)
+    assert cache.size == 10
+    scans = []
+    scandir = os.scandir
+    monkeypatch.setattr(os, 'scandir', lambda path: scans.append(path) or scandir(path))
+    cache.put('a', b'x' * 10)
+    cache.put('b', b'x' * 10)
+    assert scans == []
+    cache.put('c', b'x' * 10)
+    assert len(scans) == 1
+    assert cache.size == 30
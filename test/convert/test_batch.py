@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+from wp.convert import batch_destination, convert_batch, convert_file
+from wp.escp_bin_renderer import render_escp
+
+
+@pytest.fixture
+def sources(tmp_path):
+    source_dir = tmp_path / 'in'
+    source_dir.mkdir()
+    (source_dir / 'a.escp.txt').write_text('Lorem', encoding='utf-8')
+    (source_dir / 'b.escp.txt').write_text('[bold:on]ipsum[bold:off]', encoding='utf-8')
+    return source_dir
+
+
+def test_batch_destination():
+    assert batch_destination('in/a.escp.txt', 'out') == os.path.join('out', 'a.escp.bin')
+    assert batch_destination('in/a.md', 'out') == os.path.join('out', 'a.escp.txt')
+
+
+def test_convert_batch(sources, tmp_path):
+    out_dir = tmp_path / 'out'
+    results = convert_batch(str(sources), str(out_dir), 9)
+
+    assert [seconds is not None for _, _, seconds in results] == [True, True]
+    assert (out_dir / 'a.escp.bin').read_bytes() == render_escp('Lorem', pins=9)
+    assert (out_dir / 'b.escp.bin').read_bytes() == render_escp('[bold:on]ipsum[bold:off]', pins=9)
+
+
+def test_convert_batch_parallel(sources, tmp_path):
+    results = convert_batch(str(sources / '*.txt'), str(tmp_path / 'out'), 9, jobs=2)
+    assert len(results) == 2
+    assert (tmp_path / 'out' / 'b.escp.bin').exists()
+
+
+def test_convert_batch_skips_up_to_date(sources, tmp_path):
+    out_dir = str(tmp_path / 'out')
+    convert_batch(str(sources), out_dir, 9)
+    (sources / 'b.escp.txt').write_text('changed', encoding='utf-8')
+
+    results = convert_batch(str(sources), out_dir, 9)
+    assert [seconds is None for _, _, seconds in results] == [True, False]
+    assert (tmp_path / 'out' / 'b.escp.bin').read_bytes() == render_escp('changed', pins=9)
+
+
+def test_convert_batch_does_not_overwrite_sources(tmp_path):
+    (tmp_path / 'hello.md').write_text('# Hello there', encoding='utf-8')
+    (tmp_path / 'hello.escp.txt').write_text('Hand written', encoding='utf-8')
+
+    with pytest.raises(ValueError, match='overwrite'):
+        convert_batch(str(tmp_path), str(tmp_path), 9)
+    assert (tmp_path / 'hello.escp.txt').read_text(encoding='utf-8') == 'Hand written'
+    assert not (tmp_path / 'hello.escp.bin').exists()
+
+
+def test_convert_batch_same_destination(tmp_path):
+    for directory in ('a', 'b'):
+        (tmp_path / directory).mkdir()
+        (tmp_path / directory / 'x.escp.txt').write_text('Lorem', encoding='utf-8')
+
+    with pytest.raises(ValueError, match='both'):
+        convert_batch(str(tmp_path / '*' / '*.txt'), str(tmp_path / 'out'), 9)
+    assert not (tmp_path / 'out' / 'x.escp.bin').exists()
+
+
+def test_convert_file_with_cache_reports_unencodable(tmp_path, capsys):
+    source = tmp_path / 'a.escp.txt'
+    source.write_text('Lorem 中', encoding='utf-8')
+    destination = tmp_path / 'a.escp.bin'
+    convert_file(str(source), str(destination), 9, cache_dir=str(tmp_path / 'cache'))
+    assert f"{source}: cannot print '中' at line 1, column 7" in capsys.readouterr().err
+    rendered = destination.read_bytes()
+
+    destination.unlink()
+    convert_file(str(source), str(destination), 9, cache_dir=str(tmp_path / 'cache'))
+    assert destination.read_bytes() == rendered == render_escp('Lorem 中', pins=9)
@@ -0,0 +1,128 @@
+import glob
+import hashlib
+import json
+import os
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from wp.emulator import Emulator, font, rasterize, write_pgm, write_png  # noqa: E402
+from wp.escp_bin_renderer import EscpToBinRenderer  # noqa: E402
+
+GOLDEN = os.path.join(os.path.dirname(__file__), 'golden.json')
+SAMPLES = os.path.join(os.path.dirname(__file__), '..', '..', 'samples')
+
+
+def ink(page) -> tuple[int, int, int, int]:
+    """Bounding box of the printed dots: top, left, bottom, right."""
+    rows = np.nonzero(page.any(axis=1))[0]
+    columns = np.nonzero(page.any(axis=0))[0]
+    return rows[0], columns[0], rows[-1] + 1, columns[-1] + 1
+
+
+def test_page_size():
+    [page] = rasterize(b'')
+    assert page.shape == (792, 1020)
+    assert not page.any()
+
+
+def test_text_advances_one_cell_per_character():
+    [page] = rasterize(b'HH')
+    top, left, bottom, right = ink(page)
+    assert (left, right) == (0, 12 + 10)
+    assert (top, bottom) == (0, 7)
+
+
+def test_pitch():
+    assert ink(rasterize(b'\x1bMHH')[0])[3] == 10 + 5
+
+
+def test_line_feed():
+    [page] = rasterize(b'H\r\nH')
+    assert page[12:19].any() and not page[7:12].any()
+    [page] = rasterize(b'\x1b3\x6cH\r\nH')
+    assert page[36:43].any() and not page[7:36].any()
+
+
+def test_styles():
+    plain = rasterize(b'H')[0].sum()
+    assert rasterize(b'\x1bEH')[0].sum() > plain
+    assert ink(rasterize(b'\x1bW\x01H')[0])[3] == 20
+    assert ink(rasterize(b'\x1bw\x01H')[0])[2] == 14
+    assert rasterize(b'\x1b-\x01 ')[0][8, :12].all()
+
+
+def test_margins():
+    assert ink(rasterize(b'\x1bl\x05\rH')[0])[1] == 60
+    # text beyond the right margin goes on the next line
+    [page] = rasterize(b'\x1bQ\x02HHH')
+    assert page[12:19, :10].any()
+
+
+def test_box_lines_join():
+    [page] = rasterize(b'\xc4\xc4\xc4')
+    assert page[4, :36].all()
+
+
+def test_accents():
+    glyphs = font(0, 12)
+    assert glyphs[0x82].sum() > glyphs[ord('e')].sum()
+    # 'é' in the French character set
+    assert (font(1, 12)[ord('{')] == glyphs[0x82]).all()
+
+
+def test_form_feed():
+    pages = rasterize(b'a\x0cb\x0c')
+    assert len(pages) == 2
+    assert all(page.any() for page in pages)
+
+
+def test_page_length():
+    pages = rasterize(b'\x1bC\x02a\r\nb\r\nc')
+    assert len(pages) == 2
+    assert pages[0].shape[0] == 24
+
+
+def test_bit_image():
+    # 8-dot single density: one column every 2 dots
+    [page] = rasterize(b'\x1b*\x00\x02\x00\xff\x81')
+    assert page[:8, 0].all() and not page[:, 1].any()
+    assert page[0, 2] and page[7, 2] and not page[1:7, 2].any()
+
+
+def test_feed_in_chunks():
+    data = EscpToBinRenderer(9).render('[bold:on]Hello[bold:off] world\n[underline:on]x[underline:off]\n')
+    emulator = Emulator()
+    for i in range(len(data)):
+        emulator.feed(data[i:i + 1])
+    assert all((a == b).all() for a, b in zip(emulator.finish(), rasterize(data)))
+
+
+def test_write_images(tmp_path):
+    page = np.zeros((3, 10), dtype=bool)
+    page[1, 2] = True
+    write_pgm(tmp_path / 'page.pgm', page)
+    assert (tmp_path / 'page.pgm').read_bytes() == b'P5 10 3 255\n' + bytes([255] * 12 + [0] + [255] * 17)
+    write_png(tmp_path / 'page.png', page)
+    assert (tmp_path / 'page.png').read_bytes().startswith(b'\x89PNG\r\n\x1a\n')
+
+
+def sample_digests() -> dict[str, list[str]]:
+    digests = {}
+    for path in sorted(glob.glob(os.path.join(SAMPLES, '*.escp.txt'))):
+        with open(path, encoding='utf-8') as f:
+            pages = rasterize(EscpToBinRenderer(9).render(f.read()))
+        digests[os.path.basename(path)] = [hashlib.sha256(np.packbits(page).tobytes()).hexdigest() for page in pages]
+    return digests
+
+
+def test_samples_match_golden_pages():
+    """Set WP_UPDATE_GOLDEN=1 to record the pages after an intended change."""
+    digests = sample_digests()
+    if os.environ.get('WP_UPDATE_GOLDEN'):
+        with open(GOLDEN, 'w', encoding='utf-8') as f:
+            json.dump(digests, f, indent=2, sort_keys=True)
+            f.write('\n')
+    with open(GOLDEN, encoding='utf-8') as f:
+        assert digests == json.load(f)
@@ -231,4 +231,33 @@ def test_init(renderer):
 def test_colon(renderer):
     content = 'cpi:10'
     expected = b'cpi:10\r\n'
-    assert renderer.render(content=content) == expected
\ No newline at end of file
+    assert renderer.render(content=content) == expected
+
+
+def test_box_cpi_12(renderer):
+    content = '[cpi:12][box:on:thickness:1]Hi[box:off]'
+    expected = (
+            b'\x1bM' +
+            b'\xda' + b'\xc4' * 75 + b'\xbf' + b'\r\n' +
+            b'\xb3' + b' ' * 36 + b'Hi' + b' ' * 37 + b'\xb3' + b'\r\n' +
+            b'\xc0' + b'\xc4' * 75 + b'\xd9' + b'\r\n'
+    )
+    assert renderer.render(content=content) == expected
+
+
+def test_wrap_cpi_15_with_margin(renderer):
+    content = '[cpi:15][margin:left:5]' + 'abcd ' * 30
+    expected = b'\x1bg\x1bl\x05' + b'abcd ' * 10 + b'\r\n' + b'abcd ' * 10 + b'\r\n' + b'abcd ' * 10 + b'\r\n'
+    assert renderer.render(content=content) == expected
+
+
+# Widths are exact at 15 cpi: the Decimal widths of earlier versions, rounded up, made a line of
+# exactly 60 characters overflow, dropping the blank after it and wrapping a 60 character word early.
+def test_cpi_15_full_line_keeps_blank(renderer):
+    content = '[cpi:15]' + 'abcd ' * 12 + 'next'
+    assert renderer.render(content=content) == b'\x1bg' + b'abcd ' * 12 + b'\r\nnext\r\n'
+
+
+def test_cpi_15_word_as_wide_as_line(renderer):
+    content = '[cpi:15]' + 'x' * 60 + ' next'
+    assert renderer.render(content=content) == b'\x1bg' + b'x' * 60 + b'\r\nnext\r\n'
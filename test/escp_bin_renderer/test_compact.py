@@ -0,0 +1,101 @@
+import pytest
+
+from wp.escp_bin_renderer import EscpToBinRenderer
+from wp.escp_stream import page_offsets
+
+FORM = (
+    '[pragma:escp-wp][soft-wrap:on][line-spacing:36:216][page-length:lines:8]\n'
+    'Invoice                                   No 42    \n\n\n\n'
+    'Name:          [underline:on]Dupont         [underline:off]      Date:      12/03   \n'
+    '[box:on:thickness:1]Total     100 EUR[box:off]\n\n'
+    '[cpi:12]Item                  Qty          Price\n'
+    'Paper                   2           9.90\n\n\n\n\n\n\n'
+    '[proportional:on]Wim[proportional:off]          end\n'
+    '[justification:center]centered       text\n'
+)
+
+
+@pytest.fixture
+def renderer():
+    return EscpToBinRenderer(9, compact_whitespace=True)
+
+
+def test_blank_run_becomes_absolute_position(renderer):
+    # 25 characters at 10 cpi = 150/60 inch
+    assert renderer.render('Name:                    X') == b'Name:\x1b$\x96\x00X\r\n'
+
+
+def test_short_blank_runs_are_printed(renderer):
+    assert renderer.render('a  b    c') == b'a  b    c\r\n'
+
+
+def test_blanks_at_end_of_line_are_dropped(renderer):
+    assert renderer.render('a      \nb ') == b'a\r\nb\r\n'
+
+
+def test_underlined_blanks_are_printed(renderer):
+    output = renderer.render('a[underline:on]      [underline:off]b')
+    assert output == b'a\x1b-\x01      \x1b-\x00b\r\n'
+
+
+def test_blanks_after_proportional_text_are_printed(renderer):
+    output = renderer.render('[proportional:on]W[proportional:off]      b')
+    assert output == b'\x1bp\x01W\x1bp\x00      b\r\n'
+
+
+def test_blanks_in_centered_text_are_printed(renderer):
+    assert renderer.render('[justification:center]a      b') == b'\x1ba\x01a      b\r\n'
+
+
+def test_trailing_blanks_in_centered_text_are_printed(renderer):
+    assert renderer.render('[justification:right]a   \nb') == b'\x1ba\x02a   \r\nb\r\n'
+
+
+def test_margin_change_mid_line(renderer):
+    emulator = pytest.importorskip('wp.emulator')
+    content = '      [margin:left:2]a         world\n         b'
+    compact = emulator.rasterize(renderer.render(content))
+    plain = emulator.rasterize(EscpToBinRenderer(9).render(content))
+    assert all((a == b).all() for a, b in zip(compact, plain))
+
+
+def test_line_feed_run_becomes_feed(renderer):
+    # 4 lines of 36/216 inch
+    assert renderer.render('a\n\n\n\nb') == b'a\r\x1bJ\x90b\r\n'
+
+
+def test_short_line_feed_runs_are_printed(renderer):
+    assert renderer.render('a\n\nb') == b'a\r\n\r\nb\r\n'
+
+
+def test_long_feeds_are_split(renderer):
+    # 20 lines of 36/216 inch
+    assert renderer.render('a' + '\n' * 20 + 'b') == b'a\r\x1bJ\xff\x1bJ\xff\x1bJ\xd2b\r\n'
+
+
+def test_feeds_paginate(renderer):
+    output = renderer.render(FORM)
+    assert renderer.page_offsets == page_offsets(output)
+    plain = EscpToBinRenderer(9)
+    plain.render(FORM)
+    assert len(renderer.page_offsets) == len(plain.page_offsets)
+
+
+def test_compact_output_is_shorter(renderer):
+    assert len(renderer.render(FORM)) < 0.8 * len(EscpToBinRenderer(9).render(FORM))
+
+
+def test_prints_the_same_pages(renderer):
+    emulator = pytest.importorskip('wp.emulator')
+    compact = emulator.rasterize(renderer.render(FORM))
+    plain = emulator.rasterize(EscpToBinRenderer(9).render(FORM))
+    assert len(compact) == len(plain)
+    assert all((a == b).all() for a, b in zip(compact, plain))
+
+
+def test_stream_and_incremental_match(renderer):
+    from wp.incremental import IncrementalDocument
+
+    output = renderer.render(FORM)
+    assert b''.join(EscpToBinRenderer(9, compact_whitespace=True).render_stream([FORM[:70], FORM[70:]])) == output
+    assert IncrementalDocument(EscpToBinRenderer(9, compact_whitespace=True), FORM).output == output
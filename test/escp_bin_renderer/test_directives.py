@@ -0,0 +1,50 @@
+import pytest
+
+from wp.escp_bin_renderer import EscpToBinRenderer
+
+
+@pytest.fixture
+def renderer():
+    return EscpToBinRenderer(9)
+
+
+def test_handlers_resolved_per_class():
+    assert EscpToBinRenderer.handlers['line-spacing'] is EscpToBinRenderer.render_line_spacing
+    assert EscpToBinRenderer.handlers['text'] is EscpToBinRenderer.render_text
+
+
+def test_helpers_are_not_handlers():
+    assert not {'children', 'start', 'end', 'stream', 'to', 'tree'} & set(EscpToBinRenderer.handlers)
+
+
+def test_custom_directive(renderer):
+    renderer.register_directive('stars', lambda r, node: r.text('*' * int(node.value[0])))
+    assert renderer.render('a[stars:3]') == b'a***\r\n'
+
+
+def test_custom_paired_directive(renderer):
+    def shout(r, node):
+        r.text('>')
+        r.render_children(node)
+        r.text('<')
+
+    renderer.register_directive('shout', shout, paired=True)
+    assert renderer.render('[shout:on]hi[shout:off]') == b'>hi<\r\n'
+
+
+def test_custom_paired_directive_unbalanced(renderer):
+    renderer.register_directive('shout', lambda r, node: None, paired=True)
+    with pytest.raises(ValueError, match='Unexpected closing directive: shout'):
+        renderer.render('[bold:on][shout:off][bold:off]')
+
+
+def test_custom_directive_is_per_renderer(renderer):
+    renderer.register_directive('stars', lambda r, node: None)
+    assert 'stars' not in EscpToBinRenderer.handlers
+    with pytest.raises(ValueError, match='Unknown directive: stars'):
+        EscpToBinRenderer(9).render('[stars:3]')
+
+
+def test_override_builtin_handler(renderer):
+    renderer.register_handler('space', lambda r, node: r.text('_' * node.value))
+    assert renderer.render('a  b') == b'a__b\r\n'
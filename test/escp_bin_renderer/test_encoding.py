@@ -0,0 +1,38 @@
+import pytest
+
+from wp.escp_bin_renderer import EscpToBinRenderer, UnencodableCharacter
+from wp.magic_encoding import magic_encoder, CharacterSetVariant
+
+
+@pytest.fixture
+def renderer():
+    return EscpToBinRenderer(9)
+
+
+def test_switch_once_for_consecutive_words(renderer):
+    expected = b'\x1bR\x01{t{ d{j@\x1bR\x00\r\n'
+    assert renderer.render(content='été déjà') == expected
+
+
+def test_switch_back_for_national_code(renderer):
+    expected = b'\x1bR\x01{\x1bR\x00@\r\n'
+    assert renderer.render(content='é@') == expected
+
+
+def test_plain_substitutions(renderer):
+    assert renderer.render(content='l’œuvre…') == b"l'oeuvre...\r\n"
+
+
+def test_unencodable_characters(renderer):
+    assert renderer.render(content='ab 中\nx 😀') == b'ab ?\r\nx ?\r\n'
+    assert renderer.unencodable == [UnencodableCharacter('中', 1, 4), UnencodableCharacter('😀', 2, 3)]
+
+
+def test_init_resets_character_set(renderer):
+    expected = b'\x1bR\x01{\x1b@\x1bR\x01{\x1bR\x00\r\n'
+    assert renderer.render(content='é[init]é') == expected
+
+
+def test_encoder_keeps_variant():
+    encoded, character_set, unencodable = magic_encoder.encode('ç', CharacterSetVariant.FRANCE)
+    assert (encoded, character_set, unencodable) == (b'\\', CharacterSetVariant.FRANCE, [])
@@ -0,0 +1,72 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from wp.emulator import rasterize  # noqa: E402
+from wp.escp_bin_renderer import EscpToBinRenderer  # noqa: E402
+from wp.escp_stream import page_offsets  # noqa: E402
+from wp.incremental import IncrementalDocument  # noqa: E402
+
+# 8/72 inch band, fed with ESC J 24/216 inch
+FEED = b'\x1bJ\x18'
+
+
+@pytest.fixture
+def renderer():
+    return EscpToBinRenderer(9)
+
+
+@pytest.fixture
+def square(tmp_path):
+    """A 20 x 12 pixel black image."""
+    path = tmp_path / 'square.pgm'
+    path.write_bytes(b'P5 20 12 255\n' + bytes(20 * 12))
+    return str(path)
+
+
+def test_image_bands(renderer, square):
+    output = renderer.render(f'[image:{square}]')
+    # 20 dots wide and 12 * 72 / 120 = 7 rows high, a single band
+    band = b'\x1b*\x01\x14\x00' + b'\xfe' * 20
+    assert output == band + b'\r' + FEED + b'\r\n'
+
+
+def test_image_starts_on_a_new_line(renderer, square):
+    output = renderer.render(f'Logo [image:{square}]\nText\n')
+    assert output.startswith(b'Logo \r\n\x1b*')
+    assert FEED + b'Text\r\n' in output
+
+
+def test_image_width_in_characters(renderer, square):
+    # 10 characters at 12 cpi = 5/6 inch = 100 dots, by 36 rows
+    output = renderer.render(f'[cpi:12][image:{square}:10:threshold]')
+    assert output.count(b'\x1b*\x01\x64\x00') == 5
+
+
+def test_image_fits_the_printable_width(renderer, square):
+    output = renderer.render(f'[margin:left:0][margin:right:10][image:{square}:40]')
+    # 1 inch
+    assert b'\x1b*\x01\x78\x00' in output
+
+
+def test_unknown_dithering(renderer, square):
+    with pytest.raises(ValueError, match='Unknown dithering'):
+        renderer.render(f'[image:{square}:random]')
+
+
+def test_image_prints_at_its_position(renderer, square):
+    [page] = rasterize(renderer.render(f'Title\n[image:{square}:threshold]\n'))
+    rows, columns = np.nonzero(page[12:])
+    # the image starts on the second line (12 rows), below the title
+    assert (rows.min(), rows.max(), columns.min(), columns.max()) == (0, 6, 0, 19)
+
+
+def test_image_paginates(square):
+    # 33 bands of 8 rows, 9 per page
+    content = '[page-length:inches:1]' + f'[image:{square}:60]\n' * 2 + 'end\n'
+    renderer = EscpToBinRenderer(9)
+    output = renderer.render(content)
+    assert renderer.page_offsets == page_offsets(output)
+    assert len(rasterize(output)) == len(renderer.page_offsets) + 1 == 8
+    assert IncrementalDocument(EscpToBinRenderer(9), content).output == output
+    assert b''.join(EscpToBinRenderer(9).render_stream([content])) == output
@@ -0,0 +1,97 @@
+import pytest
+
+from wp.escp_bin_renderer import EscpToBinRenderer
+from wp.incremental import IncrementalDocument
+
+DOCUMENT = ''.join(f'Paragraph {i} with [bold:on]some[bold:off] words.\n\n' for i in range(20))
+
+
+@pytest.fixture
+def renderer():
+    return EscpToBinRenderer(9)
+
+
+def render(content: str) -> bytes:
+    return EscpToBinRenderer(9).render(content)
+
+
+def test_snapshot_restore(renderer):
+    renderer.render('[cpi:12][margin:left:5]abc')
+    checkpoint = renderer.snapshot()
+    renderer.render('[cpi:15]def\n')
+    renderer.restore(checkpoint)
+    assert renderer.snapshot() == checkpoint
+    assert renderer.char_width == 30
+
+
+def test_initial_output(renderer):
+    assert IncrementalDocument(renderer, DOCUMENT).output == render(DOCUMENT)
+
+
+def test_edit_rerenders_one_segment(renderer):
+    document = IncrementalDocument(renderer, DOCUMENT)
+    position = DOCUMENT.index('words', len(DOCUMENT) // 2)
+    assert document.edit(position, position + len('words'), 'other words') == 1
+    assert document.output == render(document.content)
+
+
+def test_state_change_propagates(renderer):
+    document = IncrementalDocument(renderer, DOCUMENT)
+    position = DOCUMENT.index('Paragraph 10')
+    # from the paragraph before, which may end differently, to the end
+    assert document.edit(position, position, '[cpi:12]') == 11
+    assert document.output == render(document.content)
+    assert document.edit(position, position + len('[cpi:12]'), '') == 11
+    assert document.output == render(DOCUMENT)
+
+
+@pytest.mark.parametrize('text', ['\n', '\n\n', '', 'x', '[underline:on]a\n\nb[underline:off]'])
+@pytest.mark.parametrize('position', [0, 1, 10, 46, 47, 48, len(DOCUMENT)])
+def test_edits(renderer, position, text):
+    document = IncrementalDocument(renderer, DOCUMENT)
+    document.edit(position, min(position + 1, len(DOCUMENT)), text)
+    document.edit(position, position, text)
+    assert document.output == render(document.content)
+
+
+def test_unencodable_lines_shift(renderer):
+    content = 'a\n\nb\n\n☃'
+    document = IncrementalDocument(renderer, content)
+    document.edit(0, 0, 'new line\n\n')
+    full = EscpToBinRenderer(9)
+    full.render(document.content)
+    assert document.unencodable == full.unencodable
+    assert document.unencodable[0].line == 7
+
+
+def test_failed_edit_leaves_document_unchanged(renderer):
+    document = IncrementalDocument(renderer, DOCUMENT)
+    with pytest.raises(ValueError, match='Unknown directive'):
+        document.edit(0, 0, '[nope]')
+    assert document.content == DOCUMENT
+    assert document.output == render(DOCUMENT)
+
+
+def test_failed_render_leaves_document_unchanged(renderer):
+    content = '[page-length:lines:4]' + DOCUMENT
+    document = IncrementalDocument(renderer, content)
+    # the margin side is only looked up once the text before it is rendered
+    with pytest.raises(RuntimeError):
+        document.edit(30, 30, 'Lorem ipsum dolor sit amet, consectetur adipiscing [margin:foo:4]')
+    expected = EscpToBinRenderer(9)
+    assert document.output == expected.render(content)
+    assert document.page_offsets == expected.page_offsets
+
+
+def test_edit_after_failed_edit_inside_style():
+    content = 'First [double-width:on]wide text[double-width:off] here.\n\nSecond paragraph.\n\nThird          end.\n'
+    document = IncrementalDocument(EscpToBinRenderer(9, compact_whitespace=True), content)
+    with pytest.raises(RuntimeError):
+        document.edit(content.index('wide'), content.index('wide'), 'x [margin:foo:4]')
+    document.edit(content.index('Third'), content.index('Third'), 'The ')
+    assert document.output == EscpToBinRenderer(9, compact_whitespace=True).render(document.content)
+
+
+def test_optimizer_not_supported():
+    with pytest.raises(ValueError):
+        IncrementalDocument(EscpToBinRenderer(9, optimize=True), DOCUMENT)
@@ -0,0 +1,84 @@
+import pytest
+
+from wp.escp_bin_renderer import EscpToBinRenderer
+from wp.linebreak import PROPORTIONAL_WIDTHS, break_lines, proportional_width, word_width
+
+# 6 characters per line at 10 cpi
+HEADER = '[pragma:escp-wp][margin:right:6]'
+TEXT = 'aaa bb cc dddddd\n'
+
+
+def lines(output: bytes) -> list[str]:
+    return output.decode('cp437').split('\r\n')[:-2]
+
+
+def test_break_lines_balances_lines():
+    # greedy would give 'aaa bb' / 'cc' / 'dddddd'
+    assert break_lines([3, 2, 2, 6], 1, 6, 6) == [1, 3]
+    assert break_lines([3, 2, 2, 2], 1, 10, 10) == [3]
+
+
+def test_break_lines_first_line():
+    assert break_lines([3, 2, 2, 6], 1, 3, 6) == [1, 3]
+    assert break_lines([2, 2], 1, 5, 10) == []
+
+
+def test_break_lines_long_word():
+    assert break_lines([2, 12, 2], 1, 10, 10) == [1, 2]
+
+
+def test_word_width():
+    assert word_width('abc', 36, False, False) == 108
+    assert word_width('abc', 36, False, True) == 216
+    assert word_width('ill', 36, True, False) < word_width('mmm', 36, True, False)
+
+
+def test_greedy_is_default():
+    assert lines(EscpToBinRenderer(9).render(HEADER + TEXT)) == ['\x1bQ\x06aaa bb', 'cc ', 'dddddd']
+
+
+def test_optimal():
+    output = EscpToBinRenderer(9).render(HEADER + '[line-breaking:optimal]' + TEXT)
+    assert lines(output) == ['\x1bQ\x06aaa', 'bb cc', 'dddddd']
+
+
+def test_justify():
+    output = EscpToBinRenderer(9, line_breaking='justify').render(HEADER + 'a bb cc dddddd\n')
+    # the last line is not justified
+    assert lines(output) == ['\x1bQ\x06a   bb', 'cc', 'dddddd']
+
+
+def test_styled_runs_are_broken_separately():
+    content = HEADER + '[line-breaking:optimal]aaa [bold:on]bb cc[bold:off] dddddd\n'
+    assert lines(EscpToBinRenderer(9).render(content)) == ['\x1bQ\x06aaa \x1bEbb', 'cc\x1bF', 'dddddd']
+
+
+def test_proportional_widths():
+    content = '[margin:right:20][line-breaking:optimal][proportional:on]' + 'ill ' * 20 + '[proportional:off]\n'
+    # narrow letters: more than 20 characters per line
+    assert len(lines(EscpToBinRenderer(9).render(content))[1]) > 20
+
+
+def test_proportional_width_table():
+    assert all(chr(code) in PROPORTIONAL_WIDTHS for code in range(0x20, 0x7f))
+    assert proportional_width('0') == 36
+    assert proportional_width('é') == proportional_width('e')
+    assert proportional_width('€') == 36
+
+
+@pytest.mark.parametrize('line_breaking', ['optimal', 'justify'])
+def test_paragraphs_go_through_text_handler(line_breaking):
+    renderer = EscpToBinRenderer(9, line_breaking=line_breaking)
+    stats = renderer.enable_stats()
+    texts = []
+    renderer.register_handler('text', lambda renderer, node: texts.append(node.value))
+    renderer.render('aaa bb cc\n')
+    assert texts == ['aaa bb cc']
+    assert stats.directives['text'].count == 1
+
+
+def test_unknown_line_breaking():
+    with pytest.raises(ValueError):
+        EscpToBinRenderer(9, line_breaking='balanced')
+    with pytest.raises(ValueError):
+        EscpToBinRenderer(9).render('[line-breaking:balanced]')
@@ -0,0 +1,50 @@
+from wp.escp_bin_renderer import EscpToBinRenderer
+from wp.escp_stream import tokenize
+from wp.optimizer import Optimizer, optimize
+
+
+def test_adjacent_toggles():
+    assert optimize(b'\x1bEa\x1bF\x1bEb\x1bF') == b'\x1bEab\x1bF'
+
+
+def test_empty_toggle():
+    assert optimize(b'\x1b@a\x1b4\x1b5b') == b'\x1b@ab'
+
+
+def test_first_command_kept_before_init():
+    # the printer state is unknown before ESC @
+    assert optimize(b'\x1bFa') == b'\x1bFa'
+    assert optimize(b'\x1b@\x1bFa') == b'\x1b@a'
+
+
+def test_modes_deferred_past_line_feed():
+    assert optimize(b'a\x1bE\r\n\x1bF\x1bE\r\nb\x1bF') == b'a\r\n\r\n\x1bEb\x1bF'
+
+
+def test_character_set_kept_for_plain_text():
+    assert optimize(b'\x1bR\x01{\x1bR\x00 \x1bR\x01{\x1bR\x00') == b'\x1bR\x01{ {\x1bR\x00'
+
+
+def test_other_commands_flush():
+    assert optimize(b'\x1bE\x1bl\x05a\x1bF') == b'\x1bE\x1bl\x05a\x1bF'
+
+
+def test_feed_in_chunks():
+    data = b'\x1bEa\x1bF\x1bEb\x1bF\x1b-\x01c\x1b-\x00'
+    optimizer = Optimizer()
+    output = b''.join(optimizer.feed(data[i:i + 1]) for i in range(len(data))) + optimizer.flush()
+    assert output == optimize(data)
+
+
+def test_renderer_option():
+    content = '[bold:on]a[bold:off][bold:on]b[bold:off]'
+    renderer = EscpToBinRenderer(9, optimize=True)
+    # the final mode change is only sent at the end of the stream
+    assert renderer.render(content) == b'\x1bEab\r\n\x1bF'
+    assert b''.join(EscpToBinRenderer(9, optimize=True).render_stream([content])) == b'\x1bEab\r\n\x1bF'
+
+
+def test_tokenize():
+    assert list(tokenize(b'\x1bEab\r\x1bC\x00\x0b')) == [
+        ('command', b'\x1bE'), ('text', b'ab'), ('control', b'\r'), ('command', b'\x1bC\x00\x0b')
+    ]
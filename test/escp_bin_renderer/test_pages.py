@@ -0,0 +1,81 @@
+import pytest
+
+from wp.escp_bin_renderer import EscpToBinRenderer
+from wp.incremental import IncrementalDocument
+
+LINES = ''.join(f'line {i}\n' for i in range(10))
+# 36/216 inch = 180/1080 inch per line, 4 lines per page
+HEADER = '[line-spacing:36:216][page-length:lines:4]'
+
+
+@pytest.fixture
+def renderer():
+    return EscpToBinRenderer(9)
+
+
+def test_no_page_length_no_form_feed(renderer):
+    assert b'\x0c' not in renderer.render(LINES)
+    assert renderer.page_offsets == []
+
+
+def test_form_feed_every_page(renderer):
+    output = renderer.render(HEADER + LINES)
+    assert output.count(b'\x0c') == 2
+    # the form feed replaces the line feed at the end of the page
+    assert output.split(b'\x0c')[1] == b'line 4\r\nline 5\r\nline 6\r\nline 7'
+    assert [output[offset:offset + 6] for offset in renderer.page_offsets] == [b'line 4', b'line 8']
+
+
+def test_page_length_in_inches(renderer):
+    # 6 lines per inch
+    output = renderer.render('[line-spacing:1:6][page-length:inches:1]' + LINES)
+    assert output.count(b'\x0c') == 1
+    assert output[renderer.page_offsets[0]:].startswith(b'line 6')
+
+
+def test_double_height_takes_two_lines(renderer):
+    output = renderer.render(HEADER + 'a\nb\n[double-height:on]c\nd[double-height:off]\n')
+    assert output[renderer.page_offsets[0]:].startswith(b'd')
+
+
+def test_last_line_does_not_start_a_page(renderer):
+    renderer.render(HEADER + 'a\nb\nc\nd')
+    assert renderer.page_offsets == []
+
+
+def test_stream_page_offsets(renderer):
+    output = renderer.render(HEADER + LINES)
+    offsets = renderer.page_offsets
+    streamed = b''.join(EscpToBinRenderer(9).render_stream([HEADER, LINES[:20], LINES[20:]]))
+    assert streamed == output
+    stream_renderer = EscpToBinRenderer(9)
+    list(stream_renderer.render_stream([HEADER, LINES[:20], LINES[20:]]))
+    assert stream_renderer.page_offsets == offsets
+
+
+def test_optimized_page_offsets():
+    renderer = EscpToBinRenderer(9, optimize=True)
+    output = renderer.render(HEADER + '[bold:on][bold:off]' + LINES)
+    assert [output[offset:offset + 6] for offset in renderer.page_offsets] == [b'line 4', b'line 8']
+
+
+@pytest.mark.parametrize('lines', [2, 4])
+def test_optimized_last_line_does_not_start_a_page(lines):
+    # the character set is restored after the last form feed
+    content = '[page-length:lines:2]' + '\n'.join(['déjà vu'] * lines)
+    renderer = EscpToBinRenderer(9, optimize=True)
+    renderer.render(content)
+    stream_renderer = EscpToBinRenderer(9, optimize=True)
+    list(stream_renderer.render_stream([content]))
+    plain_renderer = EscpToBinRenderer(9)
+    plain_renderer.render(content)
+    assert len(renderer.page_offsets) == len(plain_renderer.page_offsets) == lines // 2 - 1
+    assert stream_renderer.page_offsets == renderer.page_offsets
+
+
+def test_incremental_page_offsets(renderer):
+    document = IncrementalDocument(renderer, HEADER + LINES)
+    document.edit(len(HEADER), len(HEADER), 'new line\n')
+    expected = EscpToBinRenderer(9)
+    assert document.output == expected.render(document.content)
+    assert document.page_offsets == expected.page_offsets
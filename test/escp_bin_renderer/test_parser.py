@@ -0,0 +1,44 @@
+import pytest
+
+from wp.escp_bin_renderer import EscpToBinRenderer
+
+
+@pytest.fixture
+def renderer():
+    return EscpToBinRenderer(9)
+
+
+def parse(renderer, content):
+    return renderer.parse(renderer.lexer(content))
+
+
+def test_nested_directives(renderer):
+    root = parse(renderer, '[bold:on]a [underline:on]b[underline:off][bold:off] c')
+    assert [n.category for n in root] == ['bold', 'space', 'text']
+    bold = root[0]
+    assert bold.value == [True]
+    assert [n.category for n in bold] == ['text', 'space', 'underline']
+    assert bold[2][0].value == 'b'
+
+
+def test_directive_arguments(renderer):
+    root = parse(renderer, '[box:on:thickness:2]Hello[box:off]')
+    assert root[0].value == [True, 'thickness', '2']
+    assert root[0][0].value == 'Hello'
+
+
+def test_runs(renderer):
+    root = parse(renderer, 'a   b\n\n\nc')
+    assert [(n.category, n.value) for n in root] == [
+        ('text', 'a'), ('space', 3), ('text', 'b'), ('newline', 3), ('text', 'c')
+    ]
+
+
+def test_unexpected_closing_directive(renderer):
+    with pytest.raises(ValueError):
+        parse(renderer, '[bold:on]a[italic:off]')
+
+
+def test_missing_closing_directive(renderer):
+    with pytest.raises(ValueError):
+        parse(renderer, '[bold:on]a')
@@ -0,0 +1,62 @@
+import pytest
+
+from wp.escp_bin_renderer import EscpToBinRenderer
+from wp.md_escp_converter import MarkdownEscpRenderer
+
+
+@pytest.fixture
+def renderer():
+    return EscpToBinRenderer(9)
+
+
+def test_stats_disabled_by_default(renderer):
+    renderer.render('a b')
+    assert renderer.stats is None
+    assert renderer.handlers is EscpToBinRenderer.handlers
+
+
+def test_stats(renderer):
+    stats = renderer.enable_stats()
+    output = renderer.render('[bold:on]a b[bold:off]\n\nc')
+    assert set(stats.phases) == {'lex', 'parse', 'render'}
+    assert stats.tokens == 16
+    assert stats.nodes == 7
+    assert {category: d.count for category, d in stats.directives.items() if d.count} == {
+        'root': 1, 'bold': 1, 'text': 3, 'space': 1, 'newline': 1,
+    }
+    assert stats.directives['text'].bytes == 3
+    assert stats.directives['bold'].bytes == len(b'\x1bE\x1bF')
+    assert stats.output_bytes == len(output)
+    bold = stats.directives['bold']
+    assert bold.self_time <= bold.time
+    assert 'bold' in str(stats)
+
+
+def test_stats_add_up(renderer):
+    stats = renderer.enable_stats()
+    renderer.render('a')
+    renderer.reset()
+    renderer.render('a')
+    assert stats.directives['text'].count == 2
+
+
+def test_stats_stream(renderer):
+    stats = renderer.enable_stats()
+    b''.join(renderer.render_stream(['a b\n', 'c\n']))
+    assert stats.directives['text'].count == 3
+    assert stats.tokens == 6
+
+
+def test_stats_custom_directive(renderer):
+    stats = renderer.enable_stats()
+    renderer.register_directive('stars', lambda r, node: r.text('**'))
+    renderer.render('[stars]')
+    assert stats.directives['stars'].bytes == 2
+
+
+def test_stats_markdown():
+    renderer = MarkdownEscpRenderer()
+    stats = renderer.enable_stats()
+    output = renderer.render('**a**\n\n')
+    assert stats.directives['bold'].count == 1
+    assert stats.output_bytes == len(output)
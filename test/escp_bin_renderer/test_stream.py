@@ -0,0 +1,36 @@
+import pytest
+
+from wp.escp_bin_renderer import EscpToBinRenderer
+
+
+@pytest.fixture
+def renderer():
+    return EscpToBinRenderer(9)
+
+
+def test_stream_matches_render(renderer):
+    content = '[bold:on]Lorem\n\nipsum[bold:off] dolor\nsit amet\n\n\nconsectetur [underline:on]adipiscing[underline:off]'
+    expected = EscpToBinRenderer(9).render(content)
+    chunks = [content[i:i + 7] for i in range(0, len(content), 7)]
+    assert b''.join(renderer.render_stream(chunks)) == expected
+
+
+def test_stream_yields_before_end(renderer):
+    def lines():
+        yield 'Lorem ipsum\n'
+        yield '\n'
+        yield 'dolor sit amet\n'
+        raise RuntimeError('not consumed yet')
+
+    stream = renderer.render_stream(lines())
+    assert next(stream) == b'Lorem ipsum\r\n\r\n'
+
+
+def test_stream_newline_run_across_chunks(renderer):
+    chunks = ['Lorem\n', '\n', '\nipsum']
+    assert b''.join(renderer.render_stream(chunks)) == b'Lorem\r\n\r\n\r\nipsum\r\n'
+
+
+def test_stream_missing_closing_directive(renderer):
+    with pytest.raises(ValueError):
+        list(renderer.render_stream(['[bold:on]Lorem\n', 'ipsum\n']))
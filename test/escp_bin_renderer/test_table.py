@@ -0,0 +1,102 @@
+import time
+
+import pytest
+
+from wp.escp_bin_renderer import EscpToBinRenderer
+
+
+@pytest.fixture
+def renderer():
+    return EscpToBinRenderer(9)  # number of pin arbitrarily chosen
+
+
+def test_table(renderer):
+    content = '[table:on]Item|Qty\nPaper|12\n[table:off]'
+    expected = (
+        b'\xda' + b'\xc4' * 7 + b'\xc2' + b'\xc4' * 5 + b'\xbf\r\n' +
+        b'\xb3 Item  \xb3 Qty \xb3\r\n' +
+        b'\xc3' + b'\xc4' * 7 + b'\xc5' + b'\xc4' * 5 + b'\xb4\r\n' +
+        b'\xb3 Paper \xb3  12 \xb3\r\n' +
+        b'\xc0' + b'\xc4' * 7 + b'\xc1' + b'\xc4' * 5 + b'\xd9\r\n' +
+        # the end of the document
+        b'\r\n'
+    )
+    assert renderer.render(content) == expected
+
+
+def test_table_ends_its_last_line():
+    renderer = EscpToBinRenderer(9, soft_wrap=True)
+    assert renderer.render('a\n[table:on]x[table:off]\nb') == (
+        b'a\r\n\xda\xc4\xc4\xc4\xbf\r\n\xb3 x \xb3\r\n\xc0\xc4\xc4\xc4\xd9\r\nb\r\n'
+    )
+
+
+def test_table_thickness_2(renderer):
+    output = renderer.render('[table:on:thickness:2]a|b[table:off]')
+    assert output == b'\xc9\xcd\xcd\xcd\xcb\xcd\xcd\xcd\xbb\r\n\xba a \xba b \xba\r\n\xc8\xcd\xcd\xcd\xca\xcd\xcd\xcd\xbc\r\n\r\n'
+
+
+def test_table_wraps_cells(renderer):
+    output = renderer.render('[margin:right:20][table:on]Description|Price\nA very long description|9.90[table:off]')
+    lines = output.split(b'\r\n')
+    assert lines[1:3] == [b'\xb3 Descript \xb3 Price \xb3', b'\xb3 ion      \xb3       \xb3']
+    assert lines[4:8] == [
+        b'\xb3 A very   \xb3  9.90 \xb3',
+        b'\xb3 long     \xb3       \xb3',
+        b'\xb3 descript \xb3       \xb3',
+        b'\xb3 ion      \xb3       \xb3',
+    ]
+    assert all(len(line) == 20 for line in lines[1:9])
+
+
+def test_table_short_rows_are_padded(renderer):
+    lines = renderer.render('[table:on]a|b|c\nd[table:off]').split(b'\r\n')
+    assert lines[3] == b'\xb3 d \xb3   \xb3   \xb3'
+
+
+def test_table_after_text(renderer):
+    assert renderer.render('Total[table:on]a[table:off]').startswith(b'Total\r\n\xda')
+
+
+def test_table_with_variables(renderer):
+    renderer.variables = {'amount': '1,200.00'}
+    assert b'\xb3 1,200.00 \xb3' in renderer.render('[table:on][var:amount][table:off]')
+
+
+def test_table_markup_not_allowed(renderer):
+    with pytest.raises(ValueError):
+        renderer.render('[table:on][bold:on]a[bold:off][table:off]')
+
+
+def test_table_compact():
+    output = EscpToBinRenderer(9, compact_whitespace=True).render('[table:on]Label|1\nLabel|2[table:off]')
+    assert b'\xb3 Label \xb3 1 \xb3' in output
+
+
+def test_box_multiple_lines(renderer):
+    lines = renderer.render('[box:on:thickness:1]\nHello\n\nthere\n[box:off]').split(b'\r\n')
+    assert lines[1] == b'\xb3' + b' ' * 36 + b'Hello' + b' ' * 37 + b'\xb3'
+    assert lines[2] == b'\xb3' + b' ' * 78 + b'\xb3'
+    assert lines[3] == b'\xb3' + b' ' * 36 + b'there' + b' ' * 37 + b'\xb3'
+    assert lines[4] == b'\xc0' + b'\xc4' * 78 + b'\xd9'
+
+
+def test_box_wraps_long_lines(renderer):
+    lines = renderer.render('[margin:right:12][box:on:thickness:1]Hello there[box:off]').split(b'\r\n')
+    assert lines[1:3] == [b'\xb3  Hello   \xb3', b'\xb3  there   \xb3']
+
+
+def test_hundreds_of_rows_in_linear_time():
+    def elapsed(rows):
+        content = '[table:on]Item|Qty|Price\n' + 'Paper, white, 80 g|2|9.90\n' * rows + '[table:off]'
+        start = time.perf_counter()
+        EscpToBinRenderer(9).render(content)
+        return time.perf_counter() - start
+
+    elapsed(100)
+    assert elapsed(1600) < 40 * elapsed(400)
+
+
+def test_box_without_printable_width(renderer):
+    output = renderer.render('[margin:left:10][margin:right:11][box:on:thickness:1]Hi[box:off]')
+    assert output.endswith(b'\xda\xbf\r\n\xb3Hi\xb3\r\n\xc0\xd9\r\n')
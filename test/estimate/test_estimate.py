@@ -0,0 +1,54 @@
+import pytest
+
+from wp.escp_bin_renderer import EscpToBinRenderer
+from wp.estimate import PROFILES, SpeedProfile, estimate_print_time
+
+# 10 characters per second at 10 cpi: one second per inch
+SLOW = SpeedProfile('slow', draft_cps=10, letter_quality_cps=5, feed_inches_per_second=1, carriage_return=0)
+
+
+def test_text_line():
+    estimate = estimate_print_time(b'a' * 10 + b'\r\n', 9, SLOW)
+    assert estimate.pages == [pytest.approx(1 + 1 / 6)]
+    assert estimate.lines == 1
+    assert estimate.characters == 10
+
+
+def test_pitch_and_double_width():
+    assert estimate_print_time(b'\x1bM' + b'a' * 12, 9, SLOW).seconds == pytest.approx(1)
+    assert estimate_print_time(b'\x1bW\x01' + b'a' * 10, 9, SLOW).seconds == pytest.approx(2)
+
+
+def test_passes():
+    assert estimate_print_time(b'\x1bE' + b'a' * 10, 9, SLOW).seconds == pytest.approx(2)
+    assert estimate_print_time(b'\x1bE\x1bG' + b'a' * 10, 9, SLOW).seconds == pytest.approx(4)
+    assert estimate_print_time(b'\x1bE' + b'a' * 10 + b'\x1bF' + b'a' * 10, 9, SLOW).seconds == pytest.approx(3)
+
+
+def test_letter_quality():
+    assert estimate_print_time(b'\x1bx\x01' + b'a' * 10, 9, SLOW).seconds == pytest.approx(2)
+
+
+def test_line_spacing():
+    assert estimate_print_time(b'\x1b3\x6c\n\n', 9, SLOW).seconds == pytest.approx(1)
+    assert estimate_print_time(b'\x1bJ\xd8', 9, SLOW).seconds == pytest.approx(1)
+
+
+def test_form_feed_ends_page():
+    # page of 6 lines of 1/6 inch
+    estimate = estimate_print_time(b'\x1bC\x06a\r\n\x0cb\r\n', 9, SLOW)
+    assert estimate.pages == [pytest.approx(0.1 + 1), pytest.approx(0.1 + 1 / 6)]
+
+
+def test_rendered_document():
+    output = EscpToBinRenderer(9).render('[page-length:lines:3]' + 'line\n' * 7)
+    estimate = estimate_print_time(output, 9)
+    assert len(estimate.pages) == 3
+    assert estimate.lines == 7
+    assert estimate_print_time(output, 24).seconds < estimate.seconds
+
+
+def test_default_profiles():
+    assert set(PROFILES) == {9, 24, 48}
+    with pytest.raises(ValueError):
+        estimate_print_time(b'', 12)
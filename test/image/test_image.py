@@ -0,0 +1,128 @@
+import os
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from wp import image  # noqa: E402
+
+
+def write_pgm(path, pixels) -> str:
+    with open(path, 'wb') as f:
+        f.write(b'P5\n# test image\n%d %d\n255\n' % (pixels.shape[1], pixels.shape[0]) + pixels.tobytes())
+    return str(path)
+
+
+def reference_floyd_steinberg(pixels):
+    values = pixels.astype(float)
+    height, width = values.shape
+    dots = np.zeros((height, width), dtype=bool)
+    for y in range(height):
+        for x in range(width):
+            dots[y, x] = black = values[y, x] < 128
+            error = values[y, x] - (0 if black else 255)
+            if x + 1 < width:
+                values[y, x + 1] += error * 7 / 16
+            if y + 1 < height:
+                if x:
+                    values[y + 1, x - 1] += error * 3 / 16
+                values[y + 1, x] += error * 5 / 16
+                if x + 1 < width:
+                    values[y + 1, x + 1] += error * 1 / 16
+    return dots
+
+
+def test_load_binary_pgm(tmp_path):
+    pixels = np.arange(12, dtype=np.uint8).reshape(3, 4)
+    assert (image.load_grayscale(write_pgm(tmp_path / 'a.pgm', pixels)) == pixels).all()
+
+
+def test_load_ascii_pgm_scales_to_255(tmp_path):
+    path = tmp_path / 'a.pgm'
+    path.write_bytes(b'P2\n# comment\n2 2\n15\n0 15\n5 10\n')
+    assert image.load_grayscale(str(path)).tolist() == [[0, 255], [85, 170]]
+
+
+def test_truncated_pgm(tmp_path):
+    path = tmp_path / 'a.pgm'
+    path.write_bytes(b'P5\n4 4\n255\n\x00\x00')
+    with pytest.raises(ValueError):
+        image.load_grayscale(str(path))
+
+
+def test_resize_averages_when_shrinking():
+    pixels = np.array([[0, 255, 0, 255], [0, 255, 0, 255]], dtype=np.uint8)
+    assert image.resize(pixels, 2, 1).tolist() == [[127.5, 127.5]]
+    assert image.resize(pixels, 8, 2)[0].tolist() == [0, 0, 255, 255, 0, 0, 255, 255]
+
+
+@pytest.mark.parametrize('shape', [(1, 1), (1, 9), (9, 1), (17, 23)])
+def test_floyd_steinberg_matches_scalar_diffusion(shape):
+    pixels = np.random.default_rng(0).integers(0, 256, shape).astype(np.float32)
+    assert (image.floyd_steinberg(pixels) == reference_floyd_steinberg(pixels)).all()
+
+
+@pytest.mark.parametrize('dithering', image.DITHERING_MODES)
+def test_dithering_extremes(dithering):
+    assert image.dither(np.zeros((16, 16), dtype=np.float32), dithering).all()
+    assert not image.dither(np.full((16, 16), 255, dtype=np.float32), dithering).any()
+
+
+@pytest.mark.parametrize('dithering', ['floyd-steinberg', 'ordered'])
+def test_dithering_preserves_gray_level(dithering):
+    dots = image.dither(np.full((64, 64), 64, dtype=np.float32), dithering)
+    assert dots.mean() == pytest.approx(0.75, abs=0.01)
+
+
+def test_unknown_dithering():
+    with pytest.raises(ValueError, match='Unknown dithering'):
+        image.dither(np.zeros((1, 1)), 'random')
+
+
+def test_pack_8_dot_bands():
+    dots = np.zeros((10, 4), dtype=bool)
+    dots[0, 0] = dots[7, 0] = dots[1, 1] = True
+    dots[9, 2] = True
+    first, second = image.pack_bands(dots, 9)
+    # top dot is the high bit, blank columns at the end are dropped
+    assert first == b'\x1b*\x01\x02\x00' + bytes([0b10000001, 0b01000000])
+    assert second == b'\x1b*\x01\x03\x00' + bytes([0, 0, 0b01000000])
+
+
+def test_pack_24_dot_bands():
+    dots = np.zeros((48, 2), dtype=bool)
+    dots[23, 0] = True
+    band, blank = image.pack_bands(dots, 24)
+    assert band == b'\x1b*\x27\x01\x00\x00\x00\x01'
+    assert blank == b''
+
+
+def test_size_keeps_aspect_at_printer_resolution():
+    # 120 x 72 dpi
+    assert image.image_size((100, 100), 9, None) == (100, 60)
+    assert image.image_size((100, 200), 9, 400) == (400, 120)
+    assert image.image_size((100, 100), 24, 50) == (50, 50)
+
+
+def test_unsupported_pins():
+    with pytest.raises(ValueError, match='No bit-image format'):
+        image.band_format(12)
+
+
+def test_conversions_are_cached(tmp_path):
+    path = write_pgm(tmp_path / 'a.pgm', np.zeros((8, 8), dtype=np.uint8))
+    bands = image.bit_image_bands(path, 9, width=16)
+    assert image.bit_image_bands(path, 9, width=16) is bands
+    assert image.bit_image_bands(path, 9, width=8) is not bands
+    assert image.bit_image_bands(path, 9, width=16, dithering='ordered') is not bands
+
+    write_pgm(path, np.full((8, 8), 255, dtype=np.uint8))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert not any(image.bit_image_bands(path, 9, width=16))
+
+
+def test_max_width(tmp_path):
+    path = write_pgm(tmp_path / 'a.pgm', np.zeros((10, 100), dtype=np.uint8))
+    [band] = image.bit_image_bands(path, 9, max_width=50)
+    assert band[3:5] == b'\x32\x00'
@@ -0,0 +1,61 @@
+import pytest
+
+from wp.layout import column_widths, is_number, rule, vertical, wrap
+
+
+def test_rule():
+    assert rule((2, 3), 1, 'top') == b'\xda\xc4\xc4\xc2\xc4\xc4\xc4\xbf'
+    assert rule((1,), 2, 'bottom') == b'\xc8\xcd\xbc'
+
+
+def test_rule_is_cached():
+    assert rule((4, 5), 2, 'middle') is rule((4, 5), 2, 'middle')
+
+
+def test_rule_invalid():
+    with pytest.raises(ValueError):
+        rule((1,), 1, 'left')
+    with pytest.raises(ValueError):
+        rule((1,), 3, 'top')
+
+
+def test_vertical():
+    assert vertical(1) == b'\xb3'
+    assert vertical(2) == b'\xba'
+
+
+def test_wrap():
+    assert wrap('Lorem ipsum dolor sit amet', 11) == ['Lorem ipsum', 'dolor sit', 'amet']
+
+
+def test_wrap_splits_long_words():
+    assert wrap('a abcdefgh b', 3) == ['a', 'abc', 'def', 'gh', 'b']
+
+
+def test_wrap_invalid_width():
+    with pytest.raises(ValueError):
+        wrap('Hi', 0)
+
+
+def test_wrap_empty():
+    assert wrap('', 5) == ['']
+
+
+def test_column_widths_natural():
+    assert column_widths([['Item', 'Qty'], ['Paper', '2']], 20) == [5, 3]
+
+
+def test_column_widths_narrows_widest():
+    assert column_widths([['a' * 30, 'bb', 'c' * 10]], 24) == [12, 2, 10]
+
+
+def test_column_widths_too_wide():
+    with pytest.raises(ValueError):
+        column_widths([['a', 'b', 'c']], 2)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('42', True), ('-9.90', True), ('1,234.50', True), ('15%', True), ('Paper', False), ('', False), ('.', False),
+])
+def test_is_number(text, expected):
+    assert is_number(text) is expected
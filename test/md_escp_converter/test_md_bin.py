@@ -0,0 +1,43 @@
+import glob
+
+import pytest
+
+from wp.escp_bin_renderer import EscpToBinRenderer
+from wp.md_bin_renderer import MarkdownToBinRenderer, markdown_to_escp_tree
+from wp.md_escp_converter import MarkdownEscpRenderer
+
+
+@pytest.fixture
+def renderer():
+    return MarkdownToBinRenderer(9)
+
+
+def two_steps(md: str) -> bytes:
+    return EscpToBinRenderer(9).render(MarkdownEscpRenderer().render(md))
+
+
+@pytest.mark.parametrize('path', sorted(glob.glob('samples/*.md')))
+def test_samples_match_two_steps(renderer, path):
+    with open(path, encoding='utf-8') as f:
+        md = f.read()
+    assert renderer.render(md) == two_steps(md)
+
+
+@pytest.mark.parametrize('md', [
+    '# Title\n\nSome **bold** and _italic_ text\n\n',
+    '## Sub\n\ntext  with   spaces\n\n\n',
+    '### hidden\ntext after',
+    '\n\n**a**\n\nb',
+])
+def test_match_two_steps(renderer, md):
+    assert renderer.render(md) == two_steps(md)
+
+
+def test_tree_merges_runs():
+    markdown = MarkdownEscpRenderer()
+    root = markdown_to_escp_tree(markdown.parse(markdown.lexer('a\n\n**b**')))
+    assert [(n.category, n.value) for n in root][:4] == [
+        ('pragma', 'escp-wp'), ('soft-wrap', True), ('newline', 1), ('text', 'a'),
+    ]
+    assert [n.category for n in root][4:] == ['newline', 'bold']
+    assert root[4].value == 2
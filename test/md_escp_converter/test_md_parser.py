@@ -0,0 +1,53 @@
+import pytest
+
+from wp.md_escp_converter import MarkdownEscpRenderer
+
+
+@pytest.fixture
+def renderer():
+    return MarkdownEscpRenderer()
+
+
+def parse(renderer, content):
+    return repr(renderer.parse(renderer.lexer(content)))
+
+
+def test_heading_ends_at_newline(renderer):
+    assert parse(renderer, '## Sub _title_\ntext') == (
+        'Node #root -> [Node #heading(2) -> [Node #text(Sub ) -> [], Node #italic -> [Node #text(title) -> []]], '
+        'Node #text(text) -> []]'
+    )
+
+
+def test_single_newline_after_node_dropped(renderer):
+    assert parse(renderer, '**a**\nb\n\nc') == (
+        'Node #root -> [Node #bold -> [Node #text(a) -> []], Node #text(b\n\nc) -> []]'
+    )
+
+
+def test_newline_run_after_node(renderer):
+    assert parse(renderer, '_a_\n\n\nb') == (
+        'Node #root -> [Node #italic -> [Node #text(a) -> []], Node #newline(3) -> [], Node #text(b) -> []]'
+    )
+
+
+def test_bold_ends_at_first_delimiter(renderer):
+    assert parse(renderer, '**a*b c') == 'Node #root -> [Node #bold -> [Node #text(a) -> []], Node #text( c) -> []]'
+
+
+def test_nested(renderer):
+    assert parse(renderer, '**a _b_ c**') == (
+        'Node #root -> [Node #bold -> [Node #text(a ) -> [], Node #italic -> [Node #text(b) -> []], '
+        'Node #text( c) -> []]]'
+    )
+
+
+@pytest.mark.parametrize('content', ['**a', '_a', '# a', '**a _b** c_', '# a _b\nc_'])
+def test_unclosed(renderer, content):
+    with pytest.raises(ValueError, match='Could not find token'):
+        renderer.parse(renderer.lexer(content))
+
+
+def test_render_does_not_print(renderer, capsys):
+    assert renderer.render('# a\n') == '[pragma:escp-wp][soft-wrap:on]\n[box:on:thickness:2]a[box:off]'
+    assert capsys.readouterr().out == ''
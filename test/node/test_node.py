@@ -0,0 +1,66 @@
+import pytest
+
+from wp.escp_bin_renderer import EscpToBinRenderer
+from wp.md_escp_converter import MarkdownEscpRenderer
+from wp.node import FlatTree, GenericNode
+
+DOCUMENT = (
+    '[pragma:escp-wp][bold:on]Hello [underline:on]world[underline:off][bold:off]\n\n'
+    '[box:on:thickness:1]boxed text[box:off]\nlast line'
+)
+
+
+@pytest.fixture
+def renderer():
+    return EscpToBinRenderer(9)
+
+
+def test_leaves_share_empty_children(renderer):
+    root = renderer.parse(renderer.lexer('a b\n'))
+    leaves = list(root)
+    assert len(leaves) > 1
+    assert all(leaf.children is leaves[0].children for leaf in leaves)
+    assert not hasattr(leaves[0], '__dict__')
+
+
+def test_add_to_leaf():
+    leaf = GenericNode('bold')
+    other = GenericNode('bold')
+    leaf.add(GenericNode('text', 'a'))
+    assert [n.value for n in leaf] == ['a']
+    assert len(other) == 0
+
+
+def test_flat_tree_layout():
+    tree = FlatTree()
+    tree.open('bold', [True])
+    tree.add('text', 'a')
+    tree.add('space', 1)
+    tree.close()
+    tree.add('text', 'b')
+    root = tree.finish().root()
+    assert [n.category for n in root] == ['bold', 'text']
+    assert [n.value for n in root[0]] == ['a', 1]
+    assert list(tree.ends) == [5, 4, 3, 4, 5]
+
+
+def test_parse_flat_matches_parse(renderer):
+    tokens = renderer.lexer(DOCUMENT)
+    assert repr(renderer.parse_flat(tokens).root()) == repr(renderer.parse(tokens))
+
+
+def test_parse_flat_unclosed(renderer):
+    with pytest.raises(ValueError, match='Missing closing directive: bold'):
+        renderer.parse_flat(renderer.lexer('[bold:on]a'))
+
+
+def test_render_flat_tree(renderer):
+    expected = EscpToBinRenderer(9).render(DOCUMENT)
+    assert renderer.render_tree(renderer.parse_flat(renderer.lexer(DOCUMENT)).root()) == expected
+
+
+def test_render_markdown_flat_tree():
+    md = '# Title\n\nSome **bold** and _italic_ text\n\n'
+    renderer = MarkdownEscpRenderer()
+    tree = FlatTree.from_node(renderer.parse(renderer.lexer(md)))
+    assert MarkdownEscpRenderer().render_tree(tree.root()) == MarkdownEscpRenderer().render(md)
@@ -0,0 +1,68 @@
+import asyncio
+import io
+
+import pytest
+
+from wp.escp_bin_renderer import EscpToBinRenderer
+from wp.estimate import SpeedProfile
+from wp.md_bin_renderer import MarkdownToBinRenderer
+from wp.scheduler import Document, ScheduledPrinter, Scheduler, render_document
+from wp.spooler import FilePrinter
+
+
+def printers(count=2):
+    return [ScheduledPrinter(f'p{i}', FilePrinter(io.BytesIO()), 9) for i in range(count)]
+
+
+def test_render_document_reuses_renderer():
+    first = render_document(Document('a', '[pragma:escp-wp][bold:on]a[bold:off]'), 9)
+    second = render_document(Document('a', '[pragma:escp-wp][bold:on]a[bold:off]'), 9)
+    assert first == second == b'\x1bEa\x1bF\r\n'
+
+
+def test_render_markdown_document():
+    assert render_document(Document('a', '**a**', markdown=True), 9) == EscpToBinRenderer(9).render(
+        '[pragma:escp-wp][soft-wrap:on]\n[bold:on]a[bold:off]'
+    )
+
+
+def test_render_markdown_document_with_brackets():
+    # brackets in Markdown text are printed, not read as directives
+    content = 'see [bold:on] and [1]'
+    assert render_document(Document('a', content, markdown=True), 9) == MarkdownToBinRenderer(9).render(content)
+    assert render_document(Document('a', '[pragma:escp-wp][bold:on]a[bold:off]'), 9) == b'\x1bEa\x1bF\r\n'
+
+
+def test_run_dispatches_all_documents():
+    ps = printers()
+    documents = [Document(f'doc{i}', f'Document {i}') for i in range(6)]
+    reports = asyncio.run(Scheduler(ps, max_workers=2).run(documents))
+
+    assert [r.document for r in reports] == [d.name for d in documents]
+    assert {r.printer for r in reports} <= {'p0', 'p1'}
+    printed = b''.join(p.printer.output.getvalue() for p in ps)
+    for i in range(6):
+        assert f'Document {i}\r\n'.encode() in printed
+
+
+def test_least_busy():
+    scheduler = Scheduler(printers(3))
+    assert scheduler.least_busy(9, {'p0': 10, 'p1': 0, 'p2': 5}) == 'p1'
+
+
+def test_no_compatible_printer():
+    scheduler = Scheduler(printers())
+    with pytest.raises(ValueError):
+        scheduler.pins_for(Document('a', 'a', pins=24), {'p0': 0, 'p1': 0})
+
+
+def test_balance_by_predicted_time():
+    slow = SpeedProfile('slow', draft_cps=1, letter_quality_cps=1, feed_inches_per_second=0.1)
+    ps = [
+        ScheduledPrinter('fast', FilePrinter(io.BytesIO()), 9),
+        ScheduledPrinter('slow', FilePrinter(io.BytesIO()), 9, slow),
+    ]
+    documents = [Document(f'doc{i}', f'Document {i}') for i in range(4)]
+    reports = asyncio.run(Scheduler(ps, max_workers=2).run(documents))
+    assert {r.printer for r in reports} == {'fast'}
+    assert all(r.predicted_seconds > 0 for r in reports)
@@ -0,0 +1,184 @@
+import asyncio
+import io
+import time
+
+import pytest
+
+from wp.spooler import FilePrinter, JobStats, PrintJob, Spooler, rechunk, resume_from_page
+
+
+class SlowPrinter(FilePrinter):
+    def __init__(self, output, delay):
+        super().__init__(output)
+        self.delay = delay
+        self.sizes = []
+
+    def send(self, sequence: bytes):
+        time.sleep(self.delay)
+        self.sizes.append(len(sequence))
+        super().send(sequence)
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_rechunk():
+    assert list(rechunk([b'abc', b'de', b'fghij'], 4)) == [b'abcd', b'efgh', b'ij']
+
+
+def test_rechunk_slices_large_pieces():
+    piece = b'abcdefghij'
+    chunks = list(rechunk([b'x', piece], 4))
+    assert chunks == [b'xabc', b'defg', b'hij']
+    assert chunks[1].obj is piece
+
+
+def test_send_file(tmp_path):
+    path = tmp_path / 'job.prn'
+    path.write_bytes(b'Hello\r\n' * 1000)
+    printer = SlowPrinter(io.BytesIO(), 0)
+
+    async def spool():
+        async with Spooler({'p': printer}, chunk_size=4096) as spooler:
+            return await spooler.submit('p', PrintJob('job', path))
+
+    stats = run(spool())
+    assert printer.output.getvalue() == path.read_bytes()
+    assert printer.sizes == [4096, 2904]
+    assert stats.chunks_sent == 2
+
+
+def test_send_bytes_in_chunks():
+    printer = SlowPrinter(io.BytesIO(), 0)
+
+    async def spool():
+        async with Spooler({'p': printer}, chunk_size=3) as spooler:
+            return await spooler.submit('p', PrintJob('job', b'Hello\r\n'))
+
+    stats = run(spool())
+    assert printer.output.getvalue() == b'Hello\r\n'
+    assert printer.sizes == [3, 3, 1]
+    assert stats.bytes_sent == 7
+    assert stats.chunks_sent == 3
+    assert stats.duration >= 0
+
+
+def test_send_file_and_stream(tmp_path):
+    path = tmp_path / 'job.bin'
+    path.write_bytes(b'x' * 10)
+    printer = SlowPrinter(io.BytesIO(), 0)
+
+    async def spool():
+        async with Spooler({'p': printer}, chunk_size=4) as spooler:
+            first = spooler.enqueue('p', PrintJob('file', path))
+            second = spooler.enqueue('p', PrintJob('stream', iter([b'ab', b'cd', b'e'])))
+            return await asyncio.gather(first, second)
+
+    file_stats, stream_stats = run(spool())
+    assert printer.output.getvalue() == b'x' * 10 + b'abcde'
+    assert file_stats.bytes_sent == 10
+    assert stream_stats.latency >= file_stats.duration
+
+
+def test_back_pressure():
+    printer = SlowPrinter(io.BytesIO(), 0.01)
+    produced = []
+
+    def source():
+        for i in range(10):
+            produced.append(i)
+            yield b'x'
+
+    async def spool():
+        async with Spooler({'p': printer}, chunk_size=1, max_pending_chunks=2) as spooler:
+            done = spooler.enqueue('p', PrintJob('job', source()))
+            await asyncio.sleep(0.025)
+            ahead = len(produced) - len(printer.sizes)
+            await done
+            return ahead
+
+    assert run(spool()) <= 4
+
+
+def test_unknown_printer():
+    async def spool():
+        async with Spooler({'p': SlowPrinter(io.BytesIO(), 0)}) as spooler:
+            spooler.enqueue('q', PrintJob('job', b''))
+
+    with pytest.raises(ValueError):
+        run(spool())
+
+
+def test_failing_source():
+    def source():
+        yield b'x'
+        raise OSError('disk error')
+
+    async def spool():
+        async with Spooler({'p': SlowPrinter(io.BytesIO(), 0)}) as spooler:
+            return await spooler.submit('p', PrintJob('job', source()))
+
+    with pytest.raises(OSError):
+        run(spool())
+
+
+class FailingPrinter(SlowPrinter):
+    def send(self, sequence: bytes):
+        time.sleep(self.delay)
+        raise OSError('paper out')
+
+
+def test_failing_printer_with_full_queue():
+    async def spool():
+        async with Spooler({'p': FailingPrinter(io.BytesIO(), 0.05)}, chunk_size=1, max_pending_chunks=2) as spooler:
+            with pytest.raises(OSError):
+                await spooler.submit('p', PrintJob('job', b'Hello\r\n' * 10))
+        # the chunk producer is not left behind
+        return asyncio.all_tasks() - {asyncio.current_task()}
+
+    assert run(spool()) == set()
+
+
+def test_cancelled_job_does_not_stop_the_printer():
+    printer = SlowPrinter(io.BytesIO(), 0.05)
+
+    async def spool():
+        async with Spooler({'p': printer}) as spooler:
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(spooler.submit('p', PrintJob('first', b'first')), 0.01)
+            return await spooler.submit('p', PrintJob('second', b'second'))
+
+    stats = run(spool())
+    assert stats.name == 'second'
+    assert printer.output.getvalue() == b'firstsecond'
+
+
+def test_stats_before_start():
+    stats = JobStats('job')
+    assert stats.latency is None
+    assert stats.duration is None
+    assert str(stats) == 'job: 0 bytes in 0 chunks, latency n/a, duration n/a, 0 B/s'
+
+
+PAGES = b'\x1b3$\x1bC\x04page 1\r\n\x0c\x1bEpage 2\r\n\x0cpage 3\r\n'
+
+
+def test_resume_from_page():
+    assert resume_from_page(PAGES, [15, 26], 1) == PAGES
+    assert resume_from_page(PAGES, [15, 26], 2) == b'\x1b3$\x1bC\x04\x1bEpage 2\r\n\x0cpage 3\r\n'
+    assert resume_from_page(PAGES, [15, 26], 3) == b'\x1b3$\x1bC\x04\x1bEpage 3\r\n'
+
+
+def test_resume_from_invalid_page():
+    with pytest.raises(ValueError):
+        resume_from_page(PAGES, [15, 26], 4)
+
+
+def test_job_from_page(tmp_path):
+    path = tmp_path / 'job.prn'
+    path.write_bytes(PAGES)
+    job = PrintJob('job', path).from_page(3)
+    assert b''.join(job.pieces()) == resume_from_page(PAGES, [15, 26], 3)
+    job = PrintJob('job', PAGES, page_offsets=[15]).from_page(2)
+    assert b''.join(job.pieces()) == resume_from_page(PAGES, [15], 2)
@@ -0,0 +1,49 @@
+import pytest
+
+import wp
+from wp.escp_bin_renderer import EscpToBinRenderer
+
+
+def test_variables():
+    template = wp.compile_template('Dear [var:name], you owe [var:amount] [symbol:euro].', pins=9)
+    assert template.variables == ['amount', 'name']
+
+
+def test_render_many():
+    template = wp.compile_template('[pragma:escp-wp]Dear [bold:on][var:name][bold:off],', pins=9)
+    rendered = list(template.render_many([{'name': 'Alice'}, {'name': 'Bob Smith'}]))
+    assert rendered == [b'Dear \x1bEAlice\x1bF,\r\n', b'Dear \x1bEBob Smith\x1bF,\r\n']
+
+
+def test_same_as_substituted_document():
+    content = 'Lorem ipsum dolor sit amet, consectetur [var:who] elit, sed do eiusmod tempor incididunt'
+    template = wp.compile_template(content, pins=9)
+    value = 'adipiscing adipiscing adipiscing'
+    expected = EscpToBinRenderer(9).render(content.replace('[var:who]', value))
+    assert template.render({'who': value}) == expected
+
+
+@pytest.mark.parametrize('line_breaking', ['greedy', 'optimal'])
+def test_value_glued_to_punctuation_wraps_as_one_word(line_breaking):
+    content = 'Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod. Dear ([var:name]), hello'
+    template = wp.compile_template(content, pins=9, line_breaking=line_breaking)
+    expected = EscpToBinRenderer(9, line_breaking=line_breaking).render(content.replace('[var:name]', 'Bartholomew'))
+    assert b'\r\n(Bartholomew), hello' in expected
+    assert template.render({'name': 'Bartholomew'}) == expected
+
+
+def test_box_is_centered_for_value():
+    template = wp.compile_template('[box:on:thickness:2][var:title][box:off]', pins=9)
+    expected = EscpToBinRenderer(9).render('[box:on:thickness:2]Hello[box:off]')
+    assert template.render({'title': 'Hello'}) == expected
+
+
+def test_markup_in_value_is_not_interpreted():
+    template = wp.compile_template('[var:v]', pins=9)
+    assert template.render({'v': '[bold:on]'}) == b'[bold:on]\r\n'
+
+
+def test_missing_variable():
+    template = wp.compile_template('[var:name]', pins=9)
+    with pytest.raises(ValueError):
+        template.render({})
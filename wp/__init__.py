@@ -1 +1,3 @@
+from .cache import RenderCache
 from .escp_bin_renderer import render_escp
+from .template import compile_template
@@ -0,0 +1,108 @@
+import contextlib
+import hashlib
+import os
+import tempfile
+from typing import Iterable
+
+
+class RenderCache:
+    """On-disk cache of rendered ESC/P bytes, keyed on the document and the renderer options.
+
+    Entries are files named after the key. Reading an entry refreshes its
+    modification time, and the least recently used entries are removed once
+    the cache grows over `max_bytes`.
+
+    Several processes may share a directory: an entry another process
+    evicts is a miss. The size of the cache is counted when it is opened and
+    kept up to date on every put, and the directory is only scanned again
+    when that count goes over `max_bytes`, so entries written by other
+    processes are noticed at the next eviction.
+    """
+
+    def __init__(self, directory: str, *, max_bytes=64 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self.size = sum(size for _, size, _ in self._entries())
+
+    @staticmethod
+    def key(
+            content: str,
+            *,
+            pins: int, soft_wrap=True, init_on_render=False, form_feed_after_render=False, optimize=False,
+            line_breaking='greedy', compact_whitespace=False, files: Iterable[str] = ()) -> str:
+        """Key of a render of `content` with these options.
+
+        `files` are other files the output depends on, such as images: their
+        modification time and size are part of the key.
+        """
+        options = (
+            f'pins={pins};soft_wrap={soft_wrap};init={init_on_render};ff={form_feed_after_render};optimize={optimize};'
+            f'line_breaking={line_breaking};compact={compact_whitespace}'
+        )
+        digest = hashlib.sha256(options.encode())
+        for path in files:
+            try:
+                stat = os.stat(path)
+                version = f'{stat.st_mtime_ns};{stat.st_size}'
+            except FileNotFoundError:
+                version = 'missing'
+            digest.update(f'\0{os.path.abspath(path)};{version}'.encode())
+        digest.update(b'\0')
+        digest.update(content.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.bin')
+
+    def get(self, key: str) -> bytes | None:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                payload = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            # evicted, possibly by another process
+            self.misses += 1
+            return None
+        self.hits += 1
+        return payload
+
+    def put(self, key: str, payload: bytes):
+        # write then rename, so concurrent readers never see a partial entry
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp, self._path(key))
+        # a replaced entry is counted twice until the next eviction
+        self.size += len(payload)
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        """Modification time, size and path of every entry, skipping those removed meanwhile."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.bin'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self):
+        entries = sorted(self._entries())
+        size = sum(size for _, size, _ in entries)
+        for _, entry_size, path in entries:
+            if size <= self.max_bytes:
+                break
+            size -= entry_size
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+        self.size = size
+
+    def __str__(self):
+        return f'cache: {self.hits} hits, {self.misses} misses'
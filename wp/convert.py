@@ -1,17 +1,29 @@
 import argparse
+import glob
+import hashlib
+import json
 import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable
 
-from .escp_bin_renderer import EscpToBinRenderer
+from .cache import RenderCache
+from .escp_bin_renderer import EscpToBinRenderer, image_paths
+from .estimate import estimate_print_time
+from .md_bin_renderer import MarkdownToBinRenderer
 from .md_escp_converter import MarkdownEscpRenderer
+from .spooler import map_file
 
 
-def get_renderer(extension_from: str, extension_to: str, pins: int):
+def get_renderer(extension_from: str, extension_to: str, pins: int, optimize=False, compact_whitespace=False):
     match extension_from, extension_to:
         case '.md', '.txt':
             return MarkdownEscpRenderer()
         case '.txt', '.bin':
-            return EscpToBinRenderer(pins)
+            return EscpToBinRenderer(pins, optimize=optimize, compact_whitespace=compact_whitespace)
+        case '.md', '.bin':
+            return MarkdownToBinRenderer(pins, optimize=optimize, compact_whitespace=compact_whitespace)
         case _:
             raise ValueError(f'Invalid conversion: {extension_from} to {extension_to}')
 
@@ -29,14 +41,161 @@ def output(destination: str | None, payload: bytes | str):
             f.write(payload)
 
 
-def main():
-    pass
+def output_stream(destination: str, renderer: EscpToBinRenderer, source: Iterable[str]):
+    with open(destination, 'wb') as f:
+        renderer.render_to(source, f)
 
 
-# $ python3 -m wp.convert
-if __name__ == '__main__':
+def report_unencodable(source: str, renderer: EscpToBinRenderer):
+    for u in renderer.unencodable:
+        print(f'{source}: cannot print {u.char!r} at line {u.line}, column {u.column}', file=sys.stderr)
+
+
+def render_cached(source: str, content: str, renderer: EscpToBinRenderer, cache: RenderCache) -> bytes:
+    """Render `content` unless `cache` has it, reporting unencodable characters when it is rendered."""
+    key = cache.key(
+        content, pins=renderer.pins, optimize=renderer.optimize, compact_whitespace=renderer.compact_whitespace,
+        files=image_paths(content)
+    )
+    payload = cache.get(key)
+    if payload is None:
+        payload = renderer.render(content)
+        report_unencodable(source, renderer)
+        cache.put(key, payload)
+    return payload
+
+
+def convert_file(
+        source: str, destination: str, pins: int, cache_dir: str | None = None, optimize=False,
+        compact_whitespace=False
+) -> float:
+    """Convert `source` to `destination`, guessing the conversion from the extensions. Return the time taken."""
+    start = time.perf_counter()
+    _, input_file_extension = os.path.splitext(source)
+    _, output_file_extension = os.path.splitext(destination)
+    renderer = get_renderer(input_file_extension, output_file_extension, pins, optimize, compact_whitespace)
+    with open(source, encoding='utf-8') as f:
+        if input_file_extension == '.txt' and cache_dir:
+            output(destination, render_cached(source, f.read(), renderer, RenderCache(cache_dir)))
+        elif isinstance(renderer, EscpToBinRenderer):
+            output_stream(destination, renderer, f)
+            report_unencodable(source, renderer)
+        else:
+            output(destination, renderer.render(f.read()))
+    return time.perf_counter() - start
+
+
+BATCH_MANIFEST = '.wp-convert.json'
+
+
+def batch_sources(pattern: str) -> list[str]:
+    """Files matched by a glob pattern, or the escp-wp and Markdown files of a directory."""
+    if os.path.isdir(pattern):
+        return sorted(
+            glob.glob(os.path.join(pattern, '*.escp.txt')) + glob.glob(os.path.join(pattern, '*.md'))
+        )
+    return sorted(glob.glob(pattern, recursive=True))
+
+
+def batch_destination(source: str, out_dir: str) -> str:
+    stem, extension = os.path.splitext(os.path.basename(source))
+    match extension:
+        case '.txt':
+            return os.path.join(out_dir, stem + '.bin')
+        case '.md':
+            return os.path.join(out_dir, stem + '.escp.txt')
+        case _:
+            raise ValueError(f'Invalid file extension: {extension}')
+
+
+def check_destinations(pairs: list[tuple[str, str]]):
+    """Refuse to overwrite a source, or to write two sources to the same destination."""
+    sources = {os.path.realpath(source) for source, _ in pairs}
+    seen = {}
+    for source, destination in pairs:
+        path = os.path.realpath(destination)
+        if path in sources:
+            raise ValueError(f'{source} would overwrite the source file {destination}')
+        if path in seen:
+            raise ValueError(f'{seen[path]} and {source} would both be converted to {destination}')
+        seen[path] = source
+
+
+def source_digest(source: str, options: str) -> str:
+    with open(source, 'rb') as f:
+        return hashlib.sha256(f.read() + f'\0{options}'.encode()).hexdigest()
+
+
+def is_up_to_date(source: str, destination: str, digest: str, manifest: dict[str, str]) -> bool:
+    """The destination matches the recorded source digest or, if none, is newer than the source."""
+    if not os.path.exists(destination):
+        return False
+    name = os.path.basename(destination)
+    if name in manifest:
+        return manifest[name] == digest
+    return os.path.getmtime(destination) >= os.path.getmtime(source)
+
+
+def convert_batch(
+        pattern: str, out_dir: str, pins: int, jobs=1, cache_dir: str | None = None, optimize=False,
+        compact_whitespace=False
+) -> list[tuple[str, str, float | None]]:
+    """Convert every matching file into `out_dir`, skipping up-to-date outputs.
+
+    Returns (source, destination, seconds) for every file; seconds is None for skipped files.
+    Nothing is converted if a destination is a source or the destination of another source.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, BATCH_MANIFEST)
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        manifest = {}
+
+    pairs = [(source, batch_destination(source, out_dir)) for source in batch_sources(pattern)]
+    check_destinations(pairs)
+
+    results = {}
+    todo = []
+    for source, destination in pairs:
+        digest = source_digest(source, f'pins={pins};optimize={optimize};compact={compact_whitespace}')
+        if is_up_to_date(source, destination, digest, manifest):
+            results[source] = destination, None
+        else:
+            todo.append((source, destination))
+            manifest[os.path.basename(destination)] = digest
+
+    sources = [s for s, _ in todo]
+    destinations = [d for _, d in todo]
+    if jobs > 1 and len(todo) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            timings = list(pool.map(
+                convert_file, sources, destinations,
+                [pins] * len(todo), [cache_dir] * len(todo), [optimize] * len(todo),
+                [compact_whitespace] * len(todo)
+            ))
+    else:
+        timings = [convert_file(s, d, pins, cache_dir, optimize, compact_whitespace) for s, d in todo]
+    for source, destination, seconds in zip(sources, destinations, timings):
+        results[source] = destination, seconds
+
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return [(source, *results[source]) for source in sorted(results)]
+
+
+def print_batch_summary(results: list[tuple[str, str, float | None]], elapsed: float):
+    for source, destination, seconds in results:
+        timing = 'skipped' if seconds is None else f'{seconds * 1000:7.1f} ms'
+        print(f'{timing:>10}  {source} -> {destination}')
+    converted = sum(1 for _, _, seconds in results if seconds is not None)
+    print(f'{converted} converted, {len(results) - converted} up to date, {elapsed:.3f} s')
+
+
+def main():
     parser = argparse.ArgumentParser(description='Converts a document to escp-wp format or to a binary file')
-    parser.add_argument('file', type=argparse.FileType('r', encoding='utf-8'), help='Source file')
+    parser.add_argument('file', nargs='?', type=argparse.FileType('r', encoding='utf-8'), help='Source file')
     parser.add_argument(
         '--pins', type=int, default=9, choices=[9, 24, 48], required=True, help='Number of printer pins'
     )
@@ -45,8 +204,38 @@ if __name__ == '__main__':
     # TODO implement me
     parser.add_argument('--ff', type=bool, required=False, default=False, help='Add form feed sequence at the end')
     parser.add_argument('-o', '--output', type=str, required=False, help='Output file (default: stdout)')
+    parser.add_argument('--batch', type=str, help='Convert all files of a directory or matching a glob pattern')
+    parser.add_argument('--out-dir', type=str, help='Output directory in batch mode')
+    parser.add_argument('--jobs', type=int, default=1, help='Parallel conversions in batch mode')
+    parser.add_argument('--cache-dir', type=str, help='Reuse binaries rendered earlier from identical sources')
+    parser.add_argument('--optimize', action='store_true', help='Drop redundant ESC/P mode commands')
+    parser.add_argument(
+        '--compact', action='store_true', help='Send runs of blanks and line feeds as head and paper moves'
+    )
+    parser.add_argument('--stats', action='store_true', help='Print phase times and per-directive counters')
+    parser.add_argument('--estimate', action='store_true', help='Print the estimated print time of the binary')
     args = parser.parse_args()
 
+    if args.batch:
+        if args.file or args.output:
+            parser.error('--batch cannot be combined with a source file or --output')
+        if not args.out_dir:
+            parser.error('--out-dir is required in batch mode')
+        if args.stats or args.estimate:
+            parser.error('--stats and --estimate cannot be combined with --batch')
+        start = time.perf_counter()
+        try:
+            results = convert_batch(
+                args.batch, args.out_dir, args.pins, args.jobs, args.cache_dir, args.optimize, args.compact
+            )
+        except ValueError as e:
+            parser.error(str(e))
+        print_batch_summary(results, time.perf_counter() - start)
+        return
+
+    if not args.file:
+        parser.error('a source file or --batch is required')
+
     _, input_file_extension = os.path.splitext(args.file.name)
     if input_file_extension not in ['.txt', '.md']:
         raise ValueError(f'Invalid file extension: {input_file_extension}')
@@ -57,9 +246,30 @@ if __name__ == '__main__':
 
     if input_file_extension == output_file_extension:
         raise ValueError(f'Input and output file extensions must be different: {input_file_extension}')
+    if args.estimate and output_file_extension != '.bin':
+        parser.error('--estimate requires a .bin output')
 
-    renderer = get_renderer(input_file_extension, output_file_extension, args.pins)
-    content = args.file.read()
+    renderer = get_renderer(input_file_extension, output_file_extension, args.pins, args.optimize, args.compact)
     print(f'Converting {args.file.name} to {args.output} ({output_file_extension})')
-    renderered = renderer.render(content)
-    output(args.output, renderered)
+    if args.stats:
+        renderer.enable_stats()
+    if input_file_extension == '.txt' and args.cache_dir and not args.stats:
+        cache = RenderCache(args.cache_dir)
+        output(args.output, render_cached(args.file.name, args.file.read(), renderer, cache))
+        print(cache, file=sys.stderr)
+    elif isinstance(renderer, EscpToBinRenderer):
+        # file to file: render while reading, without holding the whole document
+        output_stream(args.output, renderer, args.file)
+        report_unencodable(args.file.name, renderer)
+    else:
+        renderered = renderer.render(args.file.read())
+        output(args.output, renderered)
+    if args.stats:
+        print(renderer.stats, file=sys.stderr)
+    if args.estimate:
+        print(estimate_print_time(map_file(args.output), args.pins), file=sys.stderr)
+
+
+# $ python3 -m wp.convert
+if __name__ == '__main__':
+    main()
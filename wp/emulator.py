@@ -0,0 +1,404 @@
+"""ESC/P emulator rasterizing a rendered byte stream to page bitmaps, for previews and golden tests.
+
+Pages are boolean NumPy arrays (True for a printed dot) at 120 dpi
+horizontally and 72 dpi vertically, the dot pitch of a 9-pin printer in
+double density. Characters come from a built-in 5x7 dot-matrix font and
+are blitted a whole text run at a time.
+
+$ python -m wp.emulator samples/hello.escp.bin -o previews
+"""
+import argparse
+import os
+import struct
+import sys
+import time
+import unicodedata
+import zlib
+from functools import lru_cache
+
+import numpy as np
+
+from .escp_bin_renderer import VERTICAL_UNITS_PER_INCH
+from .escp_stream import BIT_IMAGE_DPI, COMMAND, CONDENSED_PITCHES, CONTROL, PITCHES, TEXT, split
+from .magic_encoding import char_set_substitutions, national_codes
+from .optimizer import mode_of
+
+DOTS_PER_INCH = 120
+ROWS_PER_INCH = 72
+GLYPH_ROWS = 9
+GLYPH_COLUMNS = 5
+
+# 5x7 font for ASCII 0x20-0x7e: one byte per column, bit 0 at the top
+_FONT = bytes.fromhex(
+    '0000000000' '00005f0000' '0007000700' '147f147f14' '242a7f2a12' '2313086462' '3649552250' '0005030000'
+    '001c224100' '0041221c00' '082a1c2a08' '08083e0808' '0050300000' '0808080808' '0060600000' '2010080402'
+    '3e5149453e' '00427f4000' '4261514946' '2141454b31' '1814127f10' '2745454539' '3c4a494930' '0171090503'
+    '3649494936' '064949291e' '0036360000' '0056360000' '0814224100' '1414141414' '0041221408' '0201510906'
+    '324979413e' '7e1111117e' '7f49494936' '3e41414122' '7f4141221c' '7f49494941' '7f09090101' '3e41415132'
+    '7f0808087f' '00417f4100' '2040413f01' '7f08142241' '7f40404040' '7f0204027f' '7f0408107f' '3e4141413e'
+    '7f09090906' '3e4151215e' '7f09192946' '4649494931' '01017f0101' '3f4040403f' '1f2040201f' '7f2018207f'
+    '6314081463' '0304780403' '6151494543' '00007f4141' '0204081020' '41417f0000' '0402010204' '4040404040'
+    '0001020400' '2054545478' '7f48444438' '3844444420' '384444487f' '3854545418' '087e090102' '081454543c'
+    '7f08040478' '00447d4000' '2040443d00' '007f102844' '00417f4000' '7c04180478' '7c08040478' '3844444438'
+    '7c14141408' '081414187c' '7c08040408' '4854545420' '043f444020' '3c4040207c' '1c2040201c' '3c4030403c'
+    '4428102844' '0c5050503c' '4464544c44' '0008364100' '00007f0000' '0041360800' '0201020402'
+)
+
+# Dots added by combining accents, as (row, column)
+_ACCENTS = {
+    '̀': [(0, 1), (1, 2)],  # grave
+    '́': [(0, 3), (1, 2)],  # acute
+    '̂': [(1, 1), (0, 2), (1, 3)],  # circumflex
+    '̃': [(1, 0), (0, 1), (1, 2), (0, 3)],  # tilde
+    '̈': [(1, 1), (1, 3)],  # diaeresis
+    '̊': [(0, 2), (1, 1), (1, 3)],  # ring
+    '̧': [(7, 2), (8, 1)],  # cedilla
+}
+
+
+@lru_cache(maxsize=None)
+def _national_chars(variant: int) -> dict[int, str]:
+    """National codes -> characters for an international character set."""
+    return {
+        code[0]: char for char, (v, code) in char_set_substitutions.items()
+        if v.value == variant and code[0] in national_codes
+    }
+
+
+def _char(code: int, variant: int) -> str:
+    national = _national_chars(variant).get(code) if variant else None
+    return national or bytes([code]).decode('cp437')
+
+
+def _box_glyph(name: str, width: int) -> np.ndarray | None:
+    """Box drawing characters span the whole cell so that they join their neighbours."""
+    if not name.startswith('BOX DRAWINGS '):
+        return None
+    glyph = np.zeros((GLYPH_ROWS, width), dtype=bool)
+    middle_row, middle_column = GLYPH_ROWS // 2, width // 2
+    weight = 'LIGHT'
+    for part in name.removeprefix('BOX DRAWINGS ').split(' AND '):
+        words = part.split()
+        weight = next((w for w in words if w in ('LIGHT', 'HEAVY', 'DOUBLE', 'SINGLE')), weight)
+        offsets = [-1, 1] if weight == 'DOUBLE' else [0]
+        for word in words:
+            directions = {'VERTICAL': 'UP DOWN', 'HORIZONTAL': 'LEFT RIGHT'}.get(word, word).split()
+            for direction in directions:
+                for offset in offsets:
+                    match direction:
+                        case 'UP':
+                            glyph[:middle_row + 1, middle_column + offset] = True
+                        case 'DOWN':
+                            glyph[middle_row:, middle_column + offset] = True
+                        case 'LEFT':
+                            glyph[middle_row + offset, :middle_column + 1] = True
+                        case 'RIGHT':
+                            glyph[middle_row + offset, middle_column:] = True
+    return glyph
+
+
+@lru_cache(maxsize=None)
+def _base_glyph(char: str) -> np.ndarray:
+    """5x9 dots of a character: letters with their accents, or a hollow box if unknown."""
+    glyph = np.zeros((GLYPH_ROWS, GLYPH_COLUMNS), dtype=bool)
+    base, *accents = unicodedata.normalize('NFD', char)
+    if 0x20 <= ord(base) <= 0x7e:
+        index = (ord(base) - 0x20) * GLYPH_COLUMNS
+        columns = np.frombuffer(_FONT[index:index + GLYPH_COLUMNS], dtype=np.uint8)
+        glyph[:8] = np.unpackbits(columns[np.newaxis], axis=0, bitorder='little')
+        for accent in accents:
+            for row, column in _ACCENTS.get(accent, []):
+                glyph[row, column] = True
+    elif not char.isspace():
+        glyph[1:7, [0, -1]] = True
+        glyph[[1, 6], :] = True
+    return glyph
+
+
+def _glyph(char: str, width: int) -> np.ndarray:
+    """Dots of a character in a cell `width` dots wide."""
+    try:
+        name = unicodedata.name(char)
+    except ValueError:
+        name = ''
+    box = _box_glyph(name, width)
+    if box is not None:
+        return box
+    glyph = _base_glyph(char)
+    scale = max((width - 1) // GLYPH_COLUMNS, 1)
+    glyph = np.repeat(glyph, scale, axis=1)[:, :width]
+    cell = np.zeros((GLYPH_ROWS, width), dtype=bool)
+    cell[:, :glyph.shape[1]] = glyph
+    return cell
+
+
+@lru_cache(maxsize=256)
+def font(
+        variant: int, width: int, *,
+        bold=False, italic=False, underline=False, double_width=False, double_height=False) -> np.ndarray:
+    """Dots of the 256 codes in a style, as an array of shape (256, rows, width)."""
+    glyphs = np.stack([_glyph(_char(code, variant), width) for code in range(256)])
+    if italic:
+        # shear the top of the glyphs to the right
+        sheared = np.zeros_like(glyphs)
+        for row in range(GLYPH_ROWS):
+            shift = max(6 - row, 0) // 3
+            sheared[:, row, shift:] = glyphs[:, row, :width - shift]
+        glyphs = sheared
+    if bold:
+        glyphs[:, :, 1:] |= glyphs[:, :, :-1].copy()
+    if underline:
+        glyphs[:, -1, :] = True
+    if double_width:
+        glyphs = np.repeat(glyphs, 2, axis=2)
+    if double_height:
+        glyphs = np.repeat(glyphs, 2, axis=1)
+    return glyphs
+
+
+class Emulator:
+    """Interprets an ESC/P byte stream, fed in chunks, and rasterizes it into pages."""
+
+    def __init__(self, pins=9, *, page_width_inches=8.5, page_length_inches=11.0):
+        self.pins = pins
+        self.columns = round(page_width_inches * DOTS_PER_INCH)
+        self.default_page_length = round(page_length_inches * VERTICAL_UNITS_PER_INCH)
+        self.pages: list[np.ndarray] = []
+        self.tail = b''
+        self.reset()
+        # ESC @ does not move the head or the paper
+        self.x = 0
+        self.y = 0
+        self.page = self._new_page()
+        self.used = False
+
+    def reset(self):
+        """Printer state after ESC @."""
+        self.modes: dict[str, int] = {}
+        self.cpi = 10
+        self.margin_left = 0
+        self.margin_right = self.columns
+        self.line_spacing = VERTICAL_UNITS_PER_INCH // 6
+        self.page_length = self.default_page_length
+
+    def _new_page(self) -> np.ndarray:
+        return np.zeros((self.page_length * ROWS_PER_INCH // VERTICAL_UNITS_PER_INCH, self.columns), dtype=bool)
+
+    @property
+    def cell_width(self) -> int:
+        """Width of a character cell in dots, without double width."""
+        if self.modes.get('proportional'):
+            return DOTS_PER_INCH // 10
+        if self.modes.get('condensed'):
+            return int(DOTS_PER_INCH / CONDENSED_PITCHES[self.cpi])
+        return DOTS_PER_INCH // self.cpi
+
+    def feed(self, data: bytes):
+        tokens, consumed = split(self.tail + data)
+        self.tail = (self.tail + data)[consumed:]
+        for kind, token in tokens:
+            if kind == TEXT:
+                self.text(token)
+            elif kind == CONTROL:
+                self.control(token)
+            elif kind == COMMAND:
+                self.command(token)
+
+    def finish(self) -> list[np.ndarray]:
+        """End the last page and return all pages."""
+        if self.tail:
+            raise ValueError(f'Truncated ESC/P command: {self.tail!r}')
+        if self.used or not self.pages:
+            self.form_feed()
+        return self.pages
+
+    def text(self, data: bytes):
+        glyphs = font(
+            self.modes.get('character_set', 0), self.cell_width,
+            bold=bool(self.modes.get('bold') or self.modes.get('double_strike')),
+            italic=bool(self.modes.get('italic')), underline=bool(self.modes.get('underline')),
+            double_width=bool(self.modes.get('double_width')), double_height=bool(self.modes.get('double_height')),
+        )
+        rows, width = glyphs.shape[1:]
+        codes = np.frombuffer(data, dtype=np.uint8)
+        while len(codes):
+            fit = (self.margin_right - self.x) // width
+            if fit <= 0 and self.x > self.margin_left:
+                # the printer starts a new line at the right margin
+                self.carriage_return()
+                self.line_feed()
+                continue
+            run = glyphs[codes[:max(fit, 1)]]
+            codes = codes[len(run):]
+            self.blit(run.transpose(1, 0, 2).reshape(rows, -1))
+
+    def blit(self, dots: np.ndarray):
+        """Print `dots` with their top left corner at the current position, then move right."""
+        rows, columns = dots.shape
+        top = self.y * ROWS_PER_INCH // VERTICAL_UNITS_PER_INCH
+        if top + rows > self.page.shape[0] and self.used:
+            self.form_feed()
+            top = 0
+        visible = dots[:self.page.shape[0] - top, :max(self.columns - self.x, 0)]
+        self.page[top:top + visible.shape[0], self.x:self.x + visible.shape[1]] |= visible
+        self.x += columns
+        self.used = True
+
+    def bit_image(self, command: bytes):
+        mode = command[2]
+        count = command[3] + 256 * command[4]
+        dpi = BIT_IMAGE_DPI.get(mode, 60)
+        if not count:
+            return
+        dots_per_column = 8 if mode < 32 else 24 if mode < 64 else 48
+        vertical_dpi = {8: 72, 24: 180, 48: 360}[dots_per_column]
+        data = np.frombuffer(command[5:], dtype=np.uint8).reshape(count, dots_per_column // 8)
+        bits = np.unpackbits(data, axis=1).astype(bool)  # (columns, dots), top dot first
+        # several dots may fall on the same page row or column
+        columns = np.arange(count) * DOTS_PER_INCH // dpi
+        rows = np.arange(dots_per_column) * ROWS_PER_INCH // vertical_dpi
+        dots = np.zeros((rows[-1] + 1, columns[-1] + 1), dtype=bool)
+        np.logical_or.at(dots, (rows[np.newaxis, :], columns[:, np.newaxis]), bits)
+        self.blit(dots)
+        self.x += count * DOTS_PER_INCH // dpi - dots.shape[1]
+
+    def carriage_return(self):
+        self.x = self.margin_left
+
+    def line_feed(self, distance: int | None = None):
+        self.y += self.line_spacing if distance is None else distance
+        # continuous paper: a feed past the end of the page goes on over the next page
+        page_end = self.page.shape[0] * VERTICAL_UNITS_PER_INCH // ROWS_PER_INCH
+        while self.y >= page_end:
+            overflow = self.y - page_end
+            self.form_feed()
+            self.y = overflow
+            page_end = self.page.shape[0] * VERTICAL_UNITS_PER_INCH // ROWS_PER_INCH
+
+    def form_feed(self):
+        self.pages.append(self.page)
+        self.page = self._new_page()
+        self.used = False
+        self.x = self.margin_left
+        self.y = 0
+
+    def control(self, code: bytes):
+        match code:
+            case b'\r':
+                self.carriage_return()
+            case b'\n':
+                self.carriage_return()
+                self.line_feed()
+            case b'\x0c':
+                self.form_feed()
+            case b'\x08':
+                self.x = max(self.x - self.cell_width, self.margin_left)
+            case b'\x09':
+                tab = 8 * self.cell_width
+                self.x = self.margin_left + ((self.x - self.margin_left) // tab + 1) * tab
+            case b'\x0f':
+                self.modes['condensed'] = 1
+            case b'\x12':
+                self.modes['condensed'] = 0
+
+    def command(self, command: bytes):
+        if mode := mode_of(command):
+            attribute, value = mode
+            self.modes[attribute] = value
+            return
+        match command[1:2]:
+            case b'@':
+                self.reset()
+            case b'P' | b'M' | b'g':
+                self.cpi = PITCHES[command]
+            case b'l':
+                self.margin_left = command[2] * self.cell_width
+                self.x = max(self.x, self.margin_left)
+            case b'Q':
+                self.margin_right = min(command[2] * self.cell_width, self.columns)
+            case b'0':
+                self.line_spacing = VERTICAL_UNITS_PER_INCH // 8
+            case b'2':
+                self.line_spacing = VERTICAL_UNITS_PER_INCH // 6
+            case b'3':
+                self.line_spacing = command[2] * VERTICAL_UNITS_PER_INCH // (216 if self.pins == 9 else 180)
+            case b'+':
+                self.line_spacing = command[2] * VERTICAL_UNITS_PER_INCH // 360
+            case b'A':
+                self.line_spacing = command[2] * VERTICAL_UNITS_PER_INCH // (72 if self.pins == 9 else 60)
+            case b'J':
+                self.line_feed(command[2] * VERTICAL_UNITS_PER_INCH // (216 if self.pins == 9 else 180))
+            case b'C':
+                if command[2] == 0:
+                    self.page_length = command[3] * VERTICAL_UNITS_PER_INCH
+                else:
+                    self.page_length = command[2] * self.line_spacing
+                # the current position becomes the top of the form, the new length applies from the next page
+                if not self.used:
+                    self.page = self._new_page()
+                    self.y = 0
+            case b'$':
+                # 1/60 inch from the left margin
+                self.x = self.margin_left + (command[2] + 256 * command[3]) * DOTS_PER_INCH // 60
+            case b'\\':
+                offset = command[2] + 256 * command[3]
+                self.x = max(self.x + (offset - 65536 if offset >= 32768 else offset), self.margin_left)
+            case b'*':
+                self.bit_image(command)
+
+
+def rasterize(data: bytes, pins=9, **options) -> list[np.ndarray]:
+    """Pages printed by ESC/P `data`, e.g. the output of `EscpToBinRenderer.render`."""
+    emulator = Emulator(pins, **options)
+    emulator.feed(data)
+    return emulator.finish()
+
+
+def write_pgm(path: str | os.PathLike, page: np.ndarray):
+    """Write a page as a binary PGM image, black dots on white."""
+    with open(path, 'wb') as f:
+        f.write(b'P5 %d %d 255\n' % (page.shape[1], page.shape[0]))
+        f.write(np.where(page, 0, 255).astype(np.uint8).tobytes())
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+
+def write_png(path: str | os.PathLike, page: np.ndarray):
+    """Write a page as a 1-bit grayscale PNG image, with its physical dot pitch."""
+    rows, columns = page.shape
+    packed = np.packbits(~page, axis=1)
+    # filter type 0 (none) at the start of every row
+    scanlines = np.hstack([np.zeros((rows, 1), dtype=np.uint8), packed])
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(_png_chunk(b'IHDR', struct.pack('>IIBBBBB', columns, rows, 1, 0, 0, 0, 0)))
+        f.write(_png_chunk(b'pHYs', struct.pack(
+            '>IIB', round(DOTS_PER_INCH / 0.0254), round(ROWS_PER_INCH / 0.0254), 1
+        )))
+        f.write(_png_chunk(b'IDAT', zlib.compress(scanlines.tobytes(), 6)))
+        f.write(_png_chunk(b'IEND', b''))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rasterize an ESC/P binary file into page images')
+    parser.add_argument('file', type=argparse.FileType('rb'), help='Binary file to preview')
+    parser.add_argument('-o', '--out-dir', type=str, required=True, help='Directory for the page images')
+    parser.add_argument('--format', choices=['png', 'pgm'], default='png', help='Image format')
+    parser.add_argument('--pins', type=int, default=9, choices=[9, 24, 48], help='Number of printer pins')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    pages = rasterize(args.file.read(), args.pins)
+    os.makedirs(args.out_dir, exist_ok=True)
+    stem = os.path.basename(args.file.name).split('.')[0]
+    write = write_png if args.format == 'png' else write_pgm
+    for number, page in enumerate(pages, 1):
+        write(os.path.join(args.out_dir, f'{stem}-{number:03}.{args.format}'), page)
+    elapsed = time.perf_counter() - start
+    print(f'{len(pages)} pages in {elapsed:.3f} s', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
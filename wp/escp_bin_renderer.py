@@ -1,18 +1,113 @@
 import math
 import re
-import sys
-from decimal import Decimal
+from fractions import Fraction
+from typing import BinaryIO, Callable, Iterable, Iterator, Mapping, NamedTuple
 
 import escp
 
-from .node import GenericNode
+from .cache import RenderCache
+from .escp_stream import form_feed_offsets, page_offsets
+from .layout import column_widths, is_number, rule, vertical, wrap
+from .linebreak import LINE_BREAKING_MODES, break_lines, word_width
+from .node import FlatTree, GenericNode
+from .optimizer import Optimizer
 from .renderer_abc import Renderer
-from .magic_encoding import plain_char_substitutions, char_set_substitutions
-
-
-def render_escp(content: str, *, pins: int, soft_wrap=True) -> bytes:
-    renderer = EscpToBinRenderer(pins=pins, soft_wrap=soft_wrap)
-    return renderer.render(content)
+from .magic_encoding import magic_encoder
+
+# Horizontal positions and widths are integers in 1/360 inch,
+# which is exact for every supported pitch (10, 12 and 15 cpi).
+UNITS_PER_INCH = 360
+# Vertical positions are integers in 1/1080 inch, which is exact for
+# line spacings in 1/6, 1/8, n/180, n/216 and n/360 inch.
+VERTICAL_UNITS_PER_INCH = 1080
+DEFAULT_LINE_HEIGHT = VERTICAL_UNITS_PER_INCH // 6
+# ESC $ positions are in 1/60 inch
+POSITION_UNIT = UNITS_PER_INCH // 60
+# ESC J feeds are in 1/216 inch on 9-pin printers, 1/180 inch on 24/48-pin printers
+FEED_UNITS = {9: VERTICAL_UNITS_PER_INCH // 216, 24: VERTICAL_UNITS_PER_INCH // 180, 48: VERTICAL_UNITS_PER_INCH // 180}
+# Nodes rendered after pending blanks without printing them first: they do not change how blanks print
+KEEPS_PENDING_SPACES = frozenset(
+    ['text', 'space', 'newline', 'bold', 'italic', 'double-height', 'var', 'soft-wrap', 'line-breaking']
+)
+
+
+class UnencodableCharacter(NamedTuple):
+    """A character the printer cannot print, replaced by '?' at the given output line and column."""
+    char: str
+    line: int
+    column: int
+
+
+class Checkpoint(NamedTuple):
+    """Renderer state between two top-level nodes, see `EscpToBinRenderer.snapshot`."""
+    line_number: int
+    unencodable_count: int
+    layout: tuple
+    """Everything that affects the output of the next nodes: equal layouts render equal bytes."""
+
+
+class ParserState:
+    """Parser progress, kept between calls so a document can be parsed piecewise.
+
+    The parser reports nodes through `add`, `open` and `close`; `FlatTree`
+    implements the same methods to collect them into arrays instead.
+    """
+
+    def __init__(self):
+        self.nodes: list[GenericNode] = []
+        self.current = self.nodes
+        self.stack: list[tuple[GenericNode, list[GenericNode]]] = []
+        self.open_categories: list[str] = []
+
+    def add(self, category: str, value=None):
+        self.current.append(GenericNode(category, value))
+
+    def open(self, category: str, value=None):
+        node = GenericNode(category, value, [])
+        self.current.append(node)
+        self.stack.append((node, self.current))
+        self.open_categories.append(category)
+        self.current = node.children
+
+    def close(self):
+        _, self.current = self.stack.pop()
+        self.open_categories.pop()
+
+    def take_completed(self) -> list[GenericNode]:
+        """Remove and return the top-level nodes that can no longer change."""
+        done = len(self.nodes) - 1 if self.stack else len(self.nodes)
+        completed = self.nodes[:done]
+        del self.nodes[:done]
+        return completed
+
+    def finish(self):
+        if self.stack:
+            raise ValueError(f'Missing closing directive: {self.stack[-1][0].category}')
+
+
+def render_escp(
+        content: str,
+        *,
+        pins: int,
+        soft_wrap=True, init_on_render=False, form_feed_after_render=False, optimize=False, line_breaking='greedy',
+        compact_whitespace=False, cache: RenderCache | None = None) -> bytes:
+    options = dict(
+        pins=pins, soft_wrap=soft_wrap, init_on_render=init_on_render, form_feed_after_render=form_feed_after_render,
+        optimize=optimize, line_breaking=line_breaking, compact_whitespace=compact_whitespace
+    )
+    if cache is not None:
+        key = cache.key(content, **options, files=image_paths(content))
+        if (payload := cache.get(key)) is not None:
+            return payload
+    payload = EscpToBinRenderer(**options).render(content)
+    if cache is not None:
+        cache.put(key, payload)
+    return payload
+
+
+def image_paths(content: str) -> list[str]:
+    """Paths of the images printed by `content`, which its output depends on."""
+    return re.findall(r'\[image:([^:\]]+)', content)
 
 
 class EscpToBinRenderer(Renderer):
@@ -21,39 +116,176 @@ class EscpToBinRenderer(Renderer):
             self,
             pins: int,
             *,
-            soft_wrap=True, init_on_render=False, form_feed_after_render=False):
-        self.escp_commands = escp.lookup_by_pins(pins)
+            soft_wrap=True, init_on_render=False, form_feed_after_render=False, optimize=False,
+            line_breaking='greedy', compact_whitespace=False):
+        """With `compact_whitespace`, runs of blanks become ESC $ absolute positions, blanks at the end
+        of a line are dropped and runs of line feeds become ESC J feeds, where that saves bytes.
+        """
+        if line_breaking not in LINE_BREAKING_MODES:
+            raise ValueError(f'Unknown line breaking: {line_breaking}')
         self.pins = pins
-        self.soft_wrap = soft_wrap
+        self.initial_soft_wrap = soft_wrap
+        self.initial_line_breaking = line_breaking
         self.init_on_render = init_on_render
         self.form_feed_after_render = form_feed_after_render
+        self.optimize = optimize
+        self.compact_whitespace = compact_whitespace
+        self.variables: Mapping[str, object] = {}
+        # Custom directive name -> paired
+        self.custom_directives: dict[str, bool] = {}
+        self.reset()
+
+    def reset(self):
+        """Clear the output and document state so the renderer can be reused for another document."""
+        self.escp_commands = escp.lookup_by_pins(self.pins)
+        self.soft_wrap = self.initial_soft_wrap
+        # greedy: word by word, optimal: whole paragraphs, justify: optimal and justified
+        self.line_breaking = self.initial_line_breaking
+        self.proportional = False
+        self.double_width = False
+        self.underline = False
+        self.justification = 'left'
+        # blanks not printed yet, see `space`
+        self.pending_spaces = 0
+        # whether current_line_position is where the printer is, so ESC $ can be used
+        self.position_exact = True
         self.directives_processed_once = []
+        self.line_number = 1
+        self.unencodable: list[UnencodableCharacter] = []
         self.tokens = []
         self.box_width = None
-        self.current_line_position_inch = 0
-        self.page_width_inches = 8.0
+        self.current_line_position = 0
+        self.page_width_inches = 8
         self.cpi = 10
         self.margin_left = 0
         self.margin_right = 80
+        self.char_width = 0
+        self.printable_width = 0
+        self._update_widths()
         self.previous_node = None
         self.text_buffer = ''
+        self.line_height = DEFAULT_LINE_HEIGHT
+        self.double_height = False
+        # no pagination until a page-length directive
+        self.page_length: int | None = None
+        self.vertical_position = 0
+        self.page_offsets: list[int] = []
+        """Output offsets at which the second and following pages start."""
+        self.output_offset = 0
+
+    def snapshot(self) -> Checkpoint:
+        """Capture the state reached after the last rendered top-level node."""
+        return Checkpoint(self.line_number, len(self.unencodable), (
+            self.escp_commands.current_character_set, self.soft_wrap, tuple(self.directives_processed_once),
+            self.current_line_position, self.page_width_inches, self.cpi, self.margin_left, self.margin_right,
+            self.box_width, self.text_buffer, self.line_height, self.double_height, self.page_length,
+            self.vertical_position, self.line_breaking, self.justification, self.pending_spaces, self.position_exact,
+            self.proportional, self.double_width, self.underline,
+        ))
+
+    def restore(self, checkpoint: Checkpoint):
+        """Go back to a state captured by `snapshot`, to render from there again."""
+        (
+            self.escp_commands.current_character_set, self.soft_wrap, directives_processed_once,
+            self.current_line_position, self.page_width_inches, self.cpi, self.margin_left, self.margin_right,
+            self.box_width, self.text_buffer, self.line_height, self.double_height, self.page_length,
+            self.vertical_position, self.line_breaking, self.justification, self.pending_spaces, self.position_exact,
+            self.proportional, self.double_width, self.underline,
+        ) = checkpoint.layout
+        self.directives_processed_once = list(directives_processed_once)
+        self.line_number = checkpoint.line_number
+        del self.unencodable[checkpoint.unencodable_count:]
+        self._update_widths()
+        # output and page breaks of a render that did not reach a checkpoint, e.g. one that failed
+        self._take_output()
+        self.page_offsets.clear()
 
     def cr_lf(self, how_many=1):
-        for _ in range(how_many):
-            self.escp_commands.cr_lf()
-        self.current_line_position_inch = 0
+        # blanks at the end of a line are not printed
+        self.pending_spaces = 0
+        if self.page_length is None:
+            self.line_feeds(how_many)
+        else:
+            feeds = 0
+            for _ in range(how_many):
+                self.vertical_position += self.line_height
+                line_extent = self.line_height * 2 if self.double_height else self.line_height
+                if self.vertical_position + line_extent > self.page_length:
+                    # the next line would not fit on the page
+                    self.line_feeds(feeds)
+                    feeds = 0
+                    self.page_break()
+                else:
+                    feeds += 1
+            self.line_feeds(feeds)
+        self.current_line_position = 0
+        self.position_exact = True
+        self.line_number += how_many
+
+    def line_feeds(self, how_many: int):
+        """Return the carriage and feed `how_many` lines, with a CR and ESC J feeds when that is shorter."""
+        unit = FEED_UNITS.get(self.pins)
+        if not self.compact_whitespace or how_many < 3 or not unit or self.line_height % unit:
+            for _ in range(how_many):
+                self.escp_commands.cr_lf()
+            return
+        feed = how_many * self.line_height // unit
+        self.escp_commands.text(b'\r' + b''.join(
+            b'\x1bJ' + bytes([min(feed - offset, 255)]) for offset in range(0, feed, 255)
+        ))
+
+    def page_break(self):
+        self.escp_commands.form_feed()
+        self.vertical_position = 0
+        self.page_offsets.append(self.output_size())
+
+    def space(self, how_many=1):
+        """Print blanks. Blanks that only move the head are kept pending until something is printed after them.
+
+        Blanks are always printed when the line is centered or right-aligned, since they count in its width.
+        """
+        if self.compact_whitespace and self.justification == 'left' and not (
+                self.underline or self.proportional or self.double_width):
+            self.pending_spaces += how_many
+            self.current_line_position += how_many * self.char_width
+        else:
+            self.text(' ' * how_many)
+
+    def flush_spaces(self):
+        """Move the head over the pending blanks, with an ESC $ absolute position if shorter than the blanks."""
+        how_many = self.pending_spaces
+        self.pending_spaces = 0
+        # ESC $ nL nH is 4 bytes
+        if how_many > 4 and self.position_exact:
+            position = self.current_line_position // POSITION_UNIT
+            self.escp_commands.text(b'\x1b$' + bytes([position & 0xff, position >> 8]))
+        else:
+            self.escp_commands.text(' ' * how_many)
 
     def text(self, text: str):
+        if self.pending_spaces:
+            self.flush_spaces()
         self.escp_commands.text(text)
-        self.current_line_position_inch += self.text_width_inches(text)
-
-    def magic_text(self, text: str):
-        self.escp_commands.magic_text(
-            text,
-            character_set_substitution=char_set_substitutions,
-            plain_text_substitution=plain_char_substitutions
+        self.current_line_position += self.text_width(text)
+        if self.proportional or self.double_width:
+            self.position_exact = False
+
+    def magic_text(self, text: str, width: int | None = None):
+        if self.pending_spaces:
+            self.flush_spaces()
+        encoded, character_set, unencodable = magic_encoder.encode(
+            text, self.escp_commands.current_character_set
         )
-        self.current_line_position_inch += self.text_width_inches(text)
+        if unencodable:
+            column = self.current_line_position // self.char_width + 1
+            self.unencodable.extend(
+                UnencodableCharacter(text[i], self.line_number, column + i) for i in unencodable
+            )
+        self.escp_commands.current_character_set = character_set
+        self.escp_commands.text(encoded)
+        self.current_line_position += self.text_width(text) if width is None else width
+        if self.proportional or self.double_width:
+            self.position_exact = False
 
     def lexer(self, content: str) -> list[str]:
         split = re.split(r'( |\n|\[|]|:)', content)
@@ -67,105 +299,145 @@ class EscpToBinRenderer(Renderer):
         return root
 
     def _parse(self, tokens: list[str]) -> list[GenericNode]:
-        def extract_directive_with_params(start_at, end_at) -> list[str]:
-            directive_tokens = tokens[start_at+1:end_at]
-            return [t for t in directive_tokens if t != ':']
-
-        def find_next_closing_bracket(start_at) -> int:
-            return tokens[start_at:].index(']') + start_at
-
-        def find_directive_index(start_at, directive, first_arg) -> int:
-            for i in range(start_at, len(tokens)):
-                if tokens[i] == '[' and tokens[i+1] == directive and tokens[i+3] == first_arg:
-                    return i
-
-        nodes = []
+        state = ParserState()
+        self._parse_tokens(tokens, state)
+        state.finish()
+        return state.nodes
+
+    def parse_flat(self, tokens: list[str]) -> FlatTree:
+        """Parse into a `FlatTree` without building node objects."""
+        tree = FlatTree()
+        self._parse_tokens(tokens, tree)
+        if len(tree.open_categories) > 1:
+            raise ValueError(f'Missing closing directive: {tree.open_categories[-1]}')
+        return tree.finish()
+
+    def _parse_tokens(self, tokens: list[str], state: ParserState):
+        """Add the nodes for `tokens` to `state` in a single forward pass.
+
+        Paired directives (`[bold:on]...[bold:off]`) are tracked on a stack
+        instead of searching for the closing tag and re-parsing a slice,
+        so the cost is linear in the number of tokens.
+        """
         i = 0
-        while i < len(tokens):
+        n = len(tokens)
+        while i < n:
             match tokens[i]:
                 case '[':
-                    closing_bracket_index = find_next_closing_bracket(i)
-                    directive_with_params = extract_directive_with_params(i, closing_bracket_index)
+                    closing_bracket_index = tokens.index(']', i)
+                    directive_with_params = [t for t in tokens[i+1:closing_bracket_index] if t != ':']
                     directive = directive_with_params[0]
                     args = directive_with_params[1:]
+                    i = closing_bracket_index + 1
                     match directive:
                         case 'init':
                             # no arg
-                            nodes.append(GenericNode(directive, []))
-                            i = closing_bracket_index + 1
+                            state.add(directive, [])
                         case 'pragma':
-                            nodes.append(GenericNode(directive, args[0]))
-                            i = closing_bracket_index + 1
+                            state.add(directive, args[0])
                         case 'soft-wrap':
                             # directive on/off
-                            nodes.append(GenericNode(directive, self._on_off_as_bool(args[0])))
-                            i = closing_bracket_index + 1
+                            state.add(directive, self._on_off_as_bool(args[0]))
+                        case 'line-breaking':
+                            # 1 string argument
+                            if args[0] not in LINE_BREAKING_MODES:
+                                raise ValueError(f'Unknown line breaking: {args[0]}')
+                            state.add(directive, args[0])
                         case 'bold' | 'italic' | 'underline' | 'condensed' | 'box' | 'proportional' | \
-                             'double-width' | 'double-height':
+                             'double-width' | 'double-height' | 'table':
                             # directive w/ closing tag - 1 on/off argument + other optional arguments
-                            next_directive_index = find_directive_index(i, directive, 'off')
-                            args[0] = self._on_off_as_bool(args[0])
-                            node = GenericNode(directive, args)
-                            # TODO Not part of the lexer
-                            children = self._parse(tokens[closing_bracket_index+1:next_directive_index])
-                            node.add(children)
-                            nodes.append(node)
-                            i = find_next_closing_bracket(next_directive_index) + 1
+                            self._open_or_close(directive, args, state)
+                        case 'var':
+                            # template placeholder, filled in at render time
+                            state.add(directive, args[0])
                         case 'justification' | 'symbol' | 'font':
                             # 1+ string argument(s)
-                            nodes.append(GenericNode(directive, args))
-                            i = closing_bracket_index + 1
+                            state.add(directive, args)
                         case 'cpi':
                             # 1 int argument
-                            nodes.append(GenericNode(directive, [int(args[0])]))
-                            i = closing_bracket_index + 1
+                            state.add(directive, [int(args[0])])
                         case 'line-spacing':
                             # 2 int arguments
-                            nodes.append(GenericNode(directive, [int(args[0]), int(args[1])]))
-                            i = closing_bracket_index + 1
+                            state.add(directive, [int(args[0]), int(args[1])])
                         case 'margin' | 'page-length':
                             # 1 string argument + 1 int argument
-                            nodes.append(GenericNode(directive, [args[0], int(args[1])]))
-                            i = closing_bracket_index + 1
+                            state.add(directive, [args[0], int(args[1])])
+                        case 'image':
+                            # path + optional int width in characters + optional dithering
+                            width = next((int(arg) for arg in args[1:] if arg.isdigit()), None)
+                            dithering = next((arg for arg in args[1:] if not arg.isdigit()), 'floyd-steinberg')
+                            state.add(directive, [args[0], width, dithering])
+                        case _ if directive in self.custom_directives:
+                            if self.custom_directives[directive]:
+                                self._open_or_close(directive, args, state)
+                            else:
+                                state.add(directive, args)
                         case _:
                             raise ValueError(f'Unknown directive: {directive}')
                 case '\n':
-                    how_many = 0
-                    while i < len(tokens) and tokens[i] == '\n':
-                        how_many += 1
-                        i += 1
-                    nodes.append(GenericNode('newline', how_many))
+                    j = i
+                    while j < n and tokens[j] == '\n':
+                        j += 1
+                    state.add('newline', j - i)
+                    i = j
                 case ' ':
-                    how_many = 0
-                    while i < len(tokens) and tokens[i] == ' ':
-                        how_many += 1
-                        i += 1
-                    nodes.append(GenericNode('space', how_many))
+                    j = i
+                    while j < n and tokens[j] == ' ':
+                        j += 1
+                    state.add('space', j - i)
+                    i = j
                 case _:
-                    text = ''
                     j = i
-                    while j < len(tokens) and tokens[j] not in ['[', '\n', ' ']:
-                        text += tokens[j]
+                    while j < n and tokens[j] not in ('[', '\n', ' '):
                         j += 1
-                    node = GenericNode('text', text.strip())
-                    nodes.append(node)
+                    state.add('text', ''.join(tokens[i:j]).strip())
                     i = j
-        return nodes
+
+    def _open_or_close(self, directive: str, args: list, state: ParserState):
+        args[0] = self._on_off_as_bool(args[0])
+        if args[0]:
+            state.open(directive, args)
+        else:
+            if not state.open_categories or state.open_categories[-1] != directive:
+                raise ValueError(f'Unexpected closing directive: {directive}')
+            state.close()
+
+    def register_directive(self, name: str, handler: Callable, *, paired=False):
+        """Accept a custom `[name:...]` directive, rendered by `handler(renderer, node)`.
+
+        The node value is the list of directive arguments. A paired directive
+        is opened with `[name:on:...]` and closed with `[name:off]`, like
+        `bold`, and the handler renders its children with `render_children`.
+        """
+        self.custom_directives[name] = paired
+        self.register_handler(name, handler)
 
     def _render(self, node: GenericNode):
-        category = node.category.replace('-', '_')
-        func = getattr(self, f'render_{category}')
-        func(node)
+        if self.pending_spaces and node.category not in KEEPS_PENDING_SPACES:
+            self.flush_spaces()
+        self.handlers[node.category](self, node)
         self.previous_node = node
 
     def render_root(self, node: GenericNode):
+        self.render_start()
+        self.render_children(node)
+        self.render_end()
+
+    def render_start(self):
         if self.init_on_render:
             self.escp_commands.init()
-        self.render_children(node)
+
+    def render_end(self):
+        self.pending_spaces = 0
+        if self.escp_commands.current_character_set != magic_encoder.default_character_set:
+            self.escp_commands.character_set(magic_encoder.default_character_set)
         if self.form_feed_after_render:
             self.escp_commands.form_feed()
         else:
             self.cr_lf()
+        # a page break on the last line does not start a page
+        while self.page_offsets and self.page_offsets[-1] >= self.output_size():
+            self.page_offsets.pop()
 
     def render_pragma(self, node: GenericNode):
         # TODO Check this is the first directive
@@ -183,6 +455,8 @@ class EscpToBinRenderer(Renderer):
     def render_init(self, node: GenericNode):
         assert node.value == []
         self.escp_commands.init()
+        self.escp_commands.current_character_set = magic_encoder.default_character_set
+        self.line_height = DEFAULT_LINE_HEIGHT
 
     def render_margin(self, node: GenericNode):
         side = next(m for m in escp.Margin if m.name.lower() == node.value[0])
@@ -190,23 +464,78 @@ class EscpToBinRenderer(Renderer):
         match side:
             case escp.Margin.LEFT: self.margin_left = value
             case escp.Margin.RIGHT: self.margin_right = value
+        self._update_widths()
         self.escp_commands.margin(side, value)
+        if self.current_line_position > 0:
+            # the head stays where it is, but ESC $ positions are now from the new margin
+            self.position_exact = False
 
     def render_line_spacing(self, node: GenericNode):
         self.escp_commands.line_spacing(node.value[0], node.value[1])
+        self.line_height = node.value[0] * VERTICAL_UNITS_PER_INCH // node.value[1]
 
     def render_cpi(self, node: GenericNode):
         value = node.value[0]
         self.cpi = value
+        self._update_widths()
         self.escp_commands.character_width(value)
 
     def render_page_length(self, node: GenericNode):
-        print("Skipping page length directive")
-        # TODO Implement this
+        """Set the page length in lines of the current line spacing or in inches, and paginate from here.
+
+        The printer takes the current position as the top of the page.
+        """
+        unit, value = node.value
+        match unit:
+            case 'lines':
+                self.escp_commands.page_length(value, escp.PageLengthUnit.LINES)
+                self.page_length = value * self.line_height
+            case 'inches':
+                self.escp_commands.page_length(value, escp.PageLengthUnit.INCHES)
+                self.page_length = value * VERTICAL_UNITS_PER_INCH
+            case _:
+                raise ValueError(f'Invalid page length unit: {unit}')
+        self.vertical_position = 0
+
+    def render_image(self, node: GenericNode):
+        """Print an image as bit-image bands, from the left margin of a new line.
+
+        The width is in characters of the current pitch, one dot per image
+        pixel by default, and never more than the printable width.
+        """
+        from . import image
+
+        path, columns, dithering = node.value
+        fmt = image.band_format(self.pins)
+        width = None if columns is None else columns * self.char_width * fmt.horizontal_dpi // UNITS_PER_INCH
+        bands = image.bit_image_bands(
+            path, self.pins, width=width, max_width=self.printable_width * fmt.horizontal_dpi // UNITS_PER_INCH,
+            dithering=dithering,
+        )
+        if self.current_line_position > 0:
+            self.cr_lf()
+        band_height = fmt.dots * VERTICAL_UNITS_PER_INCH // fmt.vertical_dpi
+        if self.page_length is not None and self.vertical_position and \
+                self.vertical_position + band_height > self.page_length:
+            # the line is shorter than a band
+            self.page_break()
+        for i, band in enumerate(bands, 1):
+            if band:
+                self.escp_commands.text(band + b'\r')
+            # as in cr_lf, a form feed replaces the feed if the next band or line would not fit
+            next_height = band_height if i < len(bands) else self.line_height
+            if self.page_length is not None and \
+                    self.vertical_position + band_height + next_height > self.page_length:
+                self.page_break()
+            else:
+                self.escp_commands.text(b'\x1bJ' + bytes([fmt.feed]))
+                if self.page_length is not None:
+                    self.vertical_position += band_height
 
     def render_justification(self, node: GenericNode):
         justification = next(j for j in escp.Justification if j.name.lower() == node.value[0])
         self.escp_commands.justify(justification)
+        self.justification = node.value[0]
 
     def render_symbol(self, node: GenericNode):
         symbol = node.value[0]
@@ -230,25 +559,31 @@ class EscpToBinRenderer(Renderer):
 
     def render_proportional(self, node: GenericNode):
         self.escp_commands.proportional(True)
+        self.proportional = True
         self.render_children(node)
         self.escp_commands.proportional(False)
+        self.proportional = False
 
     def render_double_width(self, node: GenericNode):
         self.escp_commands.double_character_width(True)
+        self.double_width = True
         self.render_children(node)
         self.escp_commands.double_character_width(False)
+        self.double_width = False
 
     def render_double_height(self, node: GenericNode):
         self.escp_commands.double_character_height(True)
+        self.double_height = True
         self.render_children(node)
         self.escp_commands.double_character_height(False)
+        self.double_height = False
 
     def render_newline(self, node: GenericNode):
         how_many = node.value
-        if not self.soft_wrap and self.current_line_position_inch > 0:
+        if not self.soft_wrap and self.current_line_position > 0:
             # how_many = 0 if how_many == 1 else how_many
             pass
-        elif self.current_line_position_inch == 0 and self.soft_wrap:
+        elif self.current_line_position == 0 and self.soft_wrap:
             how_many -= 1
 
         if how_many > 0:
@@ -266,108 +601,355 @@ class EscpToBinRenderer(Renderer):
 
     def render_underline(self, node: GenericNode):
         self.escp_commands.underline(True)
+        self.underline = True
         self.render_children(node)
         self.escp_commands.underline(False)
+        self.underline = False
 
     def output_text_in_box(self, thickness):
+        """Print the box text centered between vertical lines, one line per line of text, wrapped if too long."""
         if self.text_buffer:
-            self.box_vert_line(thickness)
-            text = self.center_text(self.text_buffer.rstrip('\n'), b'\xb3\xb3')
-            self.magic_text(text)
-            self.box_vert_line(thickness)
-            self.cr_lf()
+            width = (self.printable_width - 2 * self.char_width) // self.char_width
+            for paragraph in self.text_buffer.strip('\n').split('\n'):
+                # without room inside the box, lines are printed as they are
+                for line in [paragraph] if len(paragraph) <= width or width < 1 else wrap(paragraph, width):
+                    self.box_vert_line(thickness)
+                    text = self.center_text(line, b'\xb3\xb3')
+                    body = text.lstrip(' ')
+                    self.space(len(text) - len(body))
+                    self.magic_text(body.rstrip(' '))
+                    self.space(len(body) - len(body.rstrip(' ')))
+                    self.box_vert_line(thickness)
+                    self.cr_lf()
             self.text_buffer = ''
 
     def render_box(self, node: GenericNode):
-        self.text_buffer = ''  # wrap not handled in box
+        thickness = int(node.value[2])
+        self.text_buffer = self.plain_text(node, 'box')
 
-        if self.current_line_position_inch > 0:
+        if self.current_line_position > 0:
             self.cr_lf()
 
-        thickness = int(node.value[2])
         self.box_horizontal_line('top', thickness)
         self.cr_lf()
+        self.output_text_in_box(thickness)
+        self.box_horizontal_line('bottom', thickness)
+
+    def render_table(self, node: GenericNode):
+        """Print rows of `|`-separated cells in ruled columns, the first row being the header.
+
+        Column widths are computed once for the whole table; longer cells wrap
+        inside their column and numbers are aligned to the right.
+        """
+        thickness = int(node.value[2]) if len(node.value) > 2 else 1
+        rows = [
+            [cell.strip() for cell in line.split('|')]
+            for line in self.plain_text(node, 'table').split('\n') if line.strip()
+        ]
+        if not rows:
+            return
+        columns = max(map(len, rows))
+        rows = [row + [''] * (columns - len(row)) for row in rows]
+        # a space on both sides of the cells, a vertical line between columns and on both sides
+        widths = column_widths(rows, self.printable_width // self.char_width - 3 * columns - 1)
+        ruled = tuple(width + 2 for width in widths)
+        bar = vertical(thickness)
+
+        if self.current_line_position > 0:
+            self.cr_lf()
+
+        self.escp_commands.text(rule(ruled, thickness, 'top'))
+        self.cr_lf()
+        for i, row in enumerate(rows):
+            if i == 1:
+                self.escp_commands.text(rule(ruled, thickness, 'middle'))
+                self.cr_lf()
+            cells = [wrap(cell, width) for cell, width in zip(row, widths)]
+            for n in range(max(map(len, cells))):
+                for cell, width in zip(cells, widths):
+                    text = cell[n] if n < len(cell) else ''
+                    padding = width - len(text)
+                    self.text(bar)
+                    self.space(padding + 1 if is_number(text) else 1)
+                    if text:
+                        self.magic_text(text)
+                    self.space(1 if is_number(text) else padding + 1)
+                self.text(bar)
+                self.cr_lf()
+        self.escp_commands.text(rule(ruled, thickness, 'bottom'))
+        self.cr_lf()
 
+    def plain_text(self, node: GenericNode, directive: str) -> str:
+        """Text, spaces and newlines in `node`, template variables filled in."""
+        parts = []
         for child in node.children:
-            match child.category:
-                case 'text':
-                    self.text_buffer += child.value
-                case 'space':
-                    self.text_buffer += child.value * ' '
-                case 'newline':
-                    self.output_text_in_box(thickness)
-                    self.cr_lf()
+            for c in self.var_nodes(child) if child.category == 'var' else [child]:
+                match c.category:
+                    case 'text':
+                        parts.append(c.value)
+                    case 'space':
+                        parts.append(c.value * ' ')
+                    case 'newline':
+                        parts.append(c.value * '\n')
+                    case _:
+                        raise ValueError(f'node category not allowed in {directive}: {c.category}')
+        return ''.join(parts)
+
+    def render_var(self, node: GenericNode):
+        for child in self.var_nodes(node):
+            self._render(child)
+
+    def var_nodes(self, node: GenericNode) -> list[GenericNode]:
+        """Nodes for the value of a template variable. Markup in the value is printed as is."""
+        try:
+            value = str(self.variables[node.value])
+        except KeyError:
+            raise ValueError(f'Missing template variable: {node.value}')
+        nodes = []
+        for part in re.split(r'( +|\n+)', value):
+            match part[:1]:
+                case '':
+                    pass
+                case ' ':
+                    nodes.append(GenericNode('space', len(part)))
+                case '\n':
+                    nodes.append(GenericNode('newline', len(part)))
                 case _:
-                    raise ValueError(f'node category not allowed in box: {child.category}')
+                    nodes.append(GenericNode('text', part))
+        return nodes
 
-        self.output_text_in_box(thickness)
-        self.box_horizontal_line('bottom', thickness)
+    def _inline_variables(self, nodes: list[GenericNode]) -> list[GenericNode]:
+        """`nodes` with template variables replaced by their value, joined to the text, spaces or newlines around them.
+
+        Lines then break as in the document with the values written in place.
+        """
+        inlined = []
+        joinable = False
+        for node in nodes:
+            is_var = node.category == 'var'
+            for child in self.var_nodes(node) if is_var else [node]:
+                previous = inlined[-1] if inlined else None
+                if (is_var or joinable) and previous is not None and previous.category == child.category and \
+                        child.category in ('text', 'space', 'newline'):
+                    inlined[-1] = GenericNode(child.category, previous.value + child.value)
+                else:
+                    inlined.append(child)
+            joinable = is_var
+        return inlined
 
     def render_soft_wrap(self, node: GenericNode):
         self.soft_wrap = node.value
 
+    def render_line_breaking(self, node: GenericNode):
+        """Break paragraphs greedily, optimally or justified.
+
+        Proportional text is measured with the approximate widths of `linebreak`, not the printer's width table.
+        """
+        self.line_breaking = node.value
+
     def render_space(self, node: GenericNode):
-        spaces = node.value * ' '
-        inches = self.text_width_inches(spaces)
+        width = node.value * self.char_width
         if node.value == 1:
             # Regular space
-            if self.current_line_position_inch + inches > self.printable_width_inches():
+            if self.current_line_position + width > self.printable_width:
                 # Omitted if at the end of a line and won't fit
                 self.cr_lf()
             else:
-                self.text(' ')
+                self.space()
         else:
             # Several spaces. Always print but break line if needed
             i = node.value
             while i > 0:
-                if self.current_line_position_inch + inches > self.printable_width_inches():
+                if self.current_line_position + width > self.printable_width:
                     self.cr_lf()
-                self.text(' ')
+                self.space()
                 i -= 1
 
     def render_text(self, node: GenericNode):
+        if self.line_breaking != 'greedy' and self.soft_wrap:
+            self._render_paragraph(node.value)
+            return
         words = node.value.split(' ')
-        for idx, word in enumerate(words):
-            try:
-                word = self.transcode(word)
-                inches = self.text_width_inches(word)
-                if self.current_line_position_inch + inches > self.printable_width_inches():
-                    self.cr_lf()
-                self.magic_text(word)
-            except UnicodeEncodeError as e:
-                if word:
-                    print(f'UnicodeEncodeError for word: [{word}]', file=sys.stderr)
-                raise e
-
-    def transcode(self, text: str) -> str:
-        text = text.replace('\u2019', "'")  # french apostrophe
-        return text
+        for word in words:
+            if self.current_line_position + self.text_width(word) > self.printable_width:
+                self.cr_lf()
+            self.magic_text(word)
+
+    def _render_paragraph(self, text: str):
+        """Render text of words separated by single spaces, breaking lines for the whole of it at once."""
+        words = text.split(' ')
+        widths = [self.word_width(word) for word in words]
+        space = self.word_width(' ')
+        if widths[0] > self.printable_width - self.current_line_position > 0:
+            self.cr_lf()
+        breaks = break_lines(widths, space, self.printable_width - self.current_line_position, self.printable_width)
+        starts = [0] + breaks
+        ends = breaks + [len(words)]
+        for line, (start, end) in enumerate(zip(starts, ends)):
+            if line:
+                self.cr_lf()
+            gaps = end - start - 1
+            extra = 0
+            if self.line_breaking == 'justify' and end < len(words) and gaps:
+                length = sum(widths[start:end]) + gaps * space
+                extra = max(self.printable_width - self.current_line_position - length, 0) // space
+            text = words[start]
+            for i in range(start + 1, end):
+                # extra spaces go to the first gaps
+                text += ' ' * (1 + extra // gaps + (i - start <= extra % gaps)) + words[i]
+            self.magic_text(text, sum(widths[start:end]) + (gaps + extra) * space)
+
+    def word_width(self, word: str) -> int:
+        return word_width(word, self.char_width, self.proportional, self.double_width)
 
     def render_children(self, node: GenericNode):
-        for child in node.children:
-            self._render(child)
+        self._render_nodes(node.children)
+
+    def _render_nodes(self, nodes: list[GenericNode]):
+        """Render sibling nodes, joining text and single spaces into one text node unless breaking greedily."""
+        if any(node.category == 'var' for node in nodes):
+            nodes = self._inline_variables(nodes)
+        run = []
+        for node in nodes:
+            if self.line_breaking != 'greedy' and self.soft_wrap and (
+                node.category == 'text' or node.category == 'space' and node.value == 1
+            ):
+                run.append(node)
+                continue
+            if run:
+                self._render_run(run)
+                run = []
+            self._render(node)
+        if run:
+            self._render_run(run)
+
+    def _render_run(self, nodes: list[GenericNode]):
+        """Render a run of text and single space nodes as one paragraph, through the text handler."""
+        self._render(GenericNode('text', ''.join(' ' if node.category == 'space' else node.value for node in nodes)))
 
     def render(self, content: str) -> bytes:
-        tokens = self.lexer(content)
-        root = self.parse(tokens)
-        self._render(root)
-        return self.escp_commands.buffer
-
-    def char_width_inches(self, _char: str | bytes) -> Decimal:
-        return Decimal(1) / Decimal(self.cpi)
-
-    def text_width_inches(self, text: str) -> Decimal:
-        return sum([self.char_width_inches(c) for c in text])
-
-    def printable_width_inches(self) -> Decimal:
+        with self.phase('lex'):
+            tokens = self.lexer(content)
+        self.count_tokens(tokens)
+        with self.phase('parse'):
+            root = self.parse(tokens)
+        return self.render_tree(root)
+
+    def render_tree(self, root: GenericNode) -> bytes:
+        with self.phase('render'):
+            self._render(root)
+        output = self._take_output()
+        if self.optimize:
+            with self.phase('optimize'):
+                optimizer = Optimizer()
+                body = optimizer.feed(output)
+                output = body + optimizer.flush()
+            if self.page_length is not None:
+                # mode changes flushed after a last form feed do not start a page
+                self.page_offsets = page_offsets(body)
+        # one copy into immutable bytes; streaming hands the buffers over instead
+        return bytes(output)
+
+    def output_size(self) -> int:
+        return self.output_offset + len(self._pending_output())
+
+    def render_stream(self, content: Iterable[str]) -> Iterator[bytes]:
+        """Render a document given as chunks of text, e.g. an open file.
+
+        Chunks are cut after a run of newlines, and every top-level node is
+        rendered as soon as it is complete, so output is produced while the
+        input is still being read. The concatenated output is the same as
+        `render` on the whole document.
+        """
+        chunks = self._render_stream(content)
+        if not self.optimize:
+            yield from chunks
+            return
+        # page offsets are found again in the optimized output
+        optimizer = Optimizer()
+        offsets = []
+        size = 0
+        for chunk in chunks:
+            optimized = optimizer.feed(chunk)
+            if self.page_length is not None:
+                offsets += (size + offset for offset in form_feed_offsets(optimized))
+            size += len(optimized)
+            if optimized:
+                yield optimized
+        if tail := optimizer.flush():
+            yield tail
+        # mode changes flushed after a last form feed do not start a page
+        self.page_offsets = [offset for offset in offsets if offset < size]
+
+    def render_to(self, content: Iterable[str], file: BinaryIO) -> int:
+        """Render chunks of text into a binary file as with `render_stream`. Return the number of bytes written."""
+        size = 0
+        for chunk in self.render_stream(content):
+            file.write(chunk)
+            size += len(chunk)
+        return size
+
+    def _render_stream(self, content: Iterable[str]) -> Iterator[bytes]:
+        state = ParserState()
+        self.render_start()
+        pending = []
+        for chunk in content:
+            pending.append(chunk)
+            if '\n' not in chunk:
+                continue
+            text = ''.join(pending)
+            # the trailing newline run may go on in the next chunk
+            cut = text.rstrip('\n').rfind('\n') + 1
+            pending = [text[cut:]]
+            if cut:
+                self._parse_chunk(text[:cut], state)
+                yield from self._render_completed(state)
+        self._parse_chunk(''.join(pending), state)
+        state.finish()
+        yield from self._render_completed(state)
+        self.render_end()
+        yield self._take_output()
+
+    def _parse_chunk(self, text: str, state: ParserState):
+        with self.phase('lex'):
+            tokens = self.lexer(text)
+        self.count_tokens(tokens)
+        with self.phase('parse'):
+            self._parse_tokens(tokens, state)
+
+    def _render_completed(self, state: ParserState) -> Iterator[bytes]:
+        with self.phase('render'):
+            self._render_nodes(state.take_completed())
+        output = self._take_output()
+        if output:
+            yield output
+
+    def _pending_output(self) -> bytearray:
+        # escp 0.0.6, pinned in requirements.txt, keeps its output in the private `Commands._buffer` and its
+        # `buffer` property returns a copy: this and `_take_output` are the only places relying on it
+        return self.escp_commands._buffer
+
+    def _take_output(self) -> bytearray:
+        # hand over the buffer instead of copying it
+        output = self._pending_output()
+        self.escp_commands._buffer = bytearray()
+        self.output_offset += len(output)
+        return output
+
+    def _update_widths(self):
+        """Recompute the cached widths after a pitch or margin change."""
+        self.char_width = UNITS_PER_INCH // self.cpi
         chars_per_line = self.page_width_inches * self.cpi
-        return (
-            Decimal(self.page_width_inches) -
-            Decimal(chars_per_line - (self.margin_right - self.margin_left)) * Decimal('0.1')
+        self.printable_width = (
+            self.page_width_inches * UNITS_PER_INCH -
+            (chars_per_line - (self.margin_right - self.margin_left)) * UNITS_PER_INCH // 10
         )
 
+    def text_width(self, text: str | bytes) -> int:
+        return len(text) * self.char_width
+
     def check_and_store_pragma(self, pragma) -> bool:
-        if self.escp_commands.buffer != b'':
+        if self._pending_output():
             raise ValueError('[pragma] must be the first line in the file')
         name = pragma[1:-1].split(':')[1]
         if name in self.directives_processed_once:
@@ -379,35 +961,19 @@ class EscpToBinRenderer(Renderer):
         return {'on': True, 'off': False}[value]
 
     def center_text(self, text: str, leave_space_for=None):
-        # in inches
-        text_width = self.text_width_inches(text)
-        space_width = self.char_width_inches(' ')
-        extra_space = 0 if leave_space_for is None else self.text_width_inches(leave_space_for)
-        number_of_spaces = (self.printable_width_inches() - text_width - extra_space) / space_width
+        extra_space = 0 if leave_space_for is None else self.text_width(leave_space_for)
+        number_of_spaces = Fraction(self.printable_width - self.text_width(text) - extra_space, self.char_width)
         left_spaces = int(number_of_spaces / 2)
         right_spaces = math.ceil(number_of_spaces - left_spaces)
         return ' ' * left_spaces + text + ' ' * right_spaces
 
     def box_horizontal_line(self, part: str, thickness=1) -> None:
-        if part == 'top':
-            self.escp_commands.text(b'\xda' if thickness == 1 else b'\xc9')
-            self._box_horizontal_line(thickness)
-            self.escp_commands.text(b'\xbf' if thickness == 1 else b'\xbb')
-        elif part == 'bottom':
-            self.escp_commands.text(b'\xc0' if thickness == 1 else b'\xc8')
-            self._box_horizontal_line(thickness)
-            self.escp_commands.text(b'\xd9' if thickness == 1 else b'\xbc')
-        else:
+        if part not in ('top', 'bottom'):
             raise ValueError(f'Invalid box part: {part}')
-
-    def _box_horizontal_line(self, thickness=1):
-        c = b'\xc4' if thickness == 1 else b'\xcd'
-        extra_inch = self.char_width_inches(str(b'\xda')) * 2  # arbitrary corner char
-        remaining_inches = self.printable_width_inches() - extra_inch
-        w = Decimal(0)
-        while w < remaining_inches:
-            self.escp_commands.text(c)
-            w += self.char_width_inches(str(c))
+        remaining = self.printable_width - 2 * self.char_width  # leave room for the corners
+        self.escp_commands.text(rule((max(0, -(-remaining // self.char_width)),), thickness, part))
+        # the line is not tracked in current_line_position
+        self.position_exact = False
 
     def box_vert_line(self, thickness=1) -> None:
-        self.escp_commands.text(b'\xb3' if thickness == 1 else b'\xba')
+        self.text(vertical(thickness))
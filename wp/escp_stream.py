@@ -0,0 +1,119 @@
+"""Splitting a rendered ESC/P byte stream back into text, control codes and commands."""
+from typing import Iterator
+
+ESC = 0x1b
+TEXT = 'text'
+CONTROL = 'control'
+COMMAND = 'command'
+
+# Control codes acting on their own; other bytes below 0x20 are printed as glyphs
+CONTROL_CODES = frozenset(b'\x08\x09\x0a\x0b\x0c\x0d\x0e\x0f\x12\x14')
+
+# Number of parameter bytes following ESC + command byte, for the commands without variable-length data
+PARAMETER_COUNTS = {
+    ord(c): n for c, n in [
+        ('@', 0), ('x', 1), ('P', 0), ('M', 0), ('g', 0), ('E', 0), ('F', 0), ('4', 0), ('5', 0),
+        ('G', 0), ('H', 0), ('-', 1), ('S', 1), ('T', 0), ('6', 0), ('7', 0), ('I', 1), ('k', 1),
+        ('l', 1), ('Q', 1), ('N', 1), ('O', 0), ('W', 1), ('\x0e', 0), ('w', 1), (' ', 1), ('\x0f', 0),
+        ('\x12', 0), ('2', 0), ('0', 0), ('3', 1), ('+', 1), ('A', 1), ('p', 1), ('a', 1), ('R', 1),
+        ('t', 1), ('$', 2), ('\\', 2), ('J', 1), ('U', 1), ('!', 1),
+    ]
+}
+
+# ESC * densities in dots per inch, by mode
+BIT_IMAGE_DPI = {
+    0: 60, 1: 120, 2: 120, 3: 240, 4: 80, 6: 90, 32: 60, 33: 120, 38: 90, 39: 180, 40: 360, 72: 720, 73: 360,
+}
+# Characters per inch selected by ESC P, ESC M and ESC g
+PITCHES = {b'\x1bP': 10, b'\x1bM': 12, b'\x1bg': 15}
+# Condensed pitch for each pitch
+CONDENSED_PITCHES = {10: 17.14, 12: 20, 15: 15}
+
+
+def bit_image_bytes_per_column(mode: int) -> int:
+    """Data bytes per column of an ESC * bit image [C-177]."""
+    if mode < 32:
+        return 1  # 8-dot modes
+    if mode < 64:
+        return 3  # 24-dot modes
+    return 6  # 48-dot modes
+
+
+def command_length(data: bytes | bytearray, start: int) -> int | None:
+    """Length of the ESC command starting at `start`, or None if `data` ends before it does."""
+    if start + 1 >= len(data):
+        return None
+    command = data[start + 1]
+    match chr(command):
+        case 'C':
+            # ESC C n (lines) or ESC C NUL n (inches)
+            if start + 2 >= len(data):
+                return None
+            length = 4 if data[start + 2] == 0 else 3
+        case '(':
+            # ESC ( c nL nH data
+            if start + 4 >= len(data):
+                return None
+            length = 5 + data[start + 3] + 256 * data[start + 4]
+        case '*':
+            # ESC * m nL nH data
+            if start + 4 >= len(data):
+                return None
+            columns = data[start + 3] + 256 * data[start + 4]
+            length = 5 + columns * bit_image_bytes_per_column(data[start + 2])
+        case _:
+            length = 2 + PARAMETER_COUNTS.get(command, 0)
+    return length if start + length <= len(data) else None
+
+
+def split(data: bytes | bytearray) -> tuple[list[tuple[str, bytes]], int]:
+    """Split `data` into (kind, bytes) tokens.
+
+    Runs of printable bytes are grouped in one TEXT token. Returns the
+    tokens and the number of bytes consumed, which is less than
+    `len(data)` if it ends in the middle of a command.
+    """
+    tokens = []
+    i = 0
+    n = len(data)
+    while i < n:
+        b = data[i]
+        if b == ESC:
+            length = command_length(data, i)
+            if length is None:
+                break
+            tokens.append((COMMAND, bytes(data[i:i + length])))
+            i += length
+        elif b in CONTROL_CODES:
+            tokens.append((CONTROL, bytes(data[i:i + 1])))
+            i += 1
+        else:
+            j = i + 1
+            while j < n and data[j] != ESC and data[j] not in CONTROL_CODES:
+                j += 1
+            tokens.append((TEXT, bytes(data[i:j])))
+            i = j
+    return tokens, i
+
+
+def tokenize(data: bytes) -> Iterator[tuple[str, bytes]]:
+    tokens, consumed = split(data)
+    yield from tokens
+    if consumed < len(data):
+        raise ValueError(f'Truncated ESC/P command at offset {consumed}')
+
+
+def form_feed_offsets(data: bytes) -> list[int]:
+    """Offsets just after every form feed control code in `data`."""
+    offsets = []
+    position = 0
+    for kind, token in tokenize(data):
+        position += len(token)
+        if kind == CONTROL and token == b'\x0c':
+            offsets.append(position)
+    return offsets
+
+
+def page_offsets(data: bytes) -> list[int]:
+    """Offsets at which the second and following pages of `data` start."""
+    return [offset for offset in form_feed_offsets(data) if offset < len(data)]
@@ -0,0 +1,210 @@
+"""Print time estimates from a rendered ESC/P byte stream.
+
+The head is modeled as moving at a constant speed over the printed width
+of every line, once per pass: emphasized, double-strike and double-height
+text take more passes. Line feeds and form feeds move the paper at the
+feed speed. Speeds are nominal datasheet figures; pass a `SpeedProfile`
+measured on the actual printer for better estimates.
+"""
+from dataclasses import dataclass, field
+
+from .escp_stream import BIT_IMAGE_DPI, COMMAND, CONDENSED_PITCHES, CONTROL, PITCHES, TEXT, tokenize
+from .optimizer import mode_of
+
+
+@dataclass(frozen=True)
+class SpeedProfile:
+    name: str
+    draft_cps: float
+    """Characters per second at 10 cpi in draft quality."""
+    letter_quality_cps: float
+    """Characters per second at 10 cpi in letter quality."""
+    feed_inches_per_second: float
+    carriage_return: float = 0.02
+    """Seconds to return the head after a printed line."""
+    graphics_dpi: int = 60
+    """Horizontal density of bit images printed at draft speed."""
+
+
+PROFILES = {
+    9: SpeedProfile('9-pin', draft_cps=240, letter_quality_cps=60, feed_inches_per_second=2.5),
+    24: SpeedProfile('24-pin', draft_cps=330, letter_quality_cps=110, feed_inches_per_second=3.0),
+    48: SpeedProfile('48-pin', draft_cps=300, letter_quality_cps=120, feed_inches_per_second=3.0),
+}
+
+
+@dataclass
+class PrintEstimate:
+    profile: SpeedProfile
+    pages: list[float] = field(default_factory=list)
+    """Seconds per page."""
+    lines: int = 0
+    characters: int = 0
+
+    @property
+    def seconds(self) -> float:
+        return sum(self.pages)
+
+    def __str__(self):
+        per_page = self.seconds / len(self.pages) if self.pages else 0.0
+        return (
+            f'{self.profile.name}: {len(self.pages)} pages, {self.lines} lines, {self.characters} characters, '
+            f'{self.seconds:.1f} s ({per_page:.1f} s per page)'
+        )
+
+
+class _PrinterModel:
+    """Printer state and time spent, updated token by token."""
+
+    def __init__(self, profile: SpeedProfile, pins: int):
+        self.profile = profile
+        self.pins = pins
+        self.estimate = PrintEstimate(profile)
+        self.reset()
+        self.page_time = 0.0
+        self.page_used = False
+        self.line_width = 0.0
+
+    def reset(self):
+        self.modes = {}
+        self.cpi = 10
+        self.letter_quality = False
+        self.line_spacing = 1 / 6
+        self.page_length = 11.0
+        self.vertical_position = 0.0
+
+    @property
+    def passes(self) -> int:
+        passes = 1
+        for mode in ('bold', 'double_strike', 'double_height'):
+            if self.modes.get(mode):
+                passes *= 2
+        return passes
+
+    @property
+    def char_width(self) -> float:
+        if self.modes.get('proportional'):
+            # average proportional width
+            width = 1 / 10
+        elif self.modes.get('condensed'):
+            width = 1 / CONDENSED_PITCHES[self.cpi]
+        else:
+            width = 1 / self.cpi
+        return width * 2 if self.modes.get('double_width') else width
+
+    def print_width(self, inches: float, *, passes=1, letter_quality=False) -> float:
+        """Seconds for the head to print `inches` of the current line."""
+        cps = self.profile.letter_quality_cps if letter_quality else self.profile.draft_cps
+        self.line_width += inches
+        self.page_used = True
+        return inches * passes / (cps / 10)
+
+    def text(self, data: bytes):
+        self.estimate.characters += len(data)
+        self.page_time += self.print_width(
+            len(data) * self.char_width, passes=self.passes, letter_quality=self.letter_quality
+        )
+
+    def bit_image(self, command: bytes):
+        mode = command[2]
+        columns = command[3] + 256 * command[4]
+        dpi = BIT_IMAGE_DPI.get(mode, 60)
+        # denser images are printed at a lower head speed
+        slowdown = max(dpi / self.profile.graphics_dpi, 1)
+        self.page_time += self.print_width(columns / dpi, passes=slowdown)
+
+    def carriage_return(self):
+        if self.line_width:
+            self.page_time += self.profile.carriage_return
+            self.estimate.lines += 1
+            self.line_width = 0.0
+
+    def feed(self, inches: float):
+        self.page_time += inches / self.profile.feed_inches_per_second
+        self.vertical_position += inches
+
+    def form_feed(self):
+        self.carriage_return()
+        self.feed(max(self.page_length - self.vertical_position, 0))
+        self.end_page()
+
+    def end_page(self):
+        self.estimate.pages.append(self.page_time)
+        self.page_time = 0.0
+        self.page_used = False
+        self.vertical_position = 0.0
+
+    def command(self, command: bytes):
+        if mode := mode_of(command):
+            attribute, value = mode
+            self.modes[attribute] = value
+            return
+        match command[1:2]:
+            case b'@':
+                self.reset()
+            case b'P' | b'M' | b'g':
+                self.cpi = PITCHES[command]
+            case b'x':
+                self.letter_quality = bool(command[2] & 1)
+            case b'0':
+                self.line_spacing = 1 / 8
+            case b'2':
+                self.line_spacing = 1 / 6
+            case b'3':
+                self.line_spacing = command[2] / 216
+            case b'+':
+                self.line_spacing = command[2] / 360
+            case b'A':
+                self.line_spacing = command[2] / (72 if self.pins == 9 else 60)
+            case b'C':
+                self.page_length = command[3] if command[2] == 0 else command[2] * self.line_spacing
+                self.vertical_position = 0.0
+            case b'J':
+                self.feed(command[2] / (216 if self.pins == 9 else 180))
+            case b'*':
+                self.bit_image(command)
+            case b'!':
+                # master select
+                value = command[2]
+                self.cpi = 12 if value & 1 else 10
+                for bit, attribute in [(2, 'proportional'), (4, 'condensed'), (8, 'bold'), (16, 'double_strike'),
+                                       (32, 'double_width')]:
+                    self.modes[attribute] = int(bool(value & bit))
+
+    def control(self, code: bytes):
+        match code:
+            case b'\r':
+                self.carriage_return()
+            case b'\n':
+                self.carriage_return()
+                self.feed(self.line_spacing)
+            case b'\x0c':
+                self.form_feed()
+            case b'\x0f':
+                self.modes['condensed'] = 1
+            case b'\x12':
+                self.modes['condensed'] = 0
+
+    def finish(self) -> PrintEstimate:
+        self.carriage_return()
+        if self.page_used or not self.estimate.pages:
+            self.end_page()
+        return self.estimate
+
+
+def estimate_print_time(data: bytes, pins: int, profile: SpeedProfile | None = None) -> PrintEstimate:
+    """Estimate the time to print ESC/P `data`, e.g. the output of `EscpToBinRenderer.render`, page by page."""
+    if profile is None:
+        try:
+            profile = PROFILES[pins]
+        except KeyError:
+            raise ValueError(f'No speed profile for {pins} pins')
+    model = _PrinterModel(profile, pins)
+    for kind, token in tokenize(data):
+        if kind == TEXT:
+            model.text(token)
+        elif kind == CONTROL:
+            model.control(token)
+        elif kind == COMMAND:
+            model.command(token)
+    return model.finish()
@@ -0,0 +1,231 @@
+"""Grayscale images converted to ESC * bit-image bands.
+
+9-pin printers print 8-dot columns at 120 dpi horizontally and 72 dpi
+vertically (mode 1); 24- and 48-pin printers print 24-dot columns at
+180 dpi both ways (mode 39). Images are scaled to the requested width,
+dithered to dots and packed one band of 8 or 24 rows at a time.
+
+PGM files are read natively; other formats need Pillow.
+"""
+import os
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
+
+DITHERING_MODES = ('floyd-steinberg', 'ordered', 'threshold')
+
+
+class BandFormat(NamedTuple):
+    mode: int
+    """ESC * density."""
+    dots: int
+    """Dots per column."""
+    horizontal_dpi: int
+    vertical_dpi: int
+    feed: int
+    """ESC J argument advancing the paper by one band."""
+
+
+BAND_FORMATS = {
+    9: BandFormat(mode=1, dots=8, horizontal_dpi=120, vertical_dpi=72, feed=24),  # 24/216 inch
+    24: BandFormat(mode=39, dots=24, horizontal_dpi=180, vertical_dpi=180, feed=24),  # 24/180 inch
+    48: BandFormat(mode=39, dots=24, horizontal_dpi=180, vertical_dpi=180, feed=24),
+}
+
+# 8x8 Bayer matrix, thresholds in 0..255
+_BAYER = np.array([
+    [0, 32, 8, 40, 2, 34, 10, 42],
+    [48, 16, 56, 24, 50, 18, 58, 26],
+    [12, 44, 4, 36, 14, 46, 6, 38],
+    [60, 28, 52, 20, 62, 30, 54, 22],
+    [3, 35, 11, 43, 1, 33, 9, 41],
+    [51, 19, 59, 27, 49, 17, 57, 25],
+    [15, 47, 7, 39, 13, 45, 5, 37],
+    [63, 31, 55, 23, 61, 29, 53, 21],
+], dtype=np.float32) * 4 + 2
+
+
+def band_format(pins: int) -> BandFormat:
+    try:
+        return BAND_FORMATS[pins]
+    except KeyError:
+        raise ValueError(f'No bit-image format for {pins} pins')
+
+
+def load_grayscale(path: str) -> np.ndarray:
+    """Pixels of the image at `path` as a 2D uint8 array, 0 for black."""
+    with open(path, 'rb') as file:
+        data = file.read()
+    if data[:2] in (b'P2', b'P5'):
+        return _parse_pgm(data)
+    try:
+        from PIL import Image
+    except ImportError:
+        raise ValueError(f'Only PGM images can be read without Pillow: {path}')
+    with Image.open(path) as image:
+        return np.asarray(image.convert('L'))
+
+
+def _parse_pgm(data: bytes) -> np.ndarray:
+    fields = []
+    position = 0
+    # magic, width, height and maximum value, separated by whitespace and comments
+    while len(fields) < 4:
+        while position < len(data) and data[position:position + 1].isspace():
+            position += 1
+        if data[position:position + 1] == b'#':
+            position = data.index(b'\n', position)
+            continue
+        end = position
+        while end < len(data) and not data[end:end + 1].isspace():
+            end += 1
+        if end == position:
+            raise ValueError('Truncated PGM header')
+        fields.append(data[position:end])
+        position = end
+    magic, width, height, maximum = fields[0], int(fields[1]), int(fields[2]), int(fields[3])
+    if magic == b'P2':
+        pixels = np.array(data[position:].split()[:width * height], dtype=np.uint32)
+    else:
+        # a single whitespace byte ends the header
+        dtype = np.dtype('>u2') if maximum > 255 else np.uint8
+        pixels = np.frombuffer(data, dtype=dtype, count=width * height, offset=position + 1)
+    if pixels.size != width * height:
+        raise ValueError('Truncated PGM data')
+    pixels = pixels.reshape(height, width)
+    if maximum != 255:
+        pixels = pixels.astype(np.uint32) * 255 // maximum
+    return pixels.astype(np.uint8)
+
+
+def _resample(pixels: np.ndarray, size: int, axis: int) -> np.ndarray:
+    """Scale `pixels` to `size` along `axis`: box average when shrinking, nearest pixel when enlarging."""
+    n = pixels.shape[axis]
+    if size == n:
+        return pixels
+    if size > n:
+        return np.take(pixels, np.arange(size) * n // size, axis=axis)
+    edges = np.arange(size + 1) * n // size
+    sums = np.add.reduceat(pixels.astype(np.float32), edges[:-1], axis=axis)
+    shape = [1, 1]
+    shape[axis] = size
+    return sums / np.diff(edges).reshape(shape)
+
+
+def resize(pixels: np.ndarray, width: int, height: int) -> np.ndarray:
+    return _resample(_resample(pixels, height, 0), width, 1).astype(np.float32)
+
+
+def floyd_steinberg(pixels: np.ndarray) -> np.ndarray:
+    """Dots (True for black) for grayscale `pixels`, with Floyd–Steinberg error diffusion.
+
+    A pixel only depends on its left neighbor and on the three pixels
+    above it, so all the pixels on a wavefront `2 * y + x = t` are
+    dithered at once, in 2 * height + width vectorized steps.
+    """
+    height, width = pixels.shape
+    stride = width + 2
+    # one column of padding on both sides and a row below absorb the edge errors
+    values = np.zeros((height + 1) * stride, dtype=np.float32)
+    values.reshape(height + 1, stride)[:height, 1:-1] = pixels
+    dots = np.zeros_like(values, dtype=bool)
+    # flat index of (y, x) is y * stride + x + 1 = y * width + t + 1
+    row_offsets = np.arange(height) * width
+    for t in range(2 * (height - 1) + width):
+        first = max(0, (t - width + 2) // 2)
+        last = min(height - 1, t // 2)
+        index = row_offsets[first:last + 1] + t + 1
+        value = values[index]
+        black = value < 128
+        dots[index] = black
+        error = np.where(black, value, value - 255)
+        values[index + 1] += error * (7 / 16)
+        values[index + stride - 1] += error * (3 / 16)
+        values[index + stride] += error * (5 / 16)
+        values[index + stride + 1] += error * (1 / 16)
+    return dots.reshape(height + 1, stride)[:height, 1:-1]
+
+
+def ordered(pixels: np.ndarray) -> np.ndarray:
+    """Dots (True for black) for grayscale `pixels`, with an 8x8 Bayer threshold matrix."""
+    height, width = pixels.shape
+    thresholds = _BAYER[np.arange(height)[:, None] % 8, np.arange(width)[None, :] % 8]
+    return pixels < thresholds
+
+
+def dither(pixels: np.ndarray, mode: str) -> np.ndarray:
+    match mode:
+        case 'floyd-steinberg':
+            return floyd_steinberg(pixels)
+        case 'ordered':
+            return ordered(pixels)
+        case 'threshold':
+            return pixels < 128
+        case _:
+            raise ValueError(f'Unknown dithering: {mode}')
+
+
+def pack_bands(dots: np.ndarray, pins: int) -> list[bytes]:
+    """ESC * commands printing `dots` band by band, without the paper feed between bands.
+
+    Blank columns at the end of a band are not sent, and a blank band is empty.
+    """
+    fmt = band_format(pins)
+    height, width = dots.shape
+    bands = -(-height // fmt.dots)
+    padded = np.zeros((bands * fmt.dots, width), dtype=bool)
+    padded[:height] = dots
+    # (band, column, byte): the top dot of a column is the high bit of its first byte
+    columns = np.packbits(padded.reshape(bands, fmt.dots, width).transpose(0, 2, 1), axis=2)
+    used = columns.any(axis=2)
+    counts = np.where(used.any(axis=1), width - np.argmax(used[:, ::-1], axis=1), 0)
+    commands = []
+    for band, count in zip(columns, counts.tolist()):
+        if count:
+            header = bytes([0x1b, ord('*'), fmt.mode, count & 0xff, count >> 8])
+            commands.append(header + band[:count].tobytes())
+        else:
+            commands.append(b'')
+    return commands
+
+
+def image_size(shape: tuple[int, int], pins: int, width: int | None) -> tuple[int, int]:
+    """Size in dots of an image of `shape` pixels, `width` dots wide or one dot per pixel, keeping its aspect."""
+    fmt = band_format(pins)
+    pixel_height, pixel_width = shape
+    if width is None:
+        width = pixel_width
+    height = round(pixel_height * width / pixel_width * fmt.vertical_dpi / fmt.horizontal_dpi)
+    return width, max(height, 1)
+
+
+def bit_image_bands(
+        path: str, pins: int, *,
+        width: int | None = None, max_width: int | None = None, dithering='floyd-steinberg') -> tuple[bytes, ...]:
+    """ESC * commands for the image at `path`, as in `pack_bands`, `width` dots wide but no wider than `max_width`.
+
+    Conversions are cached per file, modification time, size, dithering and pins.
+    """
+    if dithering not in DITHERING_MODES:
+        raise ValueError(f'Unknown dithering: {dithering}')
+    band_format(pins)
+    stat = os.stat(path)
+    return _bit_image_bands(
+        os.path.abspath(path), stat.st_mtime_ns, stat.st_size, pins, width, max_width, dithering
+    )
+
+
+@lru_cache(maxsize=32)
+def _bit_image_bands(
+        path: str, mtime_ns: int, size: int, pins: int, width: int | None, max_width: int | None,
+        dithering: str) -> tuple[bytes, ...]:
+    pixels = load_grayscale(path)
+    if not pixels.size:
+        return ()
+    if width is None:
+        width = pixels.shape[1]
+    if max_width is not None:
+        width = min(width, max_width)
+    width, height = image_size(pixels.shape, pins, max(width, 1))
+    return tuple(pack_bands(dither(resize(pixels, width, height), dithering), pins))
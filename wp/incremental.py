@@ -0,0 +1,152 @@
+import re
+from dataclasses import dataclass
+from typing import Iterator
+
+from .escp_bin_renderer import Checkpoint, EscpToBinRenderer, ParserState, UnencodableCharacter
+from .node import GenericNode
+
+# A segment may start where a line starts after a newline run
+_LINE_START = re.compile(r'\n(?=[^\n])')
+
+
+@dataclass
+class Segment:
+    """Top-level nodes rendered from `content[start:end]`, starting from `checkpoint`."""
+    start: int
+    end: int
+    checkpoint: Checkpoint
+    output: bytes
+    unencodable: list[UnencodableCharacter]
+    page_breaks: list[int]
+    """Offsets in `output` at which pages start."""
+
+
+class IncrementalDocument:
+    """An escp-wp document that is re-rendered incrementally after edits.
+
+    The source is cut into segments at line starts where no paired directive
+    is open, and the renderer state is checkpointed before every segment.
+    `edit` re-renders from the segment before the edited range until the
+    state matches the checkpoint of an unchanged segment, then reuses the
+    output of the following segments. `output` is always the same as
+    `render` on the whole `content`.
+    """
+
+    def __init__(self, renderer: EscpToBinRenderer, content: str):
+        if renderer.optimize:
+            raise ValueError('Incremental rendering does not support the optimizer')
+        self.renderer = renderer
+        self.content = content
+        renderer.reset()
+        renderer.render_start()
+        self.head = renderer._take_output()
+        renderer.page_offsets.clear()
+        # state after the last segment
+        self.final = renderer.snapshot()
+        self.segments = list(self._render_segments(content, 0, self.final))
+
+    @property
+    def output(self) -> bytes:
+        return b''.join([self.head, *(segment.output for segment in self.segments), self._render_tail()])
+
+    @property
+    def page_offsets(self) -> list[int]:
+        """Offsets in `output` at which the second and following pages start."""
+        offsets = []
+        position = len(self.head)
+        for segment in self.segments:
+            offsets += (position + offset for offset in segment.page_breaks)
+            position += len(segment.output)
+        # a page break on the last line does not start a page
+        size = len(self.output)
+        return [offset for offset in offsets if offset < size]
+
+    @property
+    def unencodable(self) -> list[UnencodableCharacter]:
+        return [u for segment in self.segments for u in segment.unencodable]
+
+    def edit(self, start: int, end: int, text: str) -> int:
+        """Replace `content[start:end]` with `text` and re-render. Return the number of segments rendered.
+
+        If the edited document cannot be rendered, the error is raised and the document is left unchanged.
+        """
+        if not 0 <= start <= end <= len(self.content):
+            raise ValueError(f'Invalid range: {start}:{end}')
+        content = self.content[:start] + text + self.content[end:]
+        delta = len(text) - (end - start)
+
+        # the segment before the edit may end with a newline run that the edit extends
+        first = 0
+        while first + 1 < len(self.segments) and self.segments[first + 1].start <= max(start - 1, 0):
+            first += 1
+        unchanged = {
+            segment.start + delta: i for i, segment in enumerate(self.segments) if segment.start >= end and i > first
+        }
+
+        if self.segments:
+            checkpoint, position = self.segments[first].checkpoint, self.segments[first].start
+        else:
+            checkpoint, position = self.final, 0
+        rendered = []
+        for segment in self._render_segments(content, position, checkpoint):
+            i = unchanged.get(segment.start)
+            if i is not None and self.segments[i].checkpoint.layout == segment.checkpoint.layout:
+                self.segments[first:] = rendered + self._shifted(self.segments[i:], delta, segment.checkpoint)
+                break
+            rendered.append(segment)
+        else:
+            self.segments[first:] = rendered
+        self.content = content
+        return len(rendered)
+
+    def _shifted(self, segments: list[Segment], delta: int, checkpoint: Checkpoint) -> list[Segment]:
+        """Move reused segments by `delta` characters and to the line and unencodable count of `checkpoint`."""
+        lines = checkpoint.line_number - segments[0].checkpoint.line_number
+        count = checkpoint.unencodable_count - segments[0].checkpoint.unencodable_count
+        self.final = self.final._replace(
+            line_number=self.final.line_number + lines, unencodable_count=self.final.unencodable_count + count
+        )
+        for segment in segments:
+            segment.start += delta
+            segment.end += delta
+            segment.checkpoint = segment.checkpoint._replace(
+                line_number=segment.checkpoint.line_number + lines,
+                unencodable_count=segment.checkpoint.unencodable_count + count,
+            )
+            if lines:
+                segment.unencodable = [u._replace(line=u.line + lines) for u in segment.unencodable]
+        return segments
+
+    def _split(self, content: str, position: int) -> Iterator[tuple[int, int, list[GenericNode]]]:
+        """Parse `content` from `position` into (start, end, top-level nodes) segments."""
+        state = ParserState()
+        start = position
+        boundaries = [m.end() for m in _LINE_START.finditer(content, position)]
+        for end in boundaries + [len(content)]:
+            self.renderer._parse_tokens(self.renderer.lexer(content[position:end]), state)
+            position = end
+            if not state.stack:
+                yield start, end, state.nodes
+                state = ParserState()
+                start = end
+        state.finish()
+
+    def _render_segments(self, content: str, position: int, checkpoint: Checkpoint) -> Iterator[Segment]:
+        renderer = self.renderer
+        for start, end, nodes in self._split(content, position):
+            renderer.restore(checkpoint)
+            base = renderer.output_size()
+            renderer._render_nodes(nodes)
+            segment = Segment(
+                start, end, checkpoint, renderer._take_output(), renderer.unencodable[checkpoint.unencodable_count:],
+                [offset - base for offset in renderer.page_offsets],
+            )
+            renderer.page_offsets.clear()
+            checkpoint = renderer.snapshot()
+            yield segment
+        self.final = checkpoint
+
+    def _render_tail(self) -> bytes:
+        self.renderer.restore(self.final)
+        self.renderer.render_end()
+        return self.renderer._take_output()
@@ -0,0 +1,89 @@
+"""Box and table layout: rules, cell wrapping and column widths, in characters of the current pitch."""
+import re
+from functools import lru_cache
+
+# Code page 437 box drawing characters by thickness, keyed by the part they draw:
+# corners and joints of the top, middle and bottom rules, then the horizontal and vertical lines
+_BOX_DRAWING = {
+    1: dict(top=b'\xda\xc2\xbf', middle=b'\xc3\xc5\xb4', bottom=b'\xc0\xc1\xd9', horizontal=b'\xc4', vertical=b'\xb3'),
+    2: dict(top=b'\xc9\xcb\xbb', middle=b'\xcc\xce\xb9', bottom=b'\xc8\xca\xbc', horizontal=b'\xcd', vertical=b'\xba'),
+}
+
+_NUMBER = re.compile(r'[-+]?[\d.,]*\d%?')
+
+
+def box_drawing(thickness: int) -> dict[str, bytes]:
+    try:
+        return _BOX_DRAWING[thickness]
+    except KeyError:
+        raise ValueError(f'Invalid thickness: {thickness}')
+
+
+@lru_cache(maxsize=256)
+def rule(widths: tuple[int, ...], thickness: int, part: str) -> bytes:
+    """A `part` ('top', 'middle' or 'bottom') horizontal rule over columns `widths` characters wide, with corners."""
+    chars = box_drawing(thickness)
+    try:
+        left, joint, right = (bytes([c]) for c in chars[part])
+    except KeyError:
+        raise ValueError(f'Invalid box part: {part}')
+    return left + joint.join(chars['horizontal'] * width for width in widths) + right
+
+
+def vertical(thickness: int) -> bytes:
+    return box_drawing(thickness)['vertical']
+
+
+def wrap(text: str, width: int) -> list[str]:
+    """Break `text` into lines of at most `width` characters, between words, or inside words longer than a line."""
+    if width < 1:
+        raise ValueError(f'Invalid line width: {width}')
+    lines = []
+    line = ''
+    for word in text.split():
+        while len(word) > width:
+            if line:
+                lines.append(line)
+                line = ''
+            lines.append(word[:width])
+            word = word[width:]
+        if not word:
+            continue
+        if line and len(line) + 1 + len(word) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f'{line} {word}' if line else word
+    if line or not lines:
+        lines.append(line)
+    return lines
+
+
+def column_widths(rows: list[list[str]], available: int) -> list[int]:
+    """Widths of the columns of `rows`, as wide as their longest cell but `available` characters at most in total.
+
+    Columns wider than a common cap are narrowed to the cap, so their cells wrap.
+    """
+    columns = max(map(len, rows))
+    widths = [1] * columns
+    for row in rows:
+        for i, cell in enumerate(row):
+            widths[i] = max(widths[i], len(cell))
+    if available < columns:
+        raise ValueError(f'Table too wide: {columns} columns in {available} characters')
+    if sum(widths) <= available:
+        return widths
+    # the largest cap that fits
+    low, high = 1, max(widths)
+    while low < high:
+        cap = (low + high + 1) // 2
+        if sum(min(width, cap) for width in widths) <= available:
+            low = cap
+        else:
+            high = cap - 1
+    return [min(width, low) for width in widths]
+
+
+def is_number(text: str) -> bool:
+    """Whether a cell holds a number, aligned to the right."""
+    return _NUMBER.fullmatch(text) is not None
@@ -0,0 +1,87 @@
+"""Paragraph line breaking, as an alternative to breaking greedily word by word.
+
+Widths are integers in 1/360 inch, like the renderer positions.
+
+Proportional text is measured per character with the table below. The
+printer's own table differs slightly per printer and font, so lines of
+proportional text broken optimally or justified can end a little short or
+long of the margin.
+"""
+import math
+import unicodedata
+from functools import lru_cache
+
+# Widths of the printable ASCII characters in the proportional Roman font, in 1/360 inch: the Times Roman
+# character widths, scaled so that digits are 1/10 inch wide like characters at 10 cpi
+PROPORTIONAL_WIDTHS = {
+    ' ': 18, '!': 24, '"': 29, '#': 36, '$': 36, '%': 60, '&': 56, "'": 13,
+    '(': 24, ')': 24, '*': 36, '+': 41, ',': 18, '-': 24, '.': 18, '/': 20,
+    '0': 36, '1': 36, '2': 36, '3': 36, '4': 36, '5': 36, '6': 36, '7': 36,
+    '8': 36, '9': 36, ':': 20, ';': 20, '<': 41, '=': 41, '>': 41, '?': 32,
+    '@': 66, 'A': 52, 'B': 48, 'C': 48, 'D': 52, 'E': 44, 'F': 40, 'G': 52,
+    'H': 52, 'I': 24, 'J': 28, 'K': 52, 'L': 44, 'M': 64, 'N': 52, 'O': 52,
+    'P': 40, 'Q': 52, 'R': 48, 'S': 40, 'T': 44, 'U': 52, 'V': 52, 'W': 68,
+    'X': 52, 'Y': 52, 'Z': 44, '[': 24, '\\': 20, ']': 24, '^': 34, '_': 36,
+    '`': 24, 'a': 32, 'b': 36, 'c': 32, 'd': 36, 'e': 32, 'f': 24, 'g': 36,
+    'h': 36, 'i': 20, 'j': 20, 'k': 36, 'l': 20, 'm': 56, 'n': 36, 'o': 36,
+    'p': 36, 'q': 36, 'r': 24, 's': 28, 't': 20, 'u': 36, 'v': 36, 'w': 52,
+    'x': 36, 'y': 36, 'z': 32, '{': 35, '|': 14, '}': 35, '~': 39,
+}
+DEFAULT_PROPORTIONAL_WIDTH = 36
+
+LINE_BREAKING_MODES = ('greedy', 'optimal', 'justify')
+
+
+@lru_cache(maxsize=1 << 16)
+def word_width(word: str, char_width: int, proportional: bool, double_width: bool) -> int:
+    """Printed width of `word` in the given character pitch and modes."""
+    if proportional:
+        width = sum(proportional_width(char) for char in word)
+    else:
+        width = len(word) * char_width
+    return width * 2 if double_width else width
+
+
+def proportional_width(char: str) -> int:
+    """Width of `char` in the proportional font; accented letters are as wide as their base letter."""
+    width = PROPORTIONAL_WIDTHS.get(char)
+    if width is None:
+        width = PROPORTIONAL_WIDTHS.get(unicodedata.normalize('NFD', char)[0], DEFAULT_PROPORTIONAL_WIDTH)
+    return width
+
+
+def break_lines(widths: list[int], space: int, first_line: int, line: int) -> list[int]:
+    """Indexes of the words starting the second and following lines.
+
+    Minimizes the sum of the squared space left at the end of every line
+    but the last (Knuth and Plass, without hyphenation). The first line is
+    `first_line` wide, the others `line`. A word wider than a line gets a
+    line of its own.
+    """
+    n = len(widths)
+    cost = [0] + [math.inf] * n
+    previous = [0] * (n + 1)
+    for end in range(1, n + 1):
+        best, best_start = math.inf, end - 1
+        start = end - 1
+        length = widths[start]
+        while True:
+            available = line if start else first_line
+            if length > available and start < end - 1:
+                break
+            slack = available - length
+            total = cost[start] if end == n or slack < 0 else cost[start] + slack * slack
+            if total < best:
+                best, best_start = total, start
+            if not start:
+                break
+            start -= 1
+            length += widths[start] + space
+        cost[end] = best
+        previous[end] = best_start
+    breaks = []
+    end = n
+    while end:
+        end = previous[end]
+        breaks.append(end)
+    return breaks[::-1][1:]
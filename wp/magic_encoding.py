@@ -46,3 +46,78 @@ plain_char_substitutions: dict[str, bytes] = {
     'œ': b'oe', 'Œ': b'OE',
     'À': b'A', 'Á': b'A', 'Â': b'A',  # TODO Use PC850 (multilingual)
 }
+
+# Codes replaced by the international character sets [R-41]
+national_codes = frozenset(b'#$@[\\]^`{|}~')
+
+# Typographic characters folded to their plain equivalent
+transcoded_chars: dict[str, str] = {
+    '’': "'",  # french apostrophe
+}
+
+
+class MagicEncoder:
+    """Encodes text to printer bytes with as few character set switches as possible.
+
+    The lookup table is built once from the substitution dicts: each
+    character maps to its bytes and, if the bytes are national codes,
+    the character set variant they require. Other characters are looked up
+    in cp437 on first use and memoized. Unlike `Commands.magic_text`, the
+    selected variant is kept across calls and only changed when a national
+    code needs another one.
+    """
+
+    def __init__(
+            self,
+            character_set_substitution: dict[str, tuple[CharacterSetVariant, bytes]],
+            plain_text_substitution: dict[str, bytes],
+            default_character_set=CharacterSetVariant.USA):
+        self.default_character_set = default_character_set
+        self.table: dict[str, tuple[CharacterSetVariant | None, bytes] | None] = {}
+        for c, code in plain_text_substitution.items():
+            self.table[c] = (None, code)
+        for c, (variant, code) in character_set_substitution.items():
+            self.table[c] = (variant if code[0] in national_codes else None, code)
+        for c, plain in transcoded_chars.items():
+            self.table[c] = self.lookup(plain)
+
+    def lookup(self, c: str) -> tuple[CharacterSetVariant | None, bytes] | None:
+        """Variant and bytes for a character, or None if the printer cannot print it."""
+        try:
+            return self.table[c]
+        except KeyError:
+            pass
+        try:
+            code = c.encode('cp437')
+            entry = (self.default_character_set if code[0] in national_codes else None, code)
+        except UnicodeEncodeError:
+            entry = None
+        self.table[c] = entry
+        return entry
+
+    def encode(
+            self, text: str, character_set: CharacterSetVariant
+    ) -> tuple[bytes, CharacterSetVariant, list[int]]:
+        """Encode `text` starting with `character_set` selected.
+
+        Returns the bytes, including `ESC R` switches, the character set
+        selected at the end, and the indexes of the characters that could
+        not be encoded (printed as '?').
+        """
+        output = bytearray()
+        unencodable = []
+        for i, c in enumerate(text):
+            entry = self.table.get(c) or self.lookup(c)
+            if entry is None:
+                unencodable.append(i)
+                variant, code = None, b'?'
+            else:
+                variant, code = entry
+            if variant is not None and variant != character_set:
+                output += b'\x1bR' + bytes([variant.value])
+                character_set = variant
+            output += code
+        return bytes(output), character_set, unencodable
+
+
+magic_encoder = MagicEncoder(char_set_substitutions, plain_char_substitutions)
@@ -0,0 +1,122 @@
+import re
+from typing import Iterable, Iterator
+
+from .escp_bin_renderer import EscpToBinRenderer
+from .md_escp_converter import MarkdownEscpRenderer
+from .node import GenericNode
+
+
+class EscpTreeBuilder:
+    """Builds an escp-wp node tree from Markdown nodes.
+
+    Text is split into text, space and newline nodes, and adjacent runs of
+    the same kind are merged, exactly as the escp-wp lexer and parser would
+    do with the text written by `MarkdownEscpRenderer`.
+    """
+
+    def __init__(self):
+        self.root = GenericNode('root')
+        self.current = self.root
+        self.stack: list[GenericNode] = []
+        self.pending_text = ''
+
+    def _flush_text(self):
+        if self.pending_text:
+            self.current.add(GenericNode('text', self.pending_text.strip()))
+            self.pending_text = ''
+
+    def _add_run(self, category: str, length: int):
+        self._flush_text()
+        children = self.current.children
+        if children and children[-1].category == category:
+            children[-1].value += length
+        else:
+            self.current.add(GenericNode(category, length))
+
+    def add_directive(self, category: str, value):
+        self._flush_text()
+        self.current.add(GenericNode(category, value))
+
+    def add_text(self, text: str):
+        for piece in re.split(r'( +|\n+)', text):
+            if not piece:
+                continue
+            match piece[0]:
+                case ' ':
+                    self._add_run('space', len(piece))
+                case '\n':
+                    self._add_run('newline', len(piece))
+                case _:
+                    self.pending_text += piece
+
+    def open(self, category: str, value: list):
+        self._flush_text()
+        node = GenericNode(category, value)
+        self.current.add(node)
+        self.stack.append(self.current)
+        self.current = node
+
+    def close(self):
+        self._flush_text()
+        self.current = self.stack.pop()
+
+    def finish(self) -> GenericNode:
+        self._flush_text()
+        return self.root
+
+    def add_markdown(self, node: GenericNode):
+        match node.category, node.value:
+            case 'heading', 1:
+                self.open('box', [True, 'thickness', '2'])
+            case 'heading', 2:
+                self.open('underline', [True])
+            case 'heading', _:
+                # other levels are not rendered
+                return
+            case 'bold' | 'italic', _:
+                self.open(node.category, [True])
+            case 'newline', count:
+                self.add_text('\n' * count)
+                return
+            case 'text', text:
+                self.add_text(text)
+                return
+            case _:
+                raise ValueError(f'Unknown Markdown node: {node.category}')
+        for child in node.children:
+            self.add_markdown(child)
+        self.close()
+
+
+def markdown_to_escp_tree(root: GenericNode) -> GenericNode:
+    """Map a Markdown tree to the escp-wp tree of its `MarkdownEscpRenderer` output."""
+    builder = EscpTreeBuilder()
+    builder.add_directive('pragma', 'escp-wp')
+    builder.add_directive('soft-wrap', True)
+    builder.add_text('\n')
+    for child in root.children:
+        builder.add_markdown(child)
+    return builder.finish()
+
+
+class MarkdownToBinRenderer(EscpToBinRenderer):
+    """Converts Markdown to ESC/P in one step.
+
+    The Markdown tree is mapped to an escp-wp tree and rendered directly,
+    without writing and parsing escp-wp text in between. The output is the
+    same as `EscpToBinRenderer` on the `MarkdownEscpRenderer` output, except
+    that square brackets in the text are printed instead of read as directives.
+    """
+
+    def render(self, content: str) -> bytes:
+        markdown = MarkdownEscpRenderer()
+        with self.phase('lex'):
+            tokens = markdown.lexer(content)
+        self.count_tokens(tokens)
+        with self.phase('parse'):
+            root = markdown_to_escp_tree(markdown.parse(tokens))
+        return self.render_tree(root)
+
+    def render_stream(self, content: Iterable[str]) -> Iterator[bytes]:
+        """Markdown is not streamed: the whole document is read, then rendered."""
+        yield self.render(''.join(content))
@@ -8,8 +8,8 @@ class MarkdownEscpRenderer(Renderer):
     """Converts Markdown to escp-wp"""
 
     def __init__(self):
-        self.output = ''
-        self.nodes = []
+        self.parts: list[str] = []
+        self.size = 0
 
     def lexer(self, content: str) -> list[str]:
         split = re.split(r'( |\n|\*|_|\#)', content)
@@ -17,122 +17,135 @@ class MarkdownEscpRenderer(Renderer):
         return split
 
     def parse(self, tokens: list[str]) -> GenericNode:
-        root = GenericNode('root')
-        nodes = self._parse(tokens)
-        root.add(nodes)
-        return root
-
-    def _parse(self, tokens: list[str]) -> list[GenericNode]:
-        def next_token(idx) -> str | None:
-            try:
-                return tokens[idx + 1]
-            except IndexError:
-                return None
-
-        def find_token_index(token, start) -> int:
-            for idx in range(start, len(tokens)):
-                if tokens[idx] == token:
-                    return idx
-            raise ValueError(f'Could not find token {token} from index {start}')
-
-        nodes = []
+        """Build the tree in a single forward pass.
+
+        A heading ends at the first newline, bold and italic at the first
+        occurrence of their opening `*` or `_`. Open nodes are kept on a stack
+        with their closing token: a closing token that belongs to a node other
+        than the innermost one is an error.
+        """
+        root = current = GenericNode('root')
+        parents: list[GenericNode] = []
+        closers: list[str] = []
+        n = len(tokens)
         i = 0
-        while i < len(tokens):
-            match tokens[i]:
+        while i < n:
+            token = tokens[i]
+            if closers and token == closers[-1]:
+                closed = current
+                current = parents.pop()
+                closers.pop()
+                if closed.category != 'heading':
+                    # the newline after a heading is kept, bold skips its second `*` or `_`
+                    i += 1
+                    if closed.category == 'bold' and i < n and tokens[i] not in closers:
+                        i += 1
+                continue
+            if token in closers:
+                raise ValueError(f'Could not find token {closers[-1]!r} before {token!r} at index {i}')
+            match token:
                 case '#':
+                    if '\n' in closers:
+                        raise ValueError(f'Could not find token {closers[-1]!r} before heading at index {i}')
                     level = 1
-                    ii = i
-                    while next_token(ii) == '#':
+                    while i + level < n and tokens[i + level] == '#':
                         level += 1
-                        ii += 1
-                    j = find_token_index('\n', i+level)
-                    children = self._parse(tokens[i+level+1:j])
-                    h = GenericNode('heading', level)
-                    h.add(children)
-                    nodes.append(h)
-                    i = j
+                    node = GenericNode('heading', level)
+                    closer = '\n'
+                    i += level
+                    # skip the space after the hashes
+                    if i < n and tokens[i] != '\n' and tokens[i] not in closers:
+                        i += 1
                 case '*' | '_':
-                    if next_token(i) == tokens[i]:
-                        j = find_token_index(tokens[i], i+2)
-                        children = self._parse(tokens[i + 2:j])
-                        bold = GenericNode('bold')
-                        bold.add(children)
-                        nodes.append(bold)
-                        i = j+2
+                    closer = token
+                    if i + 1 < n and tokens[i + 1] == token:
+                        node = GenericNode('bold')
+                        i += 2
                     else:
-                        j = find_token_index(tokens[i], i+1)
-                        children = self._parse(tokens[i + 1:j])
-                        italic = GenericNode('italic')
-                        italic.add(children)
-                        nodes.append(italic)
-                        i = j+1
-                case '\n':
-                    how_many = 0
-                    while i < len(tokens) and tokens[i] == '\n':
-                        how_many += 1
+                        node = GenericNode('italic')
                         i += 1
-                    if how_many > 1:
-                        nodes.append(GenericNode('newline', how_many))
+                case '\n':
+                    j = i
+                    while j < n and tokens[j] == '\n':
+                        j += 1
+                    if j - i > 1:
+                        current.add(GenericNode('newline', j - i))
+                    i = j
+                    continue
                 case _:
-                    text = ''
+                    stop = ('*', '_', '#', '\n') if '\n' in closers else ('*', '_', '#')
                     j = i
-                    while j < len(tokens) and tokens[j] not in ['*', '_', '#']:
-                        text += tokens[j]
+                    while j < n and tokens[j] not in stop:
                         j += 1
-                    node = GenericNode('text', text)
-                    nodes.append(node)
+                    current.add(GenericNode('text', ''.join(tokens[i:j])))
                     i = j
-        return nodes
+                    continue
+            current.add(node)
+            parents.append(current)
+            closers.append(closer)
+            current = node
+        if closers:
+            raise ValueError(f'Could not find token {closers[-1]!r}')
+        return root
 
     def render(self, content: str) -> str:
         """Converts Markdown to escp-wp"""
-
-        tokens = self.lexer(content)
-        print(tokens)
-        root = self.parse(tokens)
-        print(root)
-        self._render(root)
-        return self.output
+        with self.phase('lex'):
+            tokens = self.lexer(content)
+        self.count_tokens(tokens)
+        with self.phase('parse'):
+            root = self.parse(tokens)
+        return self.render_tree(root)
+
+    def render_tree(self, root: GenericNode) -> str:
+        """Render a parsed tree, either `GenericNode` or `FlatTree.root()`"""
+        with self.phase('render'):
+            self._render(root)
+        return ''.join(self.parts)
+
+    def output_size(self) -> int:
+        return self.size
+
+    def write(self, text: str):
+        self.parts.append(text)
+        self.size += len(text)
 
     def _render(self, node: GenericNode):
-        self.nodes.append(node)
-        category = node.category.replace('-', '_')
-        func = getattr(self, f'render_{category}')
-        return func(node)
+        return self.handlers[node.category](self, node)
 
     def render_children(self, node: GenericNode):
         for child in node.children:
             self._render(child)
 
     def render_root(self, node: GenericNode):
-        self.output += '[pragma:escp-wp][soft-wrap:on]\n'
+        self.write('[pragma:escp-wp][soft-wrap:on]\n')
         self.render_children(node)
 
     def render_heading(self, node: GenericNode):
         match node.value:
             case 1:
-                self.output += f'[box:on:thickness:2]'
+                self.write('[box:on:thickness:2]')
                 self.render_children(node)
-                self.output += '[box:off]'
+                self.write('[box:off]')
             case 2:
-                self.output += '[underline:on]'
+                self.write('[underline:on]')
                 self.render_children(node)
-                self.output += '[underline:off]'
+                self.write('[underline:off]')
             case _:
                 pass
 
     def render_bold(self, node: GenericNode):
-        self.output += '[bold:on]'
+        self.write('[bold:on]')
         self.render_children(node)
-        self.output += '[bold:off]'
+        self.write('[bold:off]')
 
     def render_italic(self, node: GenericNode):
-        self.output += '[italic:on]'
+        self.write('[italic:on]')
         self.render_children(node)
-        self.output += '[italic:off]'
+        self.write('[italic:off]')
 
     def render_newline(self, node: GenericNode):
-        self.output += '\n' * node.value
+        self.write('\n' * node.value)
 
     def render_text(self, node: GenericNode):
-        self.output += node.value
+        self.write(node.value)
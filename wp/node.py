@@ -1,7 +1,16 @@
+from array import array
+from typing import Iterator
+
+# Shared by all leaves, replaced by a list on the first `add`
+_NO_CHILDREN = ()
+
+
 class Node:
+    __slots__ = ('value', 'children')
+
     def __init__(self, value=None):
         self.value = value
-        self.children = []
+        self.children = _NO_CHILDREN
 
     def __iter__(self):
         return iter(self.children)
@@ -13,20 +22,24 @@ class Node:
         return len(self.children)
 
     def add(self, value):
+        if self.children is _NO_CHILDREN:
+            self.children = []
         if isinstance(value, list):
             self.children.extend(value)
         else:
             self.children.append(value)
 
     def __repr__(self):
-        return f'Node({self.value}, {self.children})'
+        return f'Node({self.value}, {list(self.children)})'
 
 
 class GenericNode:
-    def __init__(self, category: str, value=None):
+    __slots__ = ('category', 'value', 'children')
+
+    def __init__(self, category: str, value=None, children: list | None = None):
         self.category = category
         self.value = value
-        self.children = []
+        self.children = _NO_CHILDREN if children is None else children
 
     def __iter__(self):
         return iter(self.children)
@@ -38,11 +51,124 @@ class GenericNode:
         return len(self.children)
 
     def add(self, value):
+        if self.children is _NO_CHILDREN:
+            self.children = []
         if isinstance(value, list):
             self.children.extend(value)
         else:
             self.children.append(value)
 
+    def __repr__(self):
+        value = f'({self.value})' if self.value else ''
+        return f'Node #{self.category}{value} -> {list(self.children)}'
+
+
+class FlatTree:
+    """A node tree stored as parallel arrays, in pre-order.
+
+    Node `i` has a category code, a value and the index `ends[i]` just past
+    its subtree: its first child is `i + 1` and its next sibling `ends[i]`.
+    Node 0 is the root. `FlatNode` views expose the `GenericNode` interface,
+    so renderers can render from either representation.
+
+    The tree is built with `add` for leaves and `open`/`close` around the
+    children of a node.
+    """
+
+    def __init__(self, category='root', value=None):
+        self.category_names: list[str] = []
+        self.category_codes: dict[str, int] = {}
+        self.categories = array('B')
+        self.values = []
+        self.ends = array('L')
+        self.open_nodes: list[int] = []
+        self.open_categories: list[str] = []
+        self.open(category, value)
+
+    def _append(self, category: str, value, end: int) -> int:
+        code = self.category_codes.get(category)
+        if code is None:
+            code = self.category_codes[category] = len(self.category_names)
+            self.category_names.append(category)
+        index = len(self.values)
+        self.categories.append(code)
+        self.values.append(value)
+        self.ends.append(end)
+        return index
+
+    def add(self, category: str, value=None):
+        self._append(category, value, len(self.values) + 1)
+
+    def open(self, category: str, value=None):
+        self.open_nodes.append(self._append(category, value, 0))
+        self.open_categories.append(category)
+
+    def close(self):
+        self.ends[self.open_nodes.pop()] = len(self.values)
+        self.open_categories.pop()
+
+    def finish(self) -> 'FlatTree':
+        """Close the root node."""
+        self.close()
+        return self
+
+    @classmethod
+    def from_node(cls, node: GenericNode) -> 'FlatTree':
+        tree = cls(node.category, node.value)
+        stack = [iter(node.children)]
+        while stack:
+            child = next(stack[-1], None)
+            if child is None:
+                stack.pop()
+                tree.close()
+            elif child.children:
+                tree.open(child.category, child.value)
+                stack.append(iter(child.children))
+            else:
+                tree.add(child.category, child.value)
+        return tree
+
+    def root(self) -> 'FlatNode':
+        return FlatNode(self, 0)
+
+    def __len__(self):
+        return len(self.values)
+
+
+class FlatNode:
+    """View of one node of a `FlatTree`."""
+    __slots__ = ('tree', 'index')
+
+    def __init__(self, tree: FlatTree, index: int):
+        self.tree = tree
+        self.index = index
+
+    @property
+    def category(self) -> str:
+        return self.tree.category_names[self.tree.categories[self.index]]
+
+    @property
+    def value(self):
+        return self.tree.values[self.index]
+
+    @property
+    def children(self) -> list['FlatNode']:
+        return list(self)
+
+    def __iter__(self) -> Iterator['FlatNode']:
+        ends = self.tree.ends
+        i = self.index + 1
+        end = ends[self.index]
+        while i < end:
+            yield FlatNode(self.tree, i)
+            i = ends[i]
+
+    def __getitem__(self, item):
+        return self.children[item]
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
     def __repr__(self):
         value = f'({self.value})' if self.value else ''
         return f'Node #{self.category}{value} -> {self.children}'
@@ -0,0 +1,118 @@
+"""Peephole optimization of a rendered ESC/P byte stream.
+
+Mode commands (bold, italic, character set...) are not sent when they are
+issued, but just before the next printed text, and only if they change the
+printer state. Toggles around empty content, off/on pairs between adjacent
+siblings and repeated character set switches disappear.
+"""
+from .escp_stream import COMMAND, CONTROL, TEXT, split
+from .magic_encoding import national_codes
+
+
+def _on_off(on: bytes, off: bytes, attribute: str) -> dict[bytes, tuple[str, int]]:
+    return {on: (attribute, 1), off: (attribute, 0)}
+
+
+# Command -> (attribute, value), for the commands that only matter for printed text
+_SIMPLE_MODES = {
+    **_on_off(b'\x1bE', b'\x1bF', 'bold'),
+    **_on_off(b'\x1b4', b'\x1b5', 'italic'),
+    **_on_off(b'\x1bG', b'\x1bH', 'double_strike'),
+    **_on_off(b'\x1b\x0f', b'\x1b\x12', 'condensed'),
+    b'\x1bT': ('script', 0),
+}
+
+# Command with one parameter -> attribute
+_PARAMETER_MODES = {
+    b'\x1b-': 'underline',
+    b'\x1bS': 'script',
+    b'\x1bp': 'proportional',
+    b'\x1bW': 'double_width',
+    b'\x1bw': 'double_height',
+    b'\x1bR': 'character_set',
+}
+
+# Printer state after ESC @, assuming the default character set is USA
+_INIT_STATE = {
+    'bold': 0, 'italic': 0, 'double_strike': 0, 'condensed': 0, 'script': 0, 'underline': 0,
+    'proportional': 0, 'double_width': 0, 'double_height': 0, 'character_set': 0,
+}
+
+
+def mode_of(command: bytes) -> tuple[str, int] | None:
+    if command in _SIMPLE_MODES:
+        return _SIMPLE_MODES[command]
+    attribute = _PARAMETER_MODES.get(command[:2])
+    if attribute is None:
+        return None
+    value = command[2]
+    match attribute:
+        case 'underline' | 'proportional' | 'double_width' | 'double_height':
+            # 1 and '1' both mean on
+            return attribute, value & 1
+        case 'script':
+            # 1 + 0 (superscript) or 1 + 1 (subscript)
+            return attribute, 1 + (value & 1)
+        case _:
+            return attribute, value
+
+
+class Optimizer:
+    """Drops redundant mode commands from an ESC/P stream fed in chunks.
+
+    The printer state is unknown until an ESC @, so the first command for
+    each mode is always kept.
+    """
+
+    def __init__(self):
+        self.pending: dict[str, tuple[int, bytes]] = {}
+        self.state: dict[str, int] = {}
+        self.tail = b''
+
+    def feed(self, data: bytes) -> bytes:
+        tokens, consumed = split(self.tail + data)
+        self.tail = (self.tail + data)[consumed:]
+        output = bytearray()
+        for kind, raw in tokens:
+            if kind == COMMAND and (mode := mode_of(raw)):
+                attribute, value = mode
+                # re-insert so the latest command is sent last
+                self.pending.pop(attribute, None)
+                self.pending[attribute] = value, raw
+            elif kind == COMMAND and raw == b'\x1b@':
+                self.pending.clear()
+                self.state = dict(_INIT_STATE)
+                output += raw
+            elif kind == CONTROL and raw in (b'\r', b'\n', b'\x0c'):
+                # moving the paper does not depend on the pending modes
+                output += raw
+            elif kind == TEXT and not national_codes.intersection(raw):
+                # the character set only changes national codes
+                self._flush_pending(output, keep='character_set')
+                output += raw
+            else:
+                self._flush_pending(output)
+                output += raw
+        return bytes(output)
+
+    def flush(self) -> bytes:
+        """Send the remaining mode changes, so the printer ends in the same state."""
+        output = bytearray(self.tail)
+        self.tail = b''
+        self._flush_pending(output)
+        return bytes(output)
+
+    def _flush_pending(self, output: bytearray, keep: str | None = None):
+        kept = self.pending.pop(keep, None)
+        for attribute, (value, raw) in self.pending.items():
+            if self.state.get(attribute) != value:
+                output += raw
+                self.state[attribute] = value
+        self.pending.clear()
+        if kept:
+            self.pending[keep] = kept
+
+
+def optimize(data: bytes) -> bytes:
+    optimizer = Optimizer()
+    return optimizer.feed(data) + optimizer.flush()
@@ -1,10 +1,18 @@
 import escp
 
 import argparse
+import asyncio
 import sys
 
+from .spooler import PrintJob, Spooler
 
-def main(file, *, vendor_id: int, product_id: int, init: bool, pins: int):
+
+async def spool(printer: escp.Printer, job: PrintJob, chunk_size: int):
+    async with Spooler({'printer': printer}, chunk_size=chunk_size) as spooler:
+        return await spooler.submit('printer', job)
+
+
+def main(file, *, vendor_id: int, product_id: int, init: bool, pins: int, chunk_size=4096, from_page=1):
     printer = escp.UsbPrinter(id_vendor=vendor_id, id_product=product_id)
 
     if init:
@@ -12,7 +20,17 @@ def main(file, *, vendor_id: int, product_id: int, init: bool, pins: int):
         commands.init()
         printer.send(commands.buffer)
 
-    printer.send(file.read())
+    if file is not sys.stdin.buffer:
+        # memory-mapped and sent in slices, without reading the file into memory
+        job = PrintJob(file.name, file.name)
+    elif from_page > 1:
+        job = PrintJob(file.name, file.read())
+    else:
+        job = PrintJob(file.name, iter(lambda: file.read(chunk_size), b''))
+    if from_page > 1:
+        job = job.from_page(from_page)
+    stats = asyncio.run(spool(printer, job, chunk_size))
+    print(stats, file=sys.stderr)
 
 
 if __name__ == '__main__':
@@ -28,6 +46,8 @@ if __name__ == '__main__':
         '--pins', type=int, default=9, choices=[9, 24, 48], required=False,
         help='Number of printer pins. Required if extra commands are to be sent to the printer.'
     )
+    parser.add_argument('--chunk-size', type=int, default=4096, help='Bytes sent to the printer per write')
+    parser.add_argument('--from-page', type=int, default=1, help='Resume printing from this page, e.g. after a jam')
 
     args = parser.parse_args()
 
@@ -35,15 +55,20 @@ if __name__ == '__main__':
         if args.init:
             parser.error('Number of pins is required if init sequence is to be sent')
             exit(1)
+    try:
+        vendor_id, product_id = int(args.vendor_id, 16), int(args.product_id, 16)
+    except ValueError:
+        print('Invalid vendor/product ID', file=sys.stderr)
+        exit(1)
     try:
         main(
             args.file,
-            vendor_id=int(args.vendor_id, 16), product_id=int(args.product_id, 16),
-            pins=args.pins, init=args.init
+            vendor_id=vendor_id, product_id=product_id,
+            pins=args.pins, init=args.init, chunk_size=args.chunk_size, from_page=args.from_page
         )
     except escp.PrinterNotFound as e:
         print(f'Printer not found: {e}', file=sys.stderr)
         exit(1)
     except ValueError as e:
-        print('Invalid vendor/product ID', file=sys.stderr)
+        print(e, file=sys.stderr)
         exit(1)
@@ -1,7 +1,58 @@
 import abc
+from contextlib import nullcontext
+from typing import Callable
+
+from .stats import RenderStats
 
 
 class Renderer(abc.ABC):
+    #: Node category -> `handler(renderer, node)`, resolved once per class from its `render_*` methods
+    handlers: dict[str, Callable] = {}
+    #: `render_*` methods that are not node handlers
+    helpers = frozenset({'render_children', 'render_start', 'render_end', 'render_stream', 'render_to', 'render_tree'})
+    stats: RenderStats | None = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.handlers = {
+            name.removeprefix('render_').replace('_', '-'): function
+            for name in dir(cls)
+            if name.startswith('render_') and name not in cls.helpers and callable(function := getattr(cls, name))
+        }
+
+    def register_handler(self, category: str, handler: Callable):
+        """Render nodes of `category` with `handler(renderer, node)` on this renderer only."""
+        if 'handlers' not in vars(self):
+            self.handlers = dict(type(self).handlers)
+        if self.stats is not None:
+            handler = self.stats.instrument(category, handler, self.output_size)
+        self.handlers[category] = handler
+
+    def enable_stats(self) -> RenderStats:
+        """Record phase times and per-directive counters from now on.
+
+        Handlers are wrapped once here, so renderers without stats pay nothing.
+        """
+        if self.stats is None:
+            self.stats = RenderStats()
+            self.handlers = {
+                category: self.stats.instrument(category, handler, self.output_size)
+                for category, handler in self.handlers.items()
+            }
+        return self.stats
+
+    def phase(self, name: str):
+        """Context manager timing a phase when stats are enabled."""
+        return nullcontext() if self.stats is None else self.stats.phase(name)
+
+    def count_tokens(self, tokens: list[str]):
+        if self.stats is not None:
+            self.stats.tokens += len(tokens)
+
+    @abc.abstractmethod
+    def output_size(self) -> int:
+        """Length of the output rendered so far."""
+
     @abc.abstractmethod
     def render(self, content: str) -> bytes | str:
         pass
@@ -0,0 +1,124 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Iterable
+
+import escp
+
+from .escp_bin_renderer import EscpToBinRenderer
+from .estimate import PROFILES, SpeedProfile, estimate_print_time
+from .md_bin_renderer import MarkdownToBinRenderer
+from .spooler import JobStats, PrintJob, Spooler
+
+
+@dataclass
+class Document:
+    name: str
+    content: str
+    markdown: bool = False
+    pins: int | None = None  # None: any printer
+
+    @classmethod
+    def from_path(cls, path: str, *, pins: int | None = None) -> 'Document':
+        _, extension = os.path.splitext(path)
+        if extension not in ['.txt', '.md']:
+            raise ValueError(f'Invalid file extension: {extension}')
+        with open(path, encoding='utf-8') as f:
+            return cls(path, f.read(), markdown=extension == '.md', pins=pins)
+
+
+@dataclass
+class ScheduledPrinter:
+    name: str
+    printer: escp.Printer
+    pins: int
+    profile: SpeedProfile | None = None
+    """Speeds used to predict print times, the nominal ones for the pin count if not given."""
+
+    def __post_init__(self):
+        if self.profile is None:
+            self.profile = PROFILES[self.pins]
+
+
+@dataclass
+class JobReport:
+    document: str
+    printer: str
+    stats: JobStats
+    predicted_seconds: float = 0.0
+
+
+# One renderer per pin count and input format in each worker process, reused across jobs
+_renderers: dict[tuple[int, bool], EscpToBinRenderer] = {}
+
+
+def render_document(document: Document, pins: int) -> bytes:
+    """Render a document to ESC/P. Runs in a worker process."""
+    renderer = _renderers.get((pins, document.markdown))
+    if renderer is None:
+        renderer_class = MarkdownToBinRenderer if document.markdown else EscpToBinRenderer
+        renderer = _renderers[pins, document.markdown] = renderer_class(pins)
+    else:
+        renderer.reset()
+    return renderer.render(document.content)
+
+
+def render_and_estimate(document: Document, pins: int, profiles: list[SpeedProfile]) -> tuple[bytes, list[float]]:
+    """Render a document and predict its print time in seconds with every profile. Runs in a worker process."""
+    payload = render_document(document, pins)
+    return payload, [estimate_print_time(payload, pins, profile).seconds for profile in profiles]
+
+
+class Scheduler:
+    """Renders documents in a process pool and prints them on the least busy compatible printer.
+
+    Printer load is the predicted print time of the jobs queued on it, see
+    `wp.estimate`. A document is rendered for its own pin count, or for
+    the least loaded group of printers if it has none. Once rendered, it is
+    queued on the printer of that pin count that would finish it first.
+    """
+
+    def __init__(self, printers: list[ScheduledPrinter], *, max_workers: int | None = None, chunk_size=4096):
+        if not printers:
+            raise ValueError('At least one printer is required')
+        self.printers = {p.name: p for p in printers}
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        # predicted seconds of the jobs queued on every printer
+        self.pending_seconds: dict[str, float] = {name: 0.0 for name in self.printers}
+
+    def pins_for(self, document: Document, load: dict[str, float]) -> int:
+        if document.pins is not None:
+            if all(p.pins != document.pins for p in self.printers.values()):
+                raise ValueError(f'No {document.pins}-pin printer for {document.name}')
+            return document.pins
+
+        def group_load(pins: int) -> float:
+            group = [p.name for p in self.printers.values() if p.pins == pins]
+            return sum(load[name] for name in group) / len(group)
+        return min({p.pins for p in self.printers.values()}, key=group_load)
+
+    def least_busy(self, pins: int, load: dict[str, float]) -> str:
+        return min((p.name for p in self.printers.values() if p.pins == pins), key=lambda name: load[name])
+
+    async def run(self, documents: Iterable[Document]) -> list[JobReport]:
+        printers = {name: p.printer for name, p in self.printers.items()}
+        async with Spooler(printers, chunk_size=self.chunk_size) as spooler:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                return await asyncio.gather(*(self._print(document, spooler, pool) for document in documents))
+
+    async def _print(self, document: Document, spooler: Spooler, pool: ProcessPoolExecutor) -> JobReport:
+        pins = self.pins_for(document, self.pending_seconds)
+        group = [p for p in self.printers.values() if p.pins == pins]
+        payload, seconds = await asyncio.get_running_loop().run_in_executor(
+            pool, render_and_estimate, document, pins, [p.profile for p in group]
+        )
+        predicted = {p.name: s for p, s in zip(group, seconds)}
+        name = self.least_busy(pins, {n: self.pending_seconds[n] + s for n, s in predicted.items()})
+        self.pending_seconds[name] += predicted[name]
+        try:
+            stats = await spooler.submit(name, PrintJob(document.name, payload))
+        finally:
+            self.pending_seconds[name] -= predicted[name]
+        return JobReport(document.name, name, stats, predicted[name])
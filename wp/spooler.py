@@ -0,0 +1,268 @@
+import asyncio
+import contextlib
+import mmap
+import os
+import time
+from dataclasses import dataclass, field
+from typing import BinaryIO, Iterable, Iterator
+
+import escp
+
+from .escp_stream import COMMAND, CONTROL, page_offsets, split
+from .optimizer import optimize
+
+# Commands that move the paper or print, rather than set a mode
+_MOTION_COMMANDS = frozenset(b'*KLYZ^J$\\')
+# Control codes that set a mode: condensed on and off
+_MODE_CONTROL_CODES = frozenset([b'\x0f', b'\x12'])
+
+
+def rechunk(pieces: Iterable[bytes], chunk_size: int) -> Iterator[bytes | memoryview]:
+    """Regroup byte pieces of any size into chunks of `chunk_size` bytes (the last one may be shorter).
+
+    Chunks lying within one piece are memoryview slices of it, not copies:
+    only chunks straddling two pieces are copied.
+    """
+    pending = bytearray()
+    for piece in pieces:
+        view = memoryview(piece)
+        if pending:
+            missing = chunk_size - len(pending)
+            pending += view[:missing]
+            view = view[missing:]
+            if len(pending) < chunk_size:
+                continue
+            yield bytes(pending)
+            pending = bytearray()
+        while len(view) >= chunk_size:
+            yield view[:chunk_size]
+            view = view[chunk_size:]
+        pending += view
+    if pending:
+        yield bytes(pending)
+
+
+def map_file(path: str | os.PathLike) -> bytes | mmap.mmap:
+    """The content of a binary file, memory-mapped so that it is paged in as it is read."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # empty files cannot be mapped
+            return b''
+        # the mapping stays valid after the file is closed
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def resume_from_page(data: bytes, offsets: list[int], page: int) -> bytes:
+    """The bytes to print `data` from `page` (1-based) on, e.g. after a paper jam.
+
+    `offsets` are the offsets at which the second and following pages
+    start, such as `EscpToBinRenderer.page_offsets`. Earlier pages are not
+    printed again: only their mode commands are sent first, so the printer
+    is in the same state as when it first reached `page`.
+    """
+    preamble, offset = _resume_point(data, offsets, page)
+    return preamble + data[offset:]
+
+
+def _resume_point(data: bytes | mmap.mmap, offsets: list[int], page: int) -> tuple[bytes, int]:
+    """The mode commands to send before `data[offset:]` to print from `page` on, and that offset."""
+    if not 1 <= page <= len(offsets) + 1:
+        raise ValueError(f'Invalid page {page}, the document has {len(offsets) + 1} pages')
+    if page == 1:
+        return b'', 0
+    offset = offsets[page - 2]
+    tokens, _ = split(data[:offset])
+    modes = b''.join(
+        token for kind, token in tokens
+        if kind == COMMAND and token[1] not in _MOTION_COMMANDS or kind == CONTROL and token in _MODE_CONTROL_CODES
+    )
+    return optimize(modes), offset
+
+
+class FilePrinter(escp.Printer):
+    """Printer stand-in writing to a binary stream, e.g. a file or `socket.makefile('wb')`."""
+
+    def __init__(self, output: BinaryIO):
+        self.output = output
+
+    def send(self, sequence: bytes):
+        self.output.write(sequence)
+        self.output.flush()
+
+    def close(self):
+        self.output.close()
+
+
+@dataclass
+class JobStats:
+    name: str
+    submitted_at: float = field(default_factory=time.monotonic)
+    started_at: float | None = None
+    finished_at: float | None = None
+    bytes_sent: int = 0
+    chunks_sent: int = 0
+
+    @property
+    def latency(self) -> float | None:
+        """Seconds spent waiting in the queue, None until the job starts."""
+        return None if self.started_at is None else self.started_at - self.submitted_at
+
+    @property
+    def duration(self) -> float | None:
+        """Seconds spent sending the job to the printer, None until it is finished."""
+        return None if self.finished_at is None else self.finished_at - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        """Bytes per second while sending."""
+        return self.bytes_sent / self.duration if self.duration else 0.0
+
+    def __str__(self):
+        return (
+            f'{self.name}: {self.bytes_sent} bytes in {self.chunks_sent} chunks, '
+            f'latency {_seconds(self.latency)}, duration {_seconds(self.duration)}, {self.throughput:,.0f} B/s'
+        )
+
+
+def _seconds(value: float | None) -> str:
+    return 'n/a' if value is None else f'{value:.3f} s'
+
+
+@dataclass
+class PrintJob:
+    """A job to print: raw bytes, a path to a binary file, or an iterable of bytes such as `render_stream`."""
+    name: str
+    source: bytes | str | os.PathLike | Iterable[bytes]
+    stats: JobStats | None = None
+    done: asyncio.Future | None = None
+    page_offsets: list[int] | None = None
+    """Offsets at which pages start after the first, found from the form feeds if not given."""
+
+    def from_page(self, page: int) -> 'PrintJob':
+        """A job printing this one again from `page` (1-based) on, see `resume_from_page`.
+
+        The rest of the job is sent from the source, or its memory map, without copying it.
+        """
+        match self.source:
+            case bytes():
+                data = self.source
+            case str() | os.PathLike():
+                data = map_file(self.source)
+            case _:
+                raise ValueError('Only jobs from bytes or a file can be resumed')
+        offsets = page_offsets(data) if self.page_offsets is None else self.page_offsets
+        preamble, offset = _resume_point(data, offsets, page)
+        return PrintJob(f'{self.name} from page {page}', [preamble, memoryview(data)[offset:]])
+
+    def pieces(self) -> Iterable[bytes]:
+        match self.source:
+            case bytes():
+                return [self.source]
+            case str() | os.PathLike():
+                return [map_file(self.source)]
+            case _:
+                return self.source
+
+
+class Spooler:
+    """Queues print jobs per printer and sends them in chunks.
+
+    Each printer has its own job queue and worker task. Chunks are produced
+    and sent concurrently through a bounded queue, so reading or rendering a
+    job never gets more than `max_pending_chunks` ahead of the printer.
+    Blocking `send` calls run in a worker thread.
+    """
+
+    def __init__(self, printers: dict[str, escp.Printer], *, chunk_size=4096, max_pending_chunks=4):
+        if chunk_size <= 0:
+            raise ValueError(f'Invalid chunk size: {chunk_size}')
+        self.printers = printers
+        self.chunk_size = chunk_size
+        self.max_pending_chunks = max_pending_chunks
+        self.queues: dict[str, asyncio.Queue] = {}
+        self.workers: list[asyncio.Task] = []
+        self.pending_bytes: dict[str, int] = {name: 0 for name in printers}
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    def start(self):
+        for name in self.printers:
+            self.queues[name] = asyncio.Queue()
+            self.workers.append(asyncio.create_task(self._worker(name)))
+
+    async def stop(self):
+        """Wait for queued jobs to finish, then stop the workers."""
+        for queue in self.queues.values():
+            await queue.join()
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    def enqueue(self, printer: str, job: PrintJob) -> asyncio.Future:
+        """Queue `job` on `printer` and return a future resolved with its `JobStats`."""
+        if printer not in self.printers:
+            raise ValueError(f'Unknown printer: {printer}')
+        job.stats = JobStats(job.name)
+        job.done = asyncio.get_running_loop().create_future()
+        if isinstance(job.source, bytes):
+            self.pending_bytes[printer] += len(job.source)
+        self.queues[printer].put_nowait(job)
+        return job.done
+
+    async def submit(self, printer: str, job: PrintJob) -> JobStats:
+        """Queue `job` on `printer` and wait until it has been sent."""
+        return await self.enqueue(printer, job)
+
+    async def _worker(self, name: str):
+        queue = self.queues[name]
+        while True:
+            job = await queue.get()
+            try:
+                await self._send_job(self.printers[name], job)
+                # the caller may have cancelled the future or stopped waiting for it
+                if not job.done.done():
+                    job.done.set_result(job.stats)
+            except Exception as e:
+                if not job.done.done():
+                    job.done.set_exception(e)
+            finally:
+                if isinstance(job.source, bytes):
+                    self.pending_bytes[name] -= len(job.source)
+                queue.task_done()
+
+    async def _send_job(self, printer: escp.Printer, job: PrintJob):
+        chunks = asyncio.Queue(maxsize=self.max_pending_chunks)
+        producer = asyncio.create_task(self._produce(job, chunks))
+        job.stats.started_at = time.monotonic()
+        try:
+            while (chunk := await chunks.get()) is not None:
+                await asyncio.to_thread(printer.send, chunk)
+                job.stats.bytes_sent += len(chunk)
+                job.stats.chunks_sent += 1
+            await producer
+        finally:
+            producer.cancel()
+            # the producer may be failed or cancelled, its outcome is already known
+            await asyncio.gather(producer, return_exceptions=True)
+            job.stats.finished_at = time.monotonic()
+
+    async def _produce(self, job: PrintJob, chunks: asyncio.Queue):
+        try:
+            iterator = rechunk(job.pieces(), self.chunk_size)
+            while (chunk := await asyncio.to_thread(next, iterator, None)) is not None:
+                await chunks.put(chunk)
+        except asyncio.CancelledError:
+            # the sender stopped and no longer reads chunks: the queue may be full
+            with contextlib.suppress(asyncio.QueueFull):
+                chunks.put_nowait(None)
+            raise
+        except Exception:
+            await chunks.put(None)
+            raise
+        await chunks.put(None)
@@ -0,0 +1,81 @@
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Iterator
+
+
+@dataclass
+class DirectiveStats:
+    count: int = 0
+    time: float = 0.0
+    """Seconds spent rendering the nodes, their children included."""
+    self_time: float = 0.0
+    """Seconds spent rendering the nodes, their children excluded."""
+    bytes: int = 0
+    """Output produced by the nodes themselves, their children excluded."""
+
+
+@dataclass
+class RenderStats:
+    """Counters collected by a renderer after `enable_stats()`.
+
+    Counters add up over every document rendered with the renderer.
+    """
+    phases: dict[str, float] = field(default_factory=dict)
+    tokens: int = 0
+    directives: dict[str, DirectiveStats] = field(default_factory=dict)
+    # (start time, children time, start size, children size) of the nodes being rendered
+    _active: list[list] = field(default_factory=list, repr=False)
+
+    @property
+    def nodes(self) -> int:
+        return sum(directive.count for directive in self.directives.values())
+
+    @property
+    def output_bytes(self) -> int:
+        return sum(directive.bytes for directive in self.directives.values())
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def instrument(self, category: str, handler: Callable, output_size: Callable[[], int]) -> Callable:
+        """Wrap a node handler to record its count, time and output bytes under `category`."""
+        directive = self.directives.setdefault(category, DirectiveStats())
+        active = self._active
+
+        def instrumented(renderer, node):
+            frame = [time.perf_counter(), 0.0, output_size(), 0]
+            active.append(frame)
+            try:
+                return handler(renderer, node)
+            finally:
+                active.pop()
+                elapsed = time.perf_counter() - frame[0]
+                produced = output_size() - frame[2]
+                directive.count += 1
+                directive.time += elapsed
+                directive.self_time += elapsed - frame[1]
+                directive.bytes += produced - frame[3]
+                if active:
+                    active[-1][1] += elapsed
+                    active[-1][3] += produced
+
+        return instrumented
+
+    def __str__(self):
+        lines = [', '.join(f'{name} {seconds:.3f} s' for name, seconds in self.phases.items())]
+        lines.append(f'{self.tokens} tokens, {self.nodes} nodes, {self.output_bytes} bytes')
+        lines.append(f'{"directive":<14} {"count":>8} {"time s":>8} {"self s":>8} {"bytes":>8}')
+        ranked = sorted(self.directives.items(), key=lambda item: item[1].self_time, reverse=True)
+        for category, directive in ranked:
+            if directive.count:
+                lines.append(
+                    f'{category:<14} {directive.count:>8} {directive.time:>8.3f} '
+                    f'{directive.self_time:>8.3f} {directive.bytes:>8}'
+                )
+        return '\n'.join(lines)
@@ -0,0 +1,37 @@
+from typing import Iterable, Iterator, Mapping
+
+from .escp_bin_renderer import EscpToBinRenderer
+from .node import GenericNode
+
+
+class CompiledTemplate:
+    """An escp-wp document parsed once and rendered for many records.
+
+    Placeholders are written `[var:name]` and replaced by the record values
+    at render time, so wrapping and box centering account for the actual
+    values. Values are printed as plain text.
+    """
+
+    def __init__(self, content: str, pins: int, **options):
+        self.renderer = EscpToBinRenderer(pins, **options)
+        self.root = self.renderer.parse(self.renderer.lexer(content))
+        self.variables = sorted(self._variables(self.root))
+
+    def _variables(self, node: GenericNode) -> set[str]:
+        names = {node.value} if node.category == 'var' else set()
+        for child in node.children:
+            names |= self._variables(child)
+        return names
+
+    def render(self, record: Mapping[str, object]) -> bytes:
+        self.renderer.reset()
+        self.renderer.variables = record
+        return self.renderer.render_tree(self.root)
+
+    def render_many(self, records: Iterable[Mapping[str, object]]) -> Iterator[bytes]:
+        for record in records:
+            yield self.render(record)
+
+
+def compile_template(content: str, *, pins: int, **options) -> CompiledTemplate:
+    return CompiledTemplate(content, pins, **options)